@@ -0,0 +1,267 @@
+"""
+Bulk import of food and weight logs from NDJSON or CSV uploads.
+
+Rows are read incrementally and handled in chunks: each chunk is validated,
+its foods are resolved (one lookup per distinct food, new foods created once),
+and its logs are inserted with a single executemany and committed together
+with the matching daily summary updates. Invalid rows are reported and skipped
+without affecting the rest of the import.
+"""
+import csv
+import json
+import time
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+from collections import defaultdict
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from . import crud, goal_updates, models, schemas, versions, weight_trend
+
+CHUNK_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000
+# Stay well under SQLite's bound parameter limit in IN (...) lookups
+LOOKUP_BATCH = 900
+
+
+class _Result:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.foods_created = 0
+        self.errors = []
+
+    def error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def as_schema(self) -> schemas.ImportResult:
+        return schemas.ImportResult(
+            imported=self.imported,
+            failed=self.failed,
+            foods_created=self.foods_created,
+            errors=sorted(self.errors, key=lambda error: error["row"]),
+        )
+
+
+def iter_records(fp: IO[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (row number, dict) for each record, or (row number, error message)
+    for records that can't be parsed. Row numbers start at 1 and don't count
+    the CSV header. A file that stops decoding as UTF-8 can't be read any
+    further, so that ends it with one error at the first row not read.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(fp)
+        parse = None
+    else:
+        reader = (line for line in fp if line.strip())
+        parse = _parse_json
+
+    row_number = 0
+    while True:
+        row_number += 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as e:
+            yield row_number, f"Not valid UTF-8 ({e.reason}); this row and the rest of the file were not imported"
+            return
+        except csv.Error as e:
+            yield row_number, f"Invalid CSV: {e}"
+            continue
+        if parse is not None:
+            yield row_number, parse(row)
+        else:
+            # Empty cells mean "not provided"
+            yield row_number, {key: value for key, value in row.items() if key and value not in ("", None)}
+
+
+def _parse_json(line: str):
+    """The record on an NDJSON line, or an error message."""
+    try:
+        record = _loads(line)
+    except ValueError as e:
+        return f"Invalid JSON: {e}"
+    if not isinstance(record, dict):
+        return "Expected a JSON object"
+    return record
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validate(chunk: list, model, result: _Result) -> list:
+    rows = []
+    for row_number, record in chunk:
+        if isinstance(record, str):
+            result.error(row_number, record)
+            continue
+        try:
+            rows.append((row_number, model.model_validate(record)))
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+            )
+            result.error(row_number, message)
+    return rows
+
+
+# (id, calories, protein, carbs, fat) of a resolved food
+FoodValues = Tuple[int, float, float, float, float]
+
+
+class _FoodResolver:
+    """
+    Maps import rows to food ids for one user, caching every distinct food
+    for the whole import so each one is looked up or created only once.
+    """
+
+    def __init__(self, db: Session, user_id: int, result: _Result):
+        self.db = db
+        self.user_id = user_id
+        self.result = result
+        self.cache: Dict[tuple, Optional[FoodValues]] = {}
+
+    @staticmethod
+    def key(row: schemas.FoodLogImportRow) -> tuple:
+        if row.food_id is not None:
+            return ("id", row.food_id)
+        if row.external_id:
+            return ("external", row.source or "USDA", row.external_id)
+        return ("food", row.name, row.calories, row.protein, row.carbs, row.fat)
+
+    def resolve(self, keyed_rows: List[Tuple[tuple, schemas.FoodLogImportRow]]):
+        """Look up (or create) every food in `keyed_rows` that isn't cached yet."""
+        missing = {}
+        for key, row in keyed_rows:
+            if key not in self.cache:
+                missing.setdefault(key, row)
+        if not missing:
+            return
+
+        by_kind = defaultdict(list)
+        for key in missing:
+            by_kind[key[0]].append(key)
+
+        columns = (models.Food.id, models.Food.calories, models.Food.protein, models.Food.carbs, models.Food.fat)
+        owned = models.Food.owner_id == self.user_id
+
+        for batch in _chunks(by_kind["id"], LOOKUP_BATCH):
+            found = self.db.execute(select(*columns).where(owned, models.Food.id.in_([key[1] for key in batch])))
+            for values in found:
+                self.cache[("id", values[0])] = tuple(values)
+            for key in batch:
+                # Unknown ids stay None and are reported per row
+                self.cache.setdefault(key, None)
+
+        for batch in _chunks(by_kind["external"], LOOKUP_BATCH):
+            found = self.db.execute(
+                select(*columns, models.Food.source, models.Food.external_id)
+                .where(owned, models.Food.external_id.in_([key[2] for key in batch]))
+            )
+            for values in found:
+                self.cache[("external", values[5], values[6])] = tuple(values[:5])
+
+        for batch in _chunks(by_kind["food"], LOOKUP_BATCH):
+            found = self.db.execute(
+                select(*columns, models.Food.name).where(owned, models.Food.name.in_([key[1] for key in batch]))
+            )
+            for values in found:
+                key = ("food", values[5], values[1], values[2] or 0, values[3] or 0, values[4] or 0)
+                self.cache.setdefault(key, tuple(values[:5]))
+
+        for key, row in missing.items():
+            if key in self.cache:
+                continue
+            food = {
+                "name": row.name,
+                "calories": row.calories,
+                "protein": row.protein,
+                "carbs": row.carbs,
+                "fat": row.fat,
+                "owner_id": self.user_id,
+            }
+            if key[0] == "external":
+                food.update(source=key[1], external_id=key[2])
+            food_id = self.db.execute(insert(models.Food).values(**food)).inserted_primary_key[0]
+            self.cache[key] = (food_id, row.calories, row.protein, row.carbs, row.fat)
+            self.result.foods_created += 1
+
+
+def import_food_logs(db: Session, fp: IO[str], fmt: str, user_id: int) -> schemas.ImportResult:
+    result = _Result()
+    resolver = _FoodResolver(db, user_id, result)
+    now = int(time.time())
+
+    for chunk in _chunks(iter_records(fp, fmt), CHUNK_SIZE):
+        rows = _validate(chunk, schemas.FoodLogImportRow, result)
+        keys = [resolver.key(row) for _, row in rows]
+        resolver.resolve([(key, row) for key, (_, row) in zip(keys, rows)])
+
+        log_rows = []
+        totals = defaultdict(lambda: [0.0, 0.0, 0.0, 0.0, 0])
+        for key, (row_number, row) in zip(keys, rows):
+            food = resolver.cache[key]
+            if food is None:
+                result.error(row_number, f"Food {row.food_id} not found")
+                continue
+            food_id, calories, protein, carbs, fat = food
+            log_rows.append((row.date.isoformat(), row.servings, row.timestamp or now, food_id, user_id))
+            day = totals[row.date]
+            day[0] += calories * row.servings
+            day[1] += (protein or 0) * row.servings
+            day[2] += (carbs or 0) * row.servings
+            day[3] += (fat or 0) * row.servings
+            day[4] += 1
+
+        if log_rows:
+            # Plain driver executemany: SQLAlchemy's per-row parameter processing
+            # costs more than the insert itself at this volume
+            db.connection().exec_driver_sql(
+                "INSERT INTO food_logs (date, servings, timestamp, food_id, user_id) VALUES (?, ?, ?, ?, ?)",
+                log_rows,
+            )
+            crud.adjust_daily_summaries(db, user_id, totals)
+            versions.bump(db, versions.FOODLOGS, [user_id])
+        db.commit()
+        result.imported += len(log_rows)
+
+    return result.as_schema()
+
+
+def import_weight_logs(db: Session, fp: IO[str], fmt: str, user_id: int) -> schemas.ImportResult:
+    result = _Result()
+    now = int(time.time())
+
+    try:
+        for chunk in _chunks(iter_records(fp, fmt), CHUNK_SIZE):
+            rows = _validate(chunk, schemas.WeightLogImportRow, result)
+            if rows:
+                db.connection().exec_driver_sql(
+                    "INSERT INTO weight_logs (date, weight, timestamp, user_id) VALUES (?, ?, ?, ?)",
+                    [(row.date.isoformat(), row.weight, row.timestamp or now, user_id) for _, row in rows],
+                )
+                versions.bump(db, versions.WEIGHTLOGS, [user_id])
+            db.commit()
+            result.imported += len(rows)
+    finally:
+        # Chunks committed before a failure stay imported
+        weight_trend.invalidate(user_id)
+        if result.imported:
+            goal_updates.recalculator.schedule(user_id)
+    return result.as_schema()
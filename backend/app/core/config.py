@@ -0,0 +1,47 @@
+"""
+Application settings.
+
+Modules read their environment variables through `settings`, which loads the
+.env file the first time any setting is read (searching upward from this
+package, as load_dotenv always has). Whatever module is imported first, its
+settings see the file; variables already set in the environment win.
+"""
+import os
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+
+
+class Settings:
+    """
+    Lazily loaded view of the environment.
+
+    Args:
+        env_file: .env file to load, or None to search for one
+    """
+
+    def __init__(self, env_file: Optional[str] = None):
+        self.env_file = env_file
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                load_dotenv(self.env_file)
+                self._loaded = True
+
+    def get(self, name: str, default=None):
+        self.load()
+        return os.getenv(name, default)
+
+    def get_bool(self, name: str, default: bool = False) -> bool:
+        value = self.get(name)
+        if value is None or value == "":
+            return default
+        return value.lower() in ("1", "true", "yes")
+
+
+settings = Settings()
@@ -0,0 +1,184 @@
+"""
+Request and database instrumentation (see core/metrics.py).
+
+MetricsMiddleware records every HTTP request's latency and status by route
+template (so /foods/{food_id} is one series, and paths that match no route
+share "<unmatched>") and the number of requests in flight. Engines passed to
+instrument_engine count their queries and query time, both in total and
+against the request that ran them, which the middleware adds to its
+route's counters. With SERVER_TIMING set, responses carry a Server-Timing
+header with the time to the response headers and the request's database
+time and query count.
+
+Queries outside any request (the goal recalculator, jobs) and those of the
+group commit writer, which runs the writes of many requests together, only
+count in the totals.
+"""
+import contextvars
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from . import metrics
+from .config import settings
+
+SERVER_TIMING = settings.get_bool("SERVER_TIMING")
+
+# Updated by the middleware only, which runs on the event loop
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"], threadsafe=False,
+)
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route"], threadsafe=False,
+)
+HTTP_IN_PROGRESS = metrics.gauge("http_requests_in_progress", "HTTP requests being served", threadsafe=False)
+# Its _count is the number of queries
+DB_LATENCY = metrics.histogram(
+    "db_query_duration_seconds", "Database query latency",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+DB_ROUTE_QUERIES = metrics.counter(
+    "http_db_queries_total", "Database queries run by requests, by route template", ["method", "route"], threadsafe=False,
+)
+DB_ROUTE_SECONDS = metrics.counter(
+    "http_db_query_seconds_total", "Database time of requests, by route template", ["method", "route"], threadsafe=False,
+)
+
+UNMATCHED = "<unmatched>"
+# Anything else is counted as OTHER, so clients can't mint new series
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class RequestStats:
+    """Database work done by one request."""
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# The RequestStats of the request being served; sync endpoints see it in the
+# threadpool and async sessions in their greenlets, as both copy the context
+_current_request: contextvars.ContextVar = contextvars.ContextVar("request_stats", default=None)
+
+
+def _record_query(elapsed: float):
+    DB_LATENCY.observe(elapsed)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+# Dialect-level hooks that run the statement themselves, as the default
+# dialect does. Connection events (before/after_cursor_execute) would do, but
+# any listener on them switches every execution to a slower path that costs
+# far more than the timing itself.
+def _do_execute(cursor, statement, parameters, context):
+    started = time.perf_counter()
+    try:
+        cursor.execute(statement, parameters)
+    finally:
+        _record_query(time.perf_counter() - started)
+    return True
+
+
+def _do_execute_no_params(cursor, statement, context):
+    started = time.perf_counter()
+    try:
+        cursor.execute(statement)
+    finally:
+        _record_query(time.perf_counter() - started)
+    return True
+
+
+def _do_executemany(cursor, statement, parameters, context):
+    started = time.perf_counter()
+    try:
+        cursor.executemany(statement, parameters)
+    finally:
+        _record_query(time.perf_counter() - started)
+    return True
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Count the engine's queries and their time (a sync engine, or an async one's sync_engine)."""
+    event.listen(engine, "do_execute", _do_execute)
+    event.listen(engine, "do_execute_no_params", _do_execute_no_params)
+    event.listen(engine, "do_executemany", _do_executemany)
+    return engine
+
+
+def _server_timing(started: float, stats: RequestStats) -> bytes:
+    return (
+        f"app;dur={(time.perf_counter() - started) * 1000:.1f}, "
+        f'db;dur={stats.db_time * 1000:.1f};desc="queries: {stats.queries}"'
+    ).encode()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request metrics. Plain ASGI rather than
+    BaseHTTPMiddleware, which would add a task and a stream per request.
+
+    Args:
+        app: The ASGI app to wrap
+        server_timing: Add a Server-Timing header to every response
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+        # (method, route) -> (latency, db queries, db seconds, {status: requests}) children
+        self._children = {}
+
+    def _route_children(self, method: str, route: str):
+        key = (method, route)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                HTTP_LATENCY.labels(method, route),
+                DB_ROUTE_QUERIES.labels(method, route),
+                DB_ROUTE_SECONDS.labels(method, route),
+                {},
+            )
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", _server_timing(started, stats))]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_PROGRESS.dec()
+            _current_request.reset(token)
+
+            # Set by the router once a route matched
+            path = getattr(scope.get("route"), "path", UNMATCHED)
+            method = scope["method"] if scope["method"] in METHODS else "OTHER"
+            latency, db_queries, db_seconds, requests = self._route_children(method, path)
+            latency.observe(elapsed)
+            if stats.queries:
+                db_queries.inc(stats.queries)
+                db_seconds.inc(stats.db_time)
+            counter = requests.get(status)
+            if counter is None:
+                counter = requests[status] = HTTP_REQUESTS.labels(method, path, str(status))
+            counter.inc()
@@ -0,0 +1,269 @@
+"""
+Counters, gauges and histograms exposed at /metrics in the Prometheus text
+format (version 0.0.4).
+
+Metrics are created once at import time with counter(), gauge() and
+histogram(), which register them in `registry`; collected() exposes numbers
+an object already keeps, read when /metrics is rendered. Labelled metrics hand out
+one child per label value combination through labels(); callers on a hot
+path keep the child instead of looking it up every time. Updates take a
+lock each, so values stay exact whether they come from the event loop or
+the threadpool; metrics only ever updated on the event loop thread can be
+created with threadsafe=False to skip it.
+"""
+import bisect
+import math
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; request and upstream call latencies
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock: Optional[threading.Lock]):
+        self.value = 0.0
+        self._lock = lock
+
+    def inc(self, amount: float = 1):
+        if self._lock is None:
+            self.value += amount
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...], lock: Optional[threading.Lock]):
+        self.buckets = buckets
+        # One more than the bounds: the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = lock
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if self._lock is None:
+            self.counts[index] += 1
+            self.sum += value
+            return
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        if self._lock is None:
+            return list(self.counts), self.sum
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class Metric:
+    """
+    A named metric and its children, one per combination of label values.
+
+    Args:
+        name: Metric name, e.g. http_requests_total
+        documentation: HELP text
+        labelnames: Label names; metrics without labels are updated directly
+        threadsafe: False if only ever updated on the event loop thread
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), threadsafe: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.threadsafe = threadsafe
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _child_lock(self) -> Optional[threading.Lock]:
+        return threading.Lock() if self.threadsafe else None
+
+    def labels(self, *values: str):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(name with suffix, formatted labels, value) of every sample."""
+        for values, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, values), child.value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._child_lock())
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self._child_lock())
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default.dec(amount)
+
+    def set(self, value: float):
+        self._default.set(value)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        threadsafe: bool = True,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, threadsafe)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets, self._child_lock())
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        names = self.labelnames + ("le",)
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(child.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(names, values + (_format_value(bound),)), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Collected(Metric):
+    """
+    A metric whose samples are read from `collect` on every render instead
+    of being updated, for counters that objects like caches keep anyway.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        type: counter or gauge
+        labelnames: Label names
+        collect: Returns {label values: value}
+    """
+
+    def __init__(self, name: str, documentation: str, type: str, labelnames: Sequence[str], collect):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+
+    def labels(self, *values: str):
+        raise TypeError(f"{self.name} is collected, not updated")
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for values, value in self._collect().items():
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics):
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = (), threadsafe: bool = True) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames, threadsafe))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (), threadsafe: bool = True) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames, threadsafe))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+    threadsafe: bool = True,
+) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets, threadsafe))
+
+
+def collected(name: str, documentation: str, type: str, labelnames: Sequence[str], collect) -> Collected:
+    return registry.register(Collected(name, documentation, type, labelnames, collect))
@@ -0,0 +1,155 @@
+"""
+Password hashing off the request threadpool.
+
+bcrypt is deliberately slow, so hashing and verification run in a dedicated
+process pool instead of the threadpool that serves every sync endpoint. At
+most PASSWORD_HASH_QUEUE operations may be queued or running at once; beyond
+that requests are shed with a 503 and Retry-After instead of piling up.
+
+BCRYPT_ROUNDS sets the cost for new hashes. Hashes made with a different
+cost are replaced on the next successful login (verify returns the new hash).
+PASSWORD_HASH_WORKERS=0 hashes in the request threadpool instead.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from . import metrics
+from .config import settings
+
+BCRYPT_ROUNDS = int(settings.get("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(settings.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE = int(settings.get("PASSWORD_HASH_QUEUE", max(PASSWORD_HASH_WORKERS, 1) * 16))
+PASSWORD_HASH_RETRY_AFTER = int(settings.get("PASSWORD_HASH_RETRY_AFTER", 2))
+
+
+@lru_cache(maxsize=None)
+def make_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    # min/max pin the cost, so needs_update flags hashes made with any other cost
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# Run in the worker processes, so they must be importable module-level functions
+def _hash(password: str, rounds: int) -> str:
+    return make_context(rounds).hash(password)
+
+
+def _verify(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """(matches, new hash if the stored one needs updating)"""
+    context = make_context(rounds)
+    if not context.verify(password, hashed):
+        return False, None
+    if context.needs_update(hashed):
+        return True, context.hash(password)
+    return True, None
+
+
+def _warm_up() -> None:
+    make_context(BCRYPT_ROUNDS)
+
+
+class PasswordPool:
+    """
+    Bounded pool for bcrypt work.
+
+    Args:
+        workers: Worker processes; 0 runs hashes in the request threadpool
+        queue_size: Operations allowed queued or running before shedding load
+        rounds: bcrypt cost for new hashes
+    """
+
+    def __init__(self, workers: int, queue_size: int, rounds: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rounds = rounds
+        self._executor: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.rejected = 0
+        self.inflight = 0
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # spawn: workers don't inherit the server's threads or open connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def start(self):
+        """Start the worker processes now rather than on the first login."""
+        executor = self._get_executor()
+        if executor is not None:
+            for future in [executor.submit(_warm_up) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, please try again shortly",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+            )
+        self.submitted += 1
+        self.inflight += 1
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                return await run_in_threadpool(fn, *args)
+            future: Future = executor.submit(fn, *args)
+            return await asyncio.wrap_future(future)
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, replacement hash or None); the replacement should be saved."""
+        return await self._run(_verify, password, hashed, self.rounds)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "inflight": self.inflight,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+        }
+
+
+password_pool = PasswordPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, BCRYPT_ROUNDS)
+metrics.collected(
+    "password_hash_operations_total", "bcrypt hashes and checks by outcome (submitted, rejected)", "counter", ["outcome"],
+    lambda: {("submitted",): password_pool.submitted, ("rejected",): password_pool.rejected},
+)
+metrics.collected(
+    "password_hash_in_progress", "bcrypt hashes and checks queued or running", "gauge", (),
+    lambda: {(): password_pool.inflight},
+)
@@ -0,0 +1,34 @@
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+
+def json_rows(adapter: TypeAdapter, rows) -> Response:
+    """
+    Encode rows with one of the schemas' row adapters. FastAPI doesn't
+    validate a returned Response, so they must already match the route's
+    response_model, which is kept for the API docs.
+    """
+    return Response(content=adapter.dump_json(rows), media_type="application/json")
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match lists `etag` (weak comparison, as for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+def set_etag(response: Response, etag: str) -> Response:
+    # Per-user data: browsers may keep it but must revalidate, shared caches must not store it
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def not_modified(etag: str) -> Response:
+    return set_etag(Response(status_code=304), etag)
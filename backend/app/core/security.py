@@ -1,22 +1,25 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 from jose import jwt, JWTError
-from dotenv import load_dotenv
-import os
-from .. import crud
-from ..database import get_db
+from sqlalchemy import event
+from .. import crud_async, models, schemas
+from ..database import get_async_read_db
+from . import metrics
+from .passwords import make_context
+from .user_cache import UserCache
+from .config import settings
 
-# Load environment variables
-load_dotenv()
-SECRET_KEY = os.getenv("SECRET_KEY", "devsecret")
+SECRET_KEY = settings.get("SECRET_KEY", "devsecret")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+ACCESS_TOKEN_EXPIRE_MINUTES = int(settings.get("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+AUTH_USER_CACHE_TTL = float(settings.get("AUTH_USER_CACHE_TTL", 60))
+AUTH_USER_CACHE_SIZE = int(settings.get("AUTH_USER_CACHE_SIZE", 10000))
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Requests hash through passwords.password_pool; these are for scripts and the shell
+pwd_context = make_context()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -53,8 +56,23 @@ def verify_refresh_token(token: str) -> dict:
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-# Get current user dependency
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Authenticated users, so most requests skip the users lookup.
+# Tombstones outlive any access token issued before the deletion.
+user_cache = UserCache(AUTH_USER_CACHE_TTL, AUTH_USER_CACHE_SIZE, tombstone_ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+metrics.collected(
+    "auth_user_cache_lookups_total", "Authenticated user cache lookups by result", "counter", ["result"],
+    lambda: {("hit",): user_cache.hits, ("miss",): user_cache.misses},
+)
+metrics.collected(
+    "auth_user_cache_entries", "Users cached, and deleted users still turned away", "gauge", ["kind"],
+    lambda: {("user",): user_cache.stats()["entries"], ("deleted",): user_cache.stats()["tombstones"]},
+)
+
+@event.listens_for(models.User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    user_cache.mark_deleted(target.id)
+
+def _token_user_id(token: str) -> int:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -67,8 +85,34 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-
-    user = crud.get_user(db, int(user_id))
-    if user is None:
+    if user_cache.is_deleted(int(user_id)):
         raise credentials_exception
+    return int(user_id)
+
+def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """Id of the authenticated user, from the token alone without touching the database."""
+    return _token_user_id(token)
+
+# Get current user dependency
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_read_db)) -> schemas.UserRead:
+    """
+    Snapshot of the authenticated user, served from user_cache when fresh.
+    The snapshot may be up to AUTH_USER_CACHE_TTL old when another worker
+    changed the profile, so routes that modify the user or write anything
+    computed from its profile load it with crud_async.get_user.
+    """
+    user_id = _token_user_id(token)
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    db_user = await crud_async.get_user(db, user_id)
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = schemas.UserRead.model_validate(db_user, from_attributes=True)
+    user_cache.set(user_id, user)
     return user
@@ -0,0 +1,91 @@
+"""
+In-process cache of authenticated users.
+
+Holds a snapshot of each user (schemas.UserRead, detached from any session)
+for a short TTL, so most requests skip the users lookup. Profile updates
+invalidate the entry explicitly. Deleted users leave a tombstone, so routes
+that trust the token alone still turn them away in this process.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .. import schemas
+
+
+class UserCache:
+    """
+    Bounded LRU of user snapshots, each valid for `ttl` seconds.
+
+    Args:
+        ttl: Seconds a snapshot is served before the user is looked up again
+        max_size: Maximum number of users kept
+        tombstone_ttl: Seconds a deleted user stays rejected
+    """
+
+    def __init__(self, ttl: float, max_size: int, tombstone_ttl: float):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.tombstone_ttl = tombstone_ttl
+        self._entries: "OrderedDict[int, Tuple[float, schemas.UserRead]]" = OrderedDict()
+        self._deleted: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[schemas.UserRead]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id: int, user: schemas.UserRead):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if user_id in self._deleted:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def mark_deleted(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            now = time.monotonic()
+            # Drop expired tombstones so the table stays small
+            for expired in [key for key, until in self._deleted.items() if until <= now]:
+                del self._deleted[expired]
+            self._deleted[user_id] = now + self.tombstone_ttl
+
+    def is_deleted(self, user_id: int) -> bool:
+        until = self._deleted.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._deleted.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "tombstones": len(self._deleted),
+        }
+
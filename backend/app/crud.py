@@ -1,6 +1,10 @@
-from sqlalchemy.orm import Session
-from . import models, schemas
+from sqlalchemy import delete, func, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from . import food_index, models, schemas, versions, weight_trend
 from datetime import date
+from typing import Optional, Tuple
 import time
 
 # --- User CRUD ---
@@ -24,12 +28,43 @@ def get_user_by_email(db: Session, email: str):
 
 # --- Food CRUD ---
 def create_food(db: Session, food: schemas.FoodCreate, user_id: int):
-    db_food = models.Food(**food.dict(), owner_id=user_id)
-    db.add(db_food)
+    if food.external_id:
+        db_food = get_or_create_external_food(db, food, user_id)
+    else:
+        db_food = models.Food(**food.model_dump(), owner_id=user_id)
+        db.add(db_food)
     db.commit()
     db.refresh(db_food)
     return db_food
 
+def get_or_create_external_food(db: Session, food: schemas.FoodCreate, user_id: int):
+    """
+    Return the user's food for (source, external_id), adding it if missing.
+
+    An existing food is returned as-is, so logs that already reference it keep
+    their values. The new row is only flushed, in a savepoint so losing the
+    race doesn't roll back the caller's transaction; the caller commits it
+    together with whatever it is logging.
+    """
+    source = food.source or "USDA"
+    query = db.query(models.Food).filter(
+        models.Food.owner_id == user_id,
+        models.Food.source == source,
+        models.Food.external_id == food.external_id,
+    )
+    db_food = query.first()
+    if db_food:
+        return db_food
+
+    db_food = models.Food(**food.model_dump(exclude={"source"}), source=source, owner_id=user_id)
+    try:
+        with db.begin_nested():
+            db.add(db_food)
+    except IntegrityError:
+        # Another request added it first
+        db_food = query.first()
+    return db_food
+
 def get_food(db: Session, food_id: int, user_id: int):
     return (
         db.query(models.Food)
@@ -41,7 +76,17 @@ def get_foods(db: Session, user_id: int, skip: int = 0, limit: int = 100, search
     query = db.query(models.Food).filter(models.Food.owner_id == user_id)
     
     if search_term:
-        query = query.filter(models.Food.name.ilike(f"%{search_term}%"))
+        match_query = food_index.build_match_query(search_term, user_id)
+        if match_query and food_index.is_supported(db.get_bind()):
+            # Word-prefix match through the FTS index, best matches first
+            query = (
+                query
+                .join(food_index.fts, food_index.fts.c.rowid == models.Food.id)
+                .filter(food_index.match(match_query))
+                .order_by(food_index.rank, func.length(models.Food.name))
+            )
+        else:
+            query = query.filter(models.Food.name.ilike(f"%{search_term}%"))
     
     return (
         query
@@ -51,6 +96,123 @@ def get_foods(db: Session, user_id: int, skip: int = 0, limit: int = 100, search
     )
 
 
+# --- Daily nutrition summary ---
+def _summary_upsert():
+    table = models.DailyNutritionSummary.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.date],
+        set_={
+            "calories": table.c.calories + stmt.excluded.calories,
+            "protein": table.c.protein + stmt.excluded.protein,
+            "carbs": table.c.carbs + stmt.excluded.carbs,
+            "fat": table.c.fat + stmt.excluded.fat,
+            "log_count": table.c.log_count + stmt.excluded.log_count,
+        },
+    )
+
+# Built once so the compiled statement is reused across calls
+_SUMMARY_UPSERT = _summary_upsert()
+
+def adjust_daily_summaries(db: Session, user_id: int, changes: dict):
+    """
+    Add amounts to a user's per-day summary rows, creating them if needed.
+
+    `changes` maps each date to (calories, protein, carbs, fat, log_count).
+    Runs in the caller's transaction, so the summaries commit (or roll back)
+    together with the log changes that caused them.
+    """
+    table = models.DailyNutritionSummary.__table__
+    db.execute(_SUMMARY_UPSERT, [
+        {
+            "user_id": user_id, "date": day,
+            "calories": calories, "protein": protein, "carbs": carbs, "fat": fat, "log_count": log_count,
+        }
+        for day, (calories, protein, carbs, fat, log_count) in changes.items()
+    ])
+    emptied = [day for day, change in changes.items() if change[4] < 0]
+    if emptied:
+        # Drop days with no logs left rather than keeping rounding residue around
+        db.execute(
+            delete(table).where(table.c.user_id == user_id, table.c.date.in_(emptied), table.c.log_count <= 0)
+        )
+
+def adjust_daily_summary(
+    db: Session,
+    user_id: int,
+    day: date,
+    calories: float = 0,
+    protein: float = 0,
+    carbs: float = 0,
+    fat: float = 0,
+    log_count: int = 0,
+):
+    """Add the given amounts to a user's summary row for `day` (see adjust_daily_summaries)."""
+    adjust_daily_summaries(db, user_id, {day: (calories, protein, carbs, fat, log_count)})
+
+def adjust_daily_summaries_for_food(
+    db: Session,
+    food_id: int,
+    calories: float = 0,
+    protein: float = 0,
+    carbs: float = 0,
+    fat: float = 0,
+    remove_logs: bool = False,
+):
+    """
+    Apply a per-serving change of a food to every day it was logged on.
+    With remove_logs, the food's logs are being deleted along with it.
+    """
+    days = (
+        db.query(
+            models.FoodLog.user_id,
+            models.FoodLog.date,
+            func.sum(models.FoodLog.servings),
+            func.count(models.FoodLog.id),
+        )
+        .filter(models.FoodLog.food_id == food_id)
+        .group_by(models.FoodLog.user_id, models.FoodLog.date)
+        .all()
+    )
+    for user_id, day, servings, count in days:
+        adjust_daily_summary(
+            db, user_id, day,
+            calories=servings * calories,
+            protein=servings * protein,
+            carbs=servings * carbs,
+            fat=servings * fat,
+            log_count=-count if remove_logs else 0,
+        )
+    # The logs embed the food
+    versions.bump(db, versions.FOODLOGS, [user_id for user_id, *_ in days])
+
+def get_daily_calories(db: Session, user_id: int, start: date, end: date):
+    """(date, calories) of the days with logs from start to end."""
+    return (
+        db.query(models.DailyNutritionSummary.date, models.DailyNutritionSummary.calories)
+        .filter(
+            models.DailyNutritionSummary.user_id == user_id,
+            models.DailyNutritionSummary.date >= start,
+            models.DailyNutritionSummary.date <= end,
+        )
+        .order_by(models.DailyNutritionSummary.date)
+        .all()
+    )
+
+
+def get_daily_summaries(db: Session, user_id: int, start: date, end: date):
+    return (
+        db.query(models.DailyNutritionSummary)
+        .filter(
+            models.DailyNutritionSummary.user_id == user_id,
+            models.DailyNutritionSummary.date >= start,
+            models.DailyNutritionSummary.date <= end,
+        )
+        .order_by(models.DailyNutritionSummary.date)
+        .all()
+    )
+
+
 # --- FoodLog CRUD ---
 def log_food(db: Session, log: schemas.FoodLogCreate, user_id: int):
     db_log = models.FoodLog(
@@ -61,6 +223,17 @@ def log_food(db: Session, log: schemas.FoodLogCreate, user_id: int):
         timestamp=int(time.time())
     )
     db.add(db_log)
+    food = db.get(models.Food, log.food_id)
+    if food:
+        adjust_daily_summary(
+            db, user_id, log.log_date,
+            calories=food.calories * log.servings,
+            protein=(food.protein or 0) * log.servings,
+            carbs=(food.carbs or 0) * log.servings,
+            fat=(food.fat or 0) * log.servings,
+            log_count=1,
+        )
+    versions.bump(db, versions.FOODLOGS, [user_id])
     db.commit()
     db.refresh(db_log)
     return db_log
@@ -69,6 +242,7 @@ def log_food(db: Session, log: schemas.FoodLogCreate, user_id: int):
 def get_food_logs(db: Session, user_id: int, log_date: date, skip: int = 0, limit: int = 100):
     return (
         db.query(models.FoodLog)
+        .options(joinedload(models.FoodLog.food))
         .filter(models.FoodLog.user_id == user_id, models.FoodLog.date == log_date)
         .offset(skip)
         .limit(limit)
@@ -76,13 +250,58 @@ def get_food_logs(db: Session, user_id: int, log_date: date, skip: int = 0, limi
     )
 
 
+def get_food_logs_range(
+    db: Session,
+    user_id: int,
+    start: date,
+    end: date,
+    after: Optional[Tuple[date, int, int]] = None,
+    limit: int = 100,
+):
+    """
+    Logs from start to end inclusive, ordered by (date, timestamp, id), with
+    their foods loaded in the same query. `after` is the (date, timestamp, id)
+    of the last log of the previous page.
+    """
+    query = (
+        db.query(models.FoodLog)
+        .options(joinedload(models.FoodLog.food))
+        .filter(
+            models.FoodLog.user_id == user_id,
+            models.FoodLog.date >= start,
+            models.FoodLog.date <= end,
+        )
+    )
+    if after is not None:
+        query = query.filter(
+            tuple_(models.FoodLog.date, models.FoodLog.timestamp, models.FoodLog.id) > tuple_(*after)
+        )
+    return (
+        query
+        .order_by(models.FoodLog.date, models.FoodLog.timestamp, models.FoodLog.id)
+        .limit(limit)
+        .all()
+    )
+
+
 def delete_food_log(db: Session, log_id: int, user_id: int):
     db_log = db.query(models.FoodLog).filter(
         models.FoodLog.id == log_id,
         models.FoodLog.user_id == user_id
     ).first()
     if db_log:
+        food = db_log.food
+        if food:
+            adjust_daily_summary(
+                db, user_id, db_log.date,
+                calories=-food.calories * db_log.servings,
+                protein=-(food.protein or 0) * db_log.servings,
+                carbs=-(food.carbs or 0) * db_log.servings,
+                fat=-(food.fat or 0) * db_log.servings,
+                log_count=-1,
+            )
         db.delete(db_log)
+        versions.bump(db, versions.FOODLOGS, [user_id])
         db.commit()
         return True
     return False
@@ -96,8 +315,10 @@ def log_weight(db: Session, log: schemas.WeightLogCreate, user_id: int):
         timestamp=int(time.time())
     )
     db.add(db_log)
+    versions.bump(db, versions.WEIGHTLOGS, [user_id])
     db.commit()
     db.refresh(db_log)
+    weight_trend.log_added(user_id, db_log.date, db_log.weight)
     return db_log
 
 
@@ -118,8 +339,11 @@ def delete_weight_log(db: Session, log_id: int, user_id: int):
         models.WeightLog.user_id == user_id
     ).first()
     if db_log:
+        log_date, weight = db_log.date, db_log.weight
         db.delete(db_log)
+        versions.bump(db, versions.WEIGHTLOGS, [user_id])
         db.commit()
+        weight_trend.log_removed(user_id, log_date, weight)
         return True
     return False
 
@@ -128,12 +352,13 @@ def create_or_update_user_goal(db: Session, goal: schemas.GoalCreate, user_id: i
     db_goal = db.query(models.Goal).filter(models.Goal.user_id == user_id).first()
     if db_goal:
         # existing goal
-        for key, value in goal.dict().items():
+        for key, value in goal.model_dump().items():
             setattr(db_goal, key, value)
     else:
         # new goal
-        db_goal = models.Goal(**goal.dict(), user_id=user_id)
+        db_goal = models.Goal(**goal.model_dump(), user_id=user_id)
         db.add(db_goal)
+    versions.bump(db, versions.GOALS, [user_id])
     db.commit()
     db.refresh(db_goal)
     return db_goal
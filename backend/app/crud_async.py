@@ -0,0 +1,471 @@
+"""
+Async counterparts of the crud functions, for routers on AsyncSession.
+
+They issue the same queries as crud and keep the same side effects (daily
+summaries, weight trend cache). Relationships a response needs are loaded
+in the query itself, since lazy loading isn't available in async code.
+
+Writes return their objects as flushed rather than refreshing them after
+commit: sessions don't expire on commit, and a refresh would check a writer
+connection out again and hold it until the request finishes.
+
+Food and weight log inserts and deletes and new foods go through the group
+commit writer (group_commit.py) and take no session: each is an op (the
+_add_*/_delete_* functions) committed together with concurrent writes.
+"""
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from . import crud, food_index, models, schemas, versions, weight_trend
+from .group_commit import writer
+from datetime import date
+from typing import List, Optional, Tuple
+import time
+
+# --- User CRUD ---
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    db_user = models.User(
+        username=user.username.lower(),
+        email=user.email.lower(),
+        hashed_password=hashed_password
+    )
+    db.add(db_user)
+    await db.commit()
+    return db_user
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email.lower()))
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username.lower()))
+
+
+# --- Food CRUD ---
+async def _add_food(db: AsyncSession, food: schemas.FoodCreate, user_id: int):
+    if food.external_id:
+        return await get_or_create_external_food(db, food, user_id)
+    db_food = models.Food(**food.model_dump(), owner_id=user_id)
+    db.add(db_food)
+    await db.flush()
+    return db_food
+
+async def create_food(food: schemas.FoodCreate, user_id: int):
+    return await writer.run(_add_food, food, user_id)
+
+async def get_or_create_external_food(db: AsyncSession, food: schemas.FoodCreate, user_id: int):
+    """
+    See crud.get_or_create_external_food; the new row is only flushed, in a
+    savepoint so losing the race doesn't roll back the caller's transaction.
+    """
+    source = food.source or "USDA"
+    query = select(models.Food).where(
+        models.Food.owner_id == user_id,
+        models.Food.source == source,
+        models.Food.external_id == food.external_id,
+    )
+    db_food = await db.scalar(query)
+    if db_food:
+        return db_food
+
+    db_food = models.Food(**food.model_dump(exclude={"source"}), source=source, owner_id=user_id)
+    try:
+        async with db.begin_nested():
+            db.add(db_food)
+    except IntegrityError:
+        # Another request added it first
+        db_food = await db.scalar(query)
+    return db_food
+
+async def get_food(db: AsyncSession, food_id: int, user_id: int, with_logs: bool = False):
+    """With with_logs, the food's logs are loaded too, as deleting it cascades to them."""
+    query = select(models.Food).where(models.Food.id == food_id, models.Food.owner_id == user_id)
+    if with_logs:
+        query = query.options(selectinload(models.Food.logs))
+    return await db.scalar(query)
+
+async def get_foods(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, search_term: str = None):
+    query = select(models.Food).where(models.Food.owner_id == user_id)
+
+    if search_term:
+        match_query = food_index.build_match_query(search_term, user_id)
+        if match_query and food_index.is_supported(db.get_bind()):
+            # Word-prefix match through the FTS index, best matches first
+            query = (
+                query
+                .join(food_index.fts, food_index.fts.c.rowid == models.Food.id)
+                .where(food_index.match(match_query))
+                .order_by(food_index.rank, func.length(models.Food.name))
+            )
+        else:
+            query = query.where(models.Food.name.ilike(f"%{search_term}%"))
+
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return result.all()
+
+# Columns of schemas.FoodRow, in order
+_FOOD_COLUMNS = (
+    models.Food.name,
+    models.Food.calories,
+    func.coalesce(models.Food.protein, 0),
+    func.coalesce(models.Food.carbs, 0),
+    func.coalesce(models.Food.fat, 0),
+    models.Food.id,
+    models.Food.owner_id,
+    models.Food.external_id,
+    models.Food.source,
+)
+_FOOD_KEYS = ("name", "calories", "protein", "carbs", "fat", "id", "owner_id", "external_id", "source")
+
+async def get_food_rows(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100) -> List[dict]:
+    """get_foods without a search term, as schemas.FoodRow dicts read from columns."""
+    result = await db.execute(
+        select(*_FOOD_COLUMNS).where(models.Food.owner_id == user_id).offset(skip).limit(limit)
+    )
+    return [dict(zip(_FOOD_KEYS, row)) for row in result]
+
+
+# --- Daily nutrition summary ---
+async def adjust_daily_summaries(db: AsyncSession, user_id: int, changes: dict):
+    """See crud.adjust_daily_summaries; runs in the caller's transaction."""
+    table = models.DailyNutritionSummary.__table__
+    await db.execute(crud._SUMMARY_UPSERT, [
+        {
+            "user_id": user_id, "date": day,
+            "calories": calories, "protein": protein, "carbs": carbs, "fat": fat, "log_count": log_count,
+        }
+        for day, (calories, protein, carbs, fat, log_count) in changes.items()
+    ])
+    emptied = [day for day, change in changes.items() if change[4] < 0]
+    if emptied:
+        # Drop days with no logs left rather than keeping rounding residue around
+        await db.execute(
+            delete(table).where(table.c.user_id == user_id, table.c.date.in_(emptied), table.c.log_count <= 0)
+        )
+
+async def adjust_daily_summary(
+    db: AsyncSession,
+    user_id: int,
+    day: date,
+    calories: float = 0,
+    protein: float = 0,
+    carbs: float = 0,
+    fat: float = 0,
+    log_count: int = 0,
+):
+    await adjust_daily_summaries(db, user_id, {day: (calories, protein, carbs, fat, log_count)})
+
+async def adjust_daily_summaries_for_food(
+    db: AsyncSession,
+    food_id: int,
+    calories: float = 0,
+    protein: float = 0,
+    carbs: float = 0,
+    fat: float = 0,
+    remove_logs: bool = False,
+):
+    """See crud.adjust_daily_summaries_for_food."""
+    days = await db.execute(
+        select(
+            models.FoodLog.user_id,
+            models.FoodLog.date,
+            func.sum(models.FoodLog.servings),
+            func.count(models.FoodLog.id),
+        )
+        .where(models.FoodLog.food_id == food_id)
+        .group_by(models.FoodLog.user_id, models.FoodLog.date)
+    )
+    days = days.all()
+    for user_id, day, servings, count in days:
+        await adjust_daily_summary(
+            db, user_id, day,
+            calories=servings * calories,
+            protein=servings * protein,
+            carbs=servings * carbs,
+            fat=servings * fat,
+            log_count=-count if remove_logs else 0,
+        )
+    # The logs embed the food
+    await versions.bump_async(db, versions.FOODLOGS, [user_id for user_id, *_ in days])
+
+async def get_daily_calories(db: AsyncSession, user_id: int, start: date, end: date):
+    """(date, calories) of the days with logs from start to end."""
+    result = await db.execute(
+        select(models.DailyNutritionSummary.date, models.DailyNutritionSummary.calories)
+        .where(
+            models.DailyNutritionSummary.user_id == user_id,
+            models.DailyNutritionSummary.date >= start,
+            models.DailyNutritionSummary.date <= end,
+        )
+        .order_by(models.DailyNutritionSummary.date)
+    )
+    return result.all()
+
+async def get_daily_summaries(db: AsyncSession, user_id: int, start: date, end: date):
+    result = await db.scalars(
+        select(models.DailyNutritionSummary)
+        .where(
+            models.DailyNutritionSummary.user_id == user_id,
+            models.DailyNutritionSummary.date >= start,
+            models.DailyNutritionSummary.date <= end,
+        )
+        .order_by(models.DailyNutritionSummary.date)
+    )
+    return result.all()
+
+
+# --- FoodLog CRUD ---
+async def _add_food_log(db: AsyncSession, log: schemas.FoodLogCreate, user_id: int):
+    if log.food_id is None:
+        if log.external_food.external_id:
+            # Reuse the food from earlier logs of the same item
+            food = await get_or_create_external_food(db, log.external_food, user_id)
+        else:
+            # Edited or unidentified external food: add it for this log
+            food = models.Food(**log.external_food.model_dump(), owner_id=user_id)
+            db.add(food)
+    else:
+        food = await db.get(models.Food, log.food_id)
+        if food is None:
+            return None
+
+    # The response includes the food
+    db_log = models.FoodLog(
+        date=log.log_date,
+        servings=log.servings,
+        food=food,
+        user_id=user_id,
+        timestamp=int(time.time())
+    )
+    db.add(db_log)
+    await adjust_daily_summary(
+        db, user_id, log.log_date,
+        calories=food.calories * log.servings,
+        protein=(food.protein or 0) * log.servings,
+        carbs=(food.carbs or 0) * log.servings,
+        fat=(food.fat or 0) * log.servings,
+        log_count=1,
+    )
+    await versions.bump_async(db, versions.FOODLOGS, [user_id])
+    await db.flush()
+    return db_log
+
+async def log_food(log: schemas.FoodLogCreate, user_id: int):
+    """
+    Log log.food_id, or log.external_food (added to the user's foods) when
+    food_id is None. None if food_id doesn't exist.
+    """
+    return await writer.run(_add_food_log, log, user_id)
+
+def _food_log_row_query():
+    # Outer join like joinedload, so rows come back in the same order
+    return (
+        select(
+            models.FoodLog.date,
+            models.FoodLog.servings,
+            models.FoodLog.id,
+            models.FoodLog.user_id,
+            models.FoodLog.food_id,
+            models.FoodLog.timestamp,
+            *_FOOD_COLUMNS,
+        )
+        .outerjoin(models.Food, models.Food.id == models.FoodLog.food_id)
+    )
+
+def _food_log_rows(result) -> List[dict]:
+    return [
+        {
+            "log_date": log_date, "servings": servings, "id": log_id, "user_id": user_id, "food_id": food_id,
+            "food": dict(zip(_FOOD_KEYS, food)), "timestamp": timestamp,
+        }
+        for log_date, servings, log_id, user_id, food_id, timestamp, *food in result
+    ]
+
+async def get_food_logs(db: AsyncSession, user_id: int, log_date: date, skip: int = 0, limit: int = 100):
+    result = await db.scalars(
+        select(models.FoodLog)
+        .options(joinedload(models.FoodLog.food))
+        .where(models.FoodLog.user_id == user_id, models.FoodLog.date == log_date)
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.all()
+
+async def get_food_logs_range(
+    db: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    after: Optional[Tuple[date, int, int]] = None,
+    limit: int = 100,
+):
+    """See crud.get_food_logs_range."""
+    query = (
+        select(models.FoodLog)
+        .options(joinedload(models.FoodLog.food))
+        .where(
+            models.FoodLog.user_id == user_id,
+            models.FoodLog.date >= start,
+            models.FoodLog.date <= end,
+        )
+    )
+    if after is not None:
+        query = query.where(
+            tuple_(models.FoodLog.date, models.FoodLog.timestamp, models.FoodLog.id) > tuple_(*after)
+        )
+    result = await db.scalars(
+        query
+        .order_by(models.FoodLog.date, models.FoodLog.timestamp, models.FoodLog.id)
+        .limit(limit)
+    )
+    return result.all()
+
+async def get_food_log_rows(db: AsyncSession, user_id: int, log_date: date, skip: int = 0, limit: int = 100) -> List[dict]:
+    """get_food_logs as schemas.FoodLogRow dicts read from columns."""
+    result = await db.execute(
+        _food_log_row_query()
+        .where(models.FoodLog.user_id == user_id, models.FoodLog.date == log_date)
+        .offset(skip)
+        .limit(limit)
+    )
+    return _food_log_rows(result)
+
+async def get_food_log_rows_range(
+    db: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    after: Optional[Tuple[date, int, int]] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """get_food_logs_range as schemas.FoodLogRow dicts read from columns."""
+    query = _food_log_row_query().where(
+        models.FoodLog.user_id == user_id,
+        models.FoodLog.date >= start,
+        models.FoodLog.date <= end,
+    )
+    if after is not None:
+        query = query.where(
+            tuple_(models.FoodLog.date, models.FoodLog.timestamp, models.FoodLog.id) > tuple_(*after)
+        )
+    result = await db.execute(
+        query
+        .order_by(models.FoodLog.date, models.FoodLog.timestamp, models.FoodLog.id)
+        .limit(limit)
+    )
+    return _food_log_rows(result)
+
+async def _delete_food_log(db: AsyncSession, log_id: int, user_id: int):
+    db_log = await db.scalar(
+        select(models.FoodLog)
+        .options(joinedload(models.FoodLog.food))
+        .where(models.FoodLog.id == log_id, models.FoodLog.user_id == user_id)
+    )
+    if db_log:
+        food = db_log.food
+        if food:
+            await adjust_daily_summary(
+                db, user_id, db_log.date,
+                calories=-food.calories * db_log.servings,
+                protein=-(food.protein or 0) * db_log.servings,
+                carbs=-(food.carbs or 0) * db_log.servings,
+                fat=-(food.fat or 0) * db_log.servings,
+                log_count=-1,
+            )
+        await db.delete(db_log)
+        await versions.bump_async(db, versions.FOODLOGS, [user_id])
+        await db.flush()
+        return True
+    return False
+
+async def delete_food_log(log_id: int, user_id: int):
+    return await writer.run(_delete_food_log, log_id, user_id)
+
+# --- WeightLog CRUD ---
+async def _add_weight_log(db: AsyncSession, log: schemas.WeightLogCreate, user_id: int):
+    db_log = models.WeightLog(
+        date=log.log_date,
+        weight=log.weight,
+        user_id=user_id,
+        timestamp=int(time.time())
+    )
+    db.add(db_log)
+    await versions.bump_async(db, versions.WEIGHTLOGS, [user_id])
+    await db.flush()
+    return db_log
+
+async def log_weight(log: schemas.WeightLogCreate, user_id: int):
+    db_log = await writer.run(_add_weight_log, log, user_id)
+    # Only once it's committed
+    weight_trend.log_added(user_id, db_log.date, db_log.weight)
+    return db_log
+
+async def get_weight_logs(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100):
+    result = await db.scalars(
+        select(models.WeightLog)
+        .where(models.WeightLog.user_id == user_id)
+        .order_by(models.WeightLog.date.desc(), models.WeightLog.timestamp.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.all()
+
+async def _delete_weight_log(db: AsyncSession, log_id: int, user_id: int):
+    """The deleted log's (date, weight), or None if there was none."""
+    db_log = await db.scalar(
+        select(models.WeightLog).where(models.WeightLog.id == log_id, models.WeightLog.user_id == user_id)
+    )
+    if db_log is None:
+        return None
+    await db.delete(db_log)
+    await versions.bump_async(db, versions.WEIGHTLOGS, [user_id])
+    await db.flush()
+    return db_log.date, db_log.weight
+
+async def get_weight_log_rows(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100) -> List[dict]:
+    """get_weight_logs as schemas.WeightLogRow dicts read from columns."""
+    result = await db.execute(
+        select(
+            models.WeightLog.date,
+            models.WeightLog.weight,
+            models.WeightLog.id,
+            models.WeightLog.user_id,
+            models.WeightLog.timestamp,
+        )
+        .where(models.WeightLog.user_id == user_id)
+        .order_by(models.WeightLog.date.desc(), models.WeightLog.timestamp.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return [
+        {"log_date": log_date, "weight": weight, "id": log_id, "user_id": user_id, "timestamp": timestamp}
+        for log_date, weight, log_id, user_id, timestamp in result
+    ]
+
+async def delete_weight_log(log_id: int, user_id: int):
+    deleted = await writer.run(_delete_weight_log, log_id, user_id)
+    if deleted is None:
+        return False
+    weight_trend.log_removed(user_id, *deleted)
+    return True
+
+# --- Goal CRUD ---
+async def create_or_update_user_goal(db: AsyncSession, goal: schemas.GoalCreate, user_id: int):
+    db_goal = await get_user_goal(db, user_id)
+    if db_goal:
+        # existing goal
+        for key, value in goal.model_dump().items():
+            setattr(db_goal, key, value)
+    else:
+        # new goal
+        db_goal = models.Goal(**goal.model_dump(), user_id=user_id)
+        db.add(db_goal)
+    await versions.bump_async(db, versions.GOALS, [user_id])
+    await db.commit()
+    return db_goal
+
+async def get_user_goal(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.Goal).where(models.Goal.user_id == user_id))
@@ -1,17 +1,159 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from .core.config import settings
+from .core.instrumentation import instrument_engine
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./chunklog.db"
+SQLALCHEMY_DATABASE_URL = settings.get("DATABASE_URL", "sqlite:///./chunklog.db")
+# Same database through aiosqlite, for the async request path
+ASYNC_DATABASE_URL = settings.get("ASYNC_DATABASE_URL") or SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 
-engine = create_engine(
+# development: SQLite's defaults, reads and writes share one pool.
+# production: WAL so readers and the writer don't block each other,
+# synchronous=NORMAL, mmap and a larger page cache; reads get their own pool.
+# SQLite still takes one writer at a time, and three engines write: request
+# sessions queue for the async write pool (one connection), food and weight
+# log writes go through the group commit writer's connection, and the sync
+# engine serves bulk imports, the goal recalculator and jobs. Across engines
+# a writer waits on SQLite's lock for up to SQLITE_BUSY_TIMEOUT_MS.
+DATABASE_PROFILE = settings.get("DATABASE_PROFILE", "development")
+_PRODUCTION = DATABASE_PROFILE == "production"
+
+# Connections per pool; a read pool of 0 sends reads through the writer
+DATABASE_READ_POOL_SIZE = int(settings.get("DATABASE_READ_POOL_SIZE", 8 if _PRODUCTION else 0))
+DATABASE_WRITE_POOL_SIZE = int(settings.get("DATABASE_WRITE_POOL_SIZE", 1 if _PRODUCTION else 15))
+# Bring the schema up to date when the app starts (see migrations.bootstrap)
+DATABASE_AUTO_MIGRATE = settings.get_bool("DATABASE_AUTO_MIGRATE", not _PRODUCTION)
+SQLITE_BUSY_TIMEOUT_MS = int(settings.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_SIZE = int(settings.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(settings.get("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+# synchronous level of the group commit writer's connection: full fsyncs
+# every group commit, normal (WAL) can lose the last commits on power loss
+# but never corrupts, off leaves flushing to the OS. Empty: the profile's.
+WRITE_DURABILITY = settings.get("WRITE_DURABILITY", "").upper()
+
+
+def sqlite_pragmas(readonly: bool = False, synchronous: str = "") -> list:
+    """PRAGMAs run on every new connection for the current profile."""
+    pragmas = [f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}"]
+    if _PRODUCTION:
+        if not readonly:
+            # Persistent in the file; readers pick it up from there
+            pragmas.append("PRAGMA journal_mode = WAL")
+        pragmas += [
+            "PRAGMA synchronous = NORMAL",
+            f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+            f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+    if readonly:
+        # A write through a read session fails instead of taking the write lock
+        pragmas.append("PRAGMA query_only = ON")
+    if synchronous:
+        pragmas.append(f"PRAGMA synchronous = {synchronous}")
+    return pragmas
+
+
+def _configure(engine: Engine, readonly: bool = False, synchronous: str = "") -> Engine:
+    instrument_engine(engine)
+    if engine.dialect.name != "sqlite":
+        return engine
+    pragmas = sqlite_pragmas(readonly, synchronous)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+def _begin_immediate(engine: Engine) -> Engine:
+    """
+    Emit BEGIN IMMEDIATE from SQLAlchemy instead of relying on pysqlite's
+    implicit BEGIN, which breaks SAVEPOINTs. The write lock is taken when
+    the transaction starts, so it can't fail to upgrade halfway through.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def _disable_implicit_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def _pool_args(url: str, size: int) -> dict:
+    # In-memory databases use a single shared connection, not a sized pool
+    return {} if ":memory:" in url else {"pool_size": size, "max_overflow": 0}
+
+
+engine = _configure(create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+))
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args(ASYNC_DATABASE_URL, DATABASE_WRITE_POOL_SIZE))
+_configure(async_engine.sync_engine)
+
+if DATABASE_READ_POOL_SIZE > 0:
+    read_engine = _configure(create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        **_pool_args(SQLALCHEMY_DATABASE_URL, DATABASE_READ_POOL_SIZE),
+    ), readonly=True)
+    async_read_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args(ASYNC_DATABASE_URL, DATABASE_READ_POOL_SIZE))
+    _configure(async_read_engine.sync_engine, readonly=True)
+else:
+    read_engine, async_read_engine = engine, async_engine
+
+# The group commit writer's own connection (group_commit.py)
+group_commit_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args(ASYNC_DATABASE_URL, 1))
+_configure(group_commit_engine.sync_engine, synchronous=WRITE_DURABILITY)
+_begin_immediate(group_commit_engine.sync_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Objects stay readable after commit; lazy loads can't run in async code,
+# so relationships a response needs are loaded up front
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+GroupCommitSessionLocal = async_sessionmaker(group_commit_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Session for routes that only read; never blocks on or behind writes in WAL mode."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def dispose():
+    await async_engine.dispose()
+    await group_commit_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
@@ -0,0 +1,118 @@
+"""
+Streaming account export.
+
+Rows are read through a streaming cursor (yield_per) as plain tuples and
+encoded incrementally into ~64KB chunks, so memory use doesn't depend on how
+many logs a user has.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date
+from typing import Iterable, Iterator, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+
+FETCH_SIZE = 2000
+CHUNK_BYTES = 64 * 1024
+
+FOOD_LOG_COLUMNS = [
+    "id", "date", "timestamp", "servings",
+    "food_id", "name", "calories", "protein", "carbs", "fat", "external_id", "source",
+]
+WEIGHT_LOG_COLUMNS = ["id", "date", "timestamp", "weight"]
+GOAL_COLUMNS = [
+    "goal_type", "target_weight", "target_calories", "target_protein", "target_carbs", "target_fat",
+]
+
+
+def _stream(db: Session, stmt) -> Iterator[tuple]:
+    result = db.execute(stmt.execution_options(yield_per=FETCH_SIZE, stream_results=True))
+    try:
+        for row in result:
+            yield tuple(row)
+    finally:
+        result.close()
+
+
+def food_log_rows(db: Session, user_id: int) -> Iterator[tuple]:
+    log, food = models.FoodLog, models.Food
+    stmt = (
+        select(
+            log.id, log.date, log.timestamp, log.servings,
+            food.id, food.name, food.calories, food.protein, food.carbs, food.fat,
+            food.external_id, food.source,
+        )
+        .join(food, food.id == log.food_id)
+        .where(log.user_id == user_id)
+        .order_by(log.date, log.timestamp, log.id)
+    )
+    return _stream(db, stmt)
+
+
+def weight_log_rows(db: Session, user_id: int) -> Iterator[tuple]:
+    log = models.WeightLog
+    stmt = (
+        select(log.id, log.date, log.timestamp, log.weight)
+        .where(log.user_id == user_id)
+        .order_by(log.date, log.timestamp, log.id)
+    )
+    return _stream(db, stmt)
+
+
+def goal_rows(db: Session, user_id: int) -> Iterator[tuple]:
+    goal = models.Goal
+    stmt = select(
+        goal.goal_type, goal.target_weight, goal.target_calories,
+        goal.target_protein, goal.target_carbs, goal.target_fat,
+    ).where(goal.user_id == user_id)
+    for row in _stream(db, stmt):
+        yield (row[0].value if row[0] else None,) + row[1:]
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_csv(columns: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def encode_ndjson(sections: Iterable[Tuple[str, List[str], Iterable[tuple]]]) -> Iterator[bytes]:
+    """One JSON object per line, tagged with the record type it came from."""
+    parts = []
+    size = 0
+    for record_type, columns, rows in sections:
+        for row in rows:
+            record = dict(zip(columns, row))
+            record["type"] = record_type
+            line = json.dumps(record, default=_json_default) + "\n"
+            parts.append(line)
+            size += len(line)
+            if size >= CHUNK_BYTES:
+                yield "".join(parts).encode()
+                parts = []
+                size = 0
+    yield "".join(parts).encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
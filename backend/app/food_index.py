@@ -0,0 +1,82 @@
+import re
+from typing import Optional
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.engine import Engine
+
+# SQLite FTS5 index over food names. It uses the foods table as external
+# content, so it only stores the index; triggers keep it in sync with every
+# insert, update and delete, whether it comes from the ORM or raw SQL.
+# owner_id is indexed as a token so searches are scoped by the index itself.
+FTS_TABLE = "foods_fts"
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name,
+        owner_id,
+        content='foods',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS foods_fts_ai AFTER INSERT ON foods BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, owner_id) VALUES (new.id, new.name, new.owner_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS foods_fts_ad AFTER DELETE ON foods BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, owner_id) VALUES ('delete', old.id, old.name, old.owner_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS foods_fts_au AFTER UPDATE OF name, owner_id ON foods BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, owner_id) VALUES ('delete', old.id, old.name, old.owner_id);
+        INSERT INTO {FTS_TABLE}(rowid, name, owner_id) VALUES (new.id, new.name, new.owner_id);
+    END
+    """,
+]
+
+fts = table(FTS_TABLE, column("rowid"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# bm25 weights per column: rank by name only, owner_id is just a filter
+rank = func.bm25(literal_column(FTS_TABLE), 1.0, 0.0)
+
+
+def is_supported(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+def create(engine: Engine):
+    """Create the index and its triggers if missing, indexing any existing foods."""
+    if not is_supported(engine):
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        for statement in _DDL:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(search_term: str, user_id: int) -> Optional[str]:
+    """
+    FTS5 query matching foods of `user_id` whose name has a word starting
+    with each word of `search_term`. None if the term has no words.
+    """
+    tokens = _TOKEN_RE.findall(search_term.lower())
+    if not tokens:
+        return None
+    terms = " ".join(f'name:"{token}"*' for token in tokens)
+    return f'owner_id:"{int(user_id)}" {terms}'
+
+
+def match(match_query: str):
+    """WHERE clause for a query built by build_match_query."""
+    return literal_column(FTS_TABLE).op("MATCH")(match_query)
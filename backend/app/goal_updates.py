@@ -0,0 +1,228 @@
+"""
+Goal target calculation and deferred recalculation.
+
+calculate_targets is a pure function of the user's profile and weight.
+Writes that change its inputs (weigh-ins, profile edits, imports) don't
+recompute the goal themselves: they call schedule(user_id), and a background
+worker recomputes it GOAL_RECALC_DELAY seconds later in its own transaction.
+Schedules for a user that already has a recompute pending are folded into
+it, so a burst of weigh-ins costs one recompute.
+
+A recompute always reads the current profile and latest weight, so the
+newest write wins whatever order they arrive in. Reads that need the goal
+call flush(user_id) first, which runs a pending recompute inline (or waits
+for a running one) so they never see targets older than the last write.
+"""
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Optional, Set
+from sqlalchemy.orm import Session
+from . import models, versions
+from .database import SessionLocal
+from .core.config import settings
+
+GOAL_RECALC_DELAY = float(settings.get("GOAL_RECALC_DELAY", 0.5))
+
+ACTIVITY_MULTIPLIERS = {
+    models.ActivityLevel.SEDENTARY: 1.2,
+    models.ActivityLevel.LIGHT: 1.375,
+    models.ActivityLevel.MODERATE: 1.55,
+    models.ActivityLevel.ACTIVE: 1.725,
+    models.ActivityLevel.VERY_ACTIVE: 1.9,
+}
+
+# Added to TDEE for the daily calorie target
+CALORIE_ADJUSTMENTS = {
+    models.GoalType.WEIGHT_LOSS: -500,
+    models.GoalType.MAINTENANCE: 0,
+    models.GoalType.MUSCLE_GROWTH: 300,
+}
+
+# target -> (share of calories, kcal per gram)
+MACRO_SPLIT = {
+    "target_carbs": (0.40, 4),
+    "target_protein": (0.30, 4),
+    "target_fat": (0.30, 9),
+}
+
+
+class IncompleteProfile(ValueError):
+    pass
+
+
+def calculate_targets(
+    goal_type: models.GoalType,
+    weight_kg: Optional[float],
+    height_cm: Optional[float],
+    gender: Optional[models.Gender],
+    date_of_birth: Optional[date],
+    activity_level: models.ActivityLevel,
+    today: date,
+) -> dict:
+    """
+    Daily calorie and macro targets (Mifflin-St Jeor BMR times activity level,
+    adjusted for the goal type). Raises IncompleteProfile if an input is missing.
+    """
+    if not all([date_of_birth, gender, height_cm]):
+        raise IncompleteProfile("User profile is incomplete. Please provide date of birth, gender, and height.")
+    if weight_kg is None:
+        raise IncompleteProfile("No weight logged. Please log your weight at least once.")
+
+    age = (today - date_of_birth).days // 365
+    if gender.value == "male":
+        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
+    else: # FEMALE
+        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) - 161
+    tdee = bmr * ACTIVITY_MULTIPLIERS[activity_level]
+    target_calories = tdee + CALORIE_ADJUSTMENTS[goal_type]
+
+    targets = {"target_calories": round(target_calories)}
+    for key, (share, kcal_per_gram) in MACRO_SPLIT.items():
+        targets[key] = round((target_calories * share) / kcal_per_gram)
+    return targets
+
+
+def latest_weight(db: Session, user_id: int) -> Optional[float]:
+    row = (
+        db.query(models.WeightLog.weight)
+        .filter(models.WeightLog.user_id == user_id)
+        .order_by(models.WeightLog.date.desc(), models.WeightLog.timestamp.desc(), models.WeightLog.id.desc())
+        .first()
+    )
+    return row[0] if row else None
+
+
+def targets_for_user(db: Session, user: models.User, goal_type: models.GoalType) -> dict:
+    return calculate_targets(
+        goal_type=goal_type,
+        weight_kg=latest_weight(db, user.id),
+        height_cm=user.height_cm,
+        gender=user.gender,
+        date_of_birth=user.date_of_birth,
+        activity_level=user.activity_level,
+        today=date.today(),
+    )
+
+
+def recalculate(db: Session, user_id: int) -> bool:
+    """Refresh the targets of the user's goal from current data. False if there was nothing to update."""
+    goal = db.query(models.Goal).filter(models.Goal.user_id == user_id).first()
+    user = db.get(models.User, user_id)
+    if goal is None or goal.goal_type is None or user is None:
+        return False
+    try:
+        targets = targets_for_user(db, user, goal.goal_type)
+    except IncompleteProfile:
+        # Keep the current targets until the profile or weight is filled in
+        return False
+    for key, value in targets.items():
+        setattr(goal, key, value)
+    versions.bump(db, versions.GOALS, [user_id])
+    db.commit()
+    return True
+
+
+class GoalRecalculator:
+    """
+    Coalescing background scheduler for goal recalculation.
+
+    Args:
+        session_factory: Creates the session each recompute runs in
+        delay: Seconds a recompute waits for further updates to fold in
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], delay: float = GOAL_RECALC_DELAY):
+        self.session_factory = session_factory
+        self.delay = delay
+        # user_id -> monotonic time the recompute is due
+        self._pending: Dict[int, float] = {}
+        self._running: Set[int] = set()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.scheduled = 0
+        self.coalesced = 0
+        self.recomputed = 0
+        self.failed = 0
+
+    def schedule(self, user_id: int):
+        with self._cond:
+            self.scheduled += 1
+            if user_id in self._pending:
+                # Keep the earlier due time so a steady stream of updates can't postpone it forever
+                self.coalesced += 1
+                return
+            self._pending[user_id] = time.monotonic() + self.delay
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="goal-recalculator", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, user_id: int):
+        """Bring the user's goal up to date before returning."""
+        with self._cond:
+            while user_id in self._running:
+                self._cond.wait()
+            if self._pending.pop(user_id, None) is None:
+                return
+            self._running.add(user_id)
+        self._recompute([user_id])
+
+    def stop(self, timeout: float = 10.0):
+        """Run everything still pending and stop the worker."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    # Users being recomputed by a flush wait for it to finish
+                    waiting = {user_id: at for user_id, at in self._pending.items() if user_id not in self._running}
+                    due = [user_id for user_id, at in waiting.items() if at <= now or self._stopping]
+                    if due:
+                        break
+                    if self._stopping and not self._pending:
+                        return
+                    self._cond.wait(max(0.0, min(waiting.values()) - now) if waiting else None)
+                for user_id in due:
+                    del self._pending[user_id]
+                self._running.update(due)
+            self._recompute(due)
+
+    def _recompute(self, user_ids):
+        for user_id in user_ids:
+            db = self.session_factory()
+            try:
+                recalculate(db, user_id)
+                self.recomputed += 1
+            except Exception as e:
+                db.rollback()
+                self.failed += 1
+                print(f"Goal recalculation failed for user {user_id}: {e}")
+            finally:
+                db.close()
+                with self._cond:
+                    self._running.discard(user_id)
+                    self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": self.scheduled,
+            "coalesced": self.coalesced,
+            "recomputed": self.recomputed,
+            "failed": self.failed,
+            "pending": len(self._pending),
+        }
+
+
+recalculator = GoalRecalculator(SessionLocal)
@@ -0,0 +1,170 @@
+"""
+Group commit for high-frequency writes.
+
+Each write (a food or weight log, a new food, a log delete) is an op: an
+async function that takes a session, adds or deletes rows and returns its
+result without committing. run(op, ...) queues it and waits; a single
+writer task takes whatever is queued (up to GROUP_COMMIT_MAX_BATCH ops),
+runs them all in one transaction and commits once, so a burst of writes
+costs one fsync instead of one each. Writes arriving during a commit make
+up the next group; GROUP_COMMIT_DELAY_MS additionally holds a group open
+for more to join, trading latency for larger groups.
+
+Every op runs in its own SAVEPOINT: one that raises is rolled back alone and
+its caller gets the exception, the rest of the group still commits. Callers
+are only answered after the commit, so an id returned is durable to the
+level WRITE_DURABILITY (database.py) sets. If the commit itself fails every
+op in the group gets the error.
+
+GROUP_COMMIT_MAX_BATCH=1 commits every op on its own, as before.
+"""
+import asyncio
+import contextvars
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import GroupCommitSessionLocal
+from .core.config import settings
+
+GROUP_COMMIT_DELAY_MS = float(settings.get("GROUP_COMMIT_DELAY_MS", 0))
+GROUP_COMMIT_MAX_BATCH = int(settings.get("GROUP_COMMIT_MAX_BATCH", 256))
+
+Op = Callable[..., Awaitable]
+
+
+class GroupCommitWriter:
+    """
+    Batches queued ops into shared transactions on one connection.
+
+    Args:
+        session_factory: Creates the session each group runs in
+        delay: Seconds the first op of a group waits for others to join
+        max_batch: Most ops committed in one transaction
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        delay: float = GROUP_COMMIT_DELAY_MS / 1000,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ):
+        self.session_factory = session_factory
+        self.delay = delay
+        self.max_batch = max(1, max_batch)
+        self._pending: Deque[Tuple[Op, tuple, dict, asyncio.Future]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.groups = 0
+        self.largest_group = 0
+
+    async def run(self, op: Op, *args, **kwargs):
+        """Run op(session, *args, **kwargs) in the next group and return its result once committed."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._pending.append((op, args, kwargs, future))
+        self.submitted += 1
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        # First write, or the app is now running on another event loop
+        self._loop = loop
+        self._pending.clear()
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._stopping = False
+        # In a fresh context rather than the request that happened to start it,
+        # so the writes of every request aren't counted against that one
+        self._task = contextvars.Context().run(loop.create_task, self._run())
+
+    async def stop(self):
+        """Commit everything still queued and stop the writer task."""
+        task = self._task
+        if task is None or task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if len(self._pending) < self.max_batch and self.delay > 0 and not self._stopping:
+                # Let concurrent writes join the group
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.delay)
+                except asyncio.TimeoutError:
+                    pass
+            group = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            await self._commit(group)
+
+    async def _commit(self, group):
+        results = []
+        try:
+            async with self.session_factory() as db:
+                for op, args, kwargs, future in group:
+                    if future.done():
+                        # The caller went away before its op ran
+                        continue
+                    try:
+                        async with db.begin_nested():
+                            result = await op(db, *args, **kwargs)
+                    except Exception as e:
+                        results.append((future, False, e))
+                    else:
+                        results.append((future, True, result))
+                await db.commit()
+        except Exception as e:
+            print(f"Group commit of {len(group)} writes failed: {e}")
+            self.failed += len(group)
+            for _, _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.groups += 1
+        self.largest_group = max(self.largest_group, len(group))
+        for future, ok, value in results:
+            if ok:
+                self.committed += 1
+            else:
+                self.failed += 1
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "committed": self.committed,
+            "failed": self.failed,
+            "groups": self.groups,
+            "mean_group": round(self.committed / self.groups, 2) if self.groups else 0,
+            "largest_group": self.largest_group,
+            "pending": len(self._pending),
+        }
+
+
+writer = GroupCommitWriter(GroupCommitSessionLocal)
@@ -0,0 +1,90 @@
+"""
+Merge duplicate foods left behind by logging the same external item repeatedly.
+
+    python -m backend.app.jobs.compact_foods [--batch-size 1000] [--dry-run]
+
+Foods of the same owner with identical name and nutrition are merged into one:
+the copy linked to an external id if there is one, otherwise the oldest. Logs
+are repointed to it and the copies deleted, one batch per transaction.
+"""
+import argparse
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .. import versions
+from ..database import engine
+
+_FIND_DUPLICATES = """
+CREATE TEMP TABLE food_merge AS
+SELECT id, keep_id FROM (
+    SELECT
+        id,
+        FIRST_VALUE(id) OVER (
+            PARTITION BY owner_id, name, calories, protein, carbs, fat
+            ORDER BY external_id IS NULL, id
+        ) AS keep_id
+    FROM foods
+)
+WHERE id != keep_id
+"""
+
+
+def compact(conn: Connection, batch_size: int = 1000, dry_run: bool = False) -> int:
+    """Merge duplicate foods and return how many were removed."""
+    conn.execute(text("DROP TABLE IF EXISTS temp.food_merge"))
+    conn.execute(text(_FIND_DUPLICATES))
+    conn.execute(text("CREATE INDEX temp.ix_food_merge_id ON food_merge (id)"))
+    total = conn.execute(text("SELECT COUNT(*) FROM food_merge")).scalar()
+    conn.commit()
+    if dry_run or not total:
+        return total
+
+    last_id = 0
+    merged = 0
+    while True:
+        ids = conn.execute(
+            text("SELECT id FROM food_merge WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": batch_size},
+        ).scalars().all()
+        if not ids:
+            break
+
+        params = {f"id{i}": food_id for i, food_id in enumerate(ids)}
+        id_list = ", ".join(f":id{i}" for i in range(len(ids)))
+        # Their logs' food changes
+        owners = conn.execute(
+            text(f"SELECT DISTINCT user_id FROM food_logs WHERE food_id IN ({id_list})"), params
+        ).scalars().all()
+        versions.bump(conn, versions.FOODLOGS, owners)
+        conn.execute(
+            text(
+                "UPDATE food_logs SET food_id = "
+                "(SELECT keep_id FROM food_merge WHERE food_merge.id = food_logs.food_id) "
+                f"WHERE food_id IN ({id_list})"
+            ),
+            params,
+        )
+        conn.execute(text(f"DELETE FROM foods WHERE id IN ({id_list})"), params)
+        conn.commit()
+
+        merged += len(ids)
+        last_id = ids[-1]
+        print(f"Merged {merged}/{total} duplicate foods")
+
+    conn.execute(text("DROP TABLE temp.food_merge"))
+    conn.commit()
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the duplicates")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        count = compact(conn, args.batch_size, args.dry_run)
+    print(f"{count} duplicate foods {'found' if args.dry_run else 'merged'}")
+
+
+if __name__ == "__main__":
+    main()
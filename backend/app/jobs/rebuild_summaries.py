@@ -0,0 +1,81 @@
+"""
+Recompute the daily nutrition summary table from the food logs.
+
+    python -m backend.app.jobs.rebuild_summaries            # rebuild from scratch
+    python -m backend.app.jobs.rebuild_summaries --verify   # only report drift
+
+--verify exits with status 1 if any stored day differs from its logs.
+"""
+import argparse
+import sys
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from ..database import engine
+
+_COMPUTED = """
+SELECT
+    l.user_id AS user_id,
+    l.date AS date,
+    SUM(f.calories * l.servings) AS calories,
+    SUM(COALESCE(f.protein, 0) * l.servings) AS protein,
+    SUM(COALESCE(f.carbs, 0) * l.servings) AS carbs,
+    SUM(COALESCE(f.fat, 0) * l.servings) AS fat,
+    COUNT(*) AS log_count
+FROM food_logs l
+JOIN foods f ON f.id = l.food_id
+GROUP BY l.user_id, l.date
+"""
+
+# Days whose stored totals are missing, extra, or off by more than rounding
+_DRIFT = f"""
+WITH computed AS ({_COMPUTED})
+SELECT c.user_id, c.date FROM computed c
+LEFT JOIN daily_nutrition_summary s ON s.user_id = c.user_id AND s.date = c.date
+WHERE s.user_id IS NULL
+    OR s.log_count != c.log_count
+    OR ABS(s.calories - c.calories) > 0.01
+    OR ABS(s.protein - c.protein) > 0.01
+    OR ABS(s.carbs - c.carbs) > 0.01
+    OR ABS(s.fat - c.fat) > 0.01
+UNION ALL
+SELECT s.user_id, s.date FROM daily_nutrition_summary s
+LEFT JOIN computed c ON c.user_id = s.user_id AND c.date = s.date
+WHERE c.user_id IS NULL
+"""
+
+
+def rebuild(conn: Connection) -> int:
+    """Replace every summary row with totals computed from the logs. Returns the row count."""
+    conn.execute(text("DELETE FROM daily_nutrition_summary"))
+    result = conn.execute(text(
+        "INSERT INTO daily_nutrition_summary (user_id, date, calories, protein, carbs, fat, log_count) "
+        f"SELECT user_id, date, calories, protein, carbs, fat, log_count FROM ({_COMPUTED})"
+    ))
+    return result.rowcount
+
+
+def find_drift(conn: Connection) -> list:
+    """(user_id, date) of every summary row that doesn't match the logs."""
+    return conn.execute(text(_DRIFT)).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verify", action="store_true", help="Compare without writing")
+    args = parser.parse_args()
+
+    if args.verify:
+        with engine.connect() as conn:
+            drift = find_drift(conn)
+        for user_id, day in drift[:20]:
+            print(f"Mismatch: user {user_id} on {day}")
+        print(f"{len(drift)} days differ from their logs")
+        sys.exit(1 if drift else 0)
+
+    with engine.begin() as conn:
+        count = rebuild(conn)
+    print(f"Rebuilt {count} daily summaries")
+
+
+if __name__ == "__main__":
+    main()
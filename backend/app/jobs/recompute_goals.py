@@ -0,0 +1,213 @@
+"""
+Recompute every user's goal targets, e.g. after changing the activity
+multipliers or macro split in goal_updates.
+
+    python -m backend.app.jobs.recompute_goals [--chunk-size 50000] [--dry-run]
+    python -m backend.app.jobs.recompute_goals --check   # compare with the per-user path
+
+Users with a goal are read in user_id order together with their latest
+weigh-in, one chunk at a time. Targets are computed for the whole chunk with
+NumPy, using the same formula, constants and operation order as
+goal_updates.calculate_targets so the results are identical, and only goals
+whose targets changed are written back, one upsert per chunk. Users with an
+incomplete profile or no weigh-in keep their targets, as in the per-user path.
+
+--check computes both ways for every user without writing and exits with
+status 1 if any target differs.
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from typing import Optional
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .. import goal_updates, models, versions
+from ..database import engine
+
+TARGETS = ["target_calories"] + list(goal_updates.MACRO_SPLIT)
+
+_CHUNK = """
+SELECT
+    g.user_id, g.goal_type, g.target_calories, g.target_carbs, g.target_protein, g.target_fat,
+    u.gender, u.height_cm, u.date_of_birth, u.activity_level,
+    (
+        SELECT w.weight FROM weight_logs w
+        WHERE w.user_id = g.user_id
+        ORDER BY w.date DESC, w.timestamp DESC, w.id DESC
+        LIMIT 1
+    ) AS weight
+FROM goals g
+JOIN users u ON u.id = g.user_id
+WHERE g.user_id > :after AND g.goal_type IS NOT NULL
+ORDER BY g.user_id
+LIMIT :limit
+"""
+
+_UPSERT = """
+INSERT INTO goals (user_id, goal_type, target_calories, target_carbs, target_protein, target_fat)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    target_calories = excluded.target_calories,
+    target_carbs = excluded.target_carbs,
+    target_protein = excluded.target_protein,
+    target_fat = excluded.target_fat
+"""
+
+
+def _lookup(mapping: dict, stored: np.ndarray) -> np.ndarray:
+    """Map enum names as stored by SQLAlchemy to `mapping` values; NaN where missing."""
+    table = {member.name: float(value) for member, value in mapping.items()}
+    return np.array([table.get(name, np.nan) for name in stored], dtype=float)
+
+
+def compute_targets(columns: dict, today: date) -> dict:
+    """
+    Targets for a chunk of users. `columns` holds one array per column of the
+    chunk query. Returns the target arrays and `valid`, the rows that have
+    every input; other rows have NaN targets.
+    """
+    weight = columns["weight"].astype(float)
+    height = columns["height_cm"].astype(float)
+    date_of_birth = columns["date_of_birth"]
+    gender = columns["gender"]
+    multiplier = _lookup(goal_updates.ACTIVITY_MULTIPLIERS, columns["activity_level"])
+    adjustment = _lookup(goal_updates.CALORIE_ADJUSTMENTS, columns["goal_type"])
+
+    has_dob = np.not_equal(date_of_birth, None)
+    valid = (
+        has_dob
+        & np.not_equal(gender, None)
+        & ~np.isnan(height) & (height != 0)
+        & ~np.isnan(weight)
+        & ~np.isnan(multiplier)
+        & ~np.isnan(adjustment)
+    )
+
+    # Whole days since birth, as (today - date_of_birth).days
+    born = np.where(has_dob, date_of_birth, "1970-01-01").astype("datetime64[D]")
+    age = (np.datetime64(today, "D") - born).astype(np.int64) // 365
+
+    # Same operation order as calculate_targets, so float results match exactly
+    sex_offset = np.where(gender == models.Gender.MALE.name, 5, -161)
+    bmr = (10 * weight) + (6.25 * height) - (5 * age) + sex_offset
+    tdee = bmr * multiplier
+    target_calories = tdee + adjustment
+
+    targets = {"target_calories": np.round(target_calories)}
+    for key, (share, kcal_per_gram) in goal_updates.MACRO_SPLIT.items():
+        targets[key] = np.round((target_calories * share) / kcal_per_gram)
+    for key in TARGETS:
+        targets[key] = np.where(valid, targets[key], np.nan)
+    targets["valid"] = valid
+    return targets
+
+
+def _columns(rows: list, keys: list) -> dict:
+    transposed = list(zip(*rows))
+    columns = {}
+    for key, values in zip(keys, transposed):
+        if key in ("weight", "height_cm", "target_calories", "target_carbs", "target_protein", "target_fat"):
+            columns[key] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        else:
+            columns[key] = np.array(values, dtype=object)
+    return columns
+
+
+def _per_user(columns: dict, i: int, today: date) -> Optional[dict]:
+    """Targets for row `i` through the per-user path, None where it keeps the goal unchanged."""
+    def member(enum_type, name):
+        return enum_type[name] if name is not None else None
+    weight = columns["weight"][i]
+    height = columns["height_cm"][i]
+    try:
+        return goal_updates.calculate_targets(
+            goal_type=member(models.GoalType, columns["goal_type"][i]),
+            weight_kg=None if np.isnan(weight) else float(weight),
+            height_cm=None if np.isnan(height) else float(height),
+            gender=member(models.Gender, columns["gender"][i]),
+            date_of_birth=date.fromisoformat(columns["date_of_birth"][i]) if columns["date_of_birth"][i] else None,
+            activity_level=member(models.ActivityLevel, columns["activity_level"][i]),
+            today=today,
+        )
+    except (goal_updates.IncompleteProfile, KeyError):
+        return None
+
+
+def recompute(
+    conn: Connection,
+    chunk_size: int = 50000,
+    dry_run: bool = False,
+    check: bool = False,
+    today: Optional[date] = None,
+) -> dict:
+    """
+    Refresh the targets of every goal. Commits once per chunk. With `check`,
+    nothing is written and every row is compared with the per-user path.
+    Returns counts of users scanned, updated, skipped (incomplete) and mismatched.
+    """
+    today = today or date.today()
+    stats = {"scanned": 0, "updated": 0, "skipped": 0, "mismatched": 0}
+    after = 0
+    while True:
+        result = conn.execute(text(_CHUNK), {"after": after, "limit": chunk_size})
+        keys = list(result.keys())
+        rows = result.all()
+        if not rows:
+            break
+        after = rows[-1][0]
+        columns = _columns(rows, keys)
+        targets = compute_targets(columns, today)
+        valid = targets["valid"]
+
+        stats["scanned"] += len(rows)
+        stats["skipped"] += int((~valid).sum())
+
+        if check:
+            for i in range(len(rows)):
+                expected = _per_user(columns, i, today)
+                got = {key: float(targets[key][i]) for key in TARGETS} if valid[i] else None
+                if expected != got:
+                    stats["mismatched"] += 1
+                    if stats["mismatched"] <= 20:
+                        print(f"Mismatch for user {columns['user_id'][i]}: per-user {expected}, batch {got}")
+            continue
+
+        changed = valid & np.logical_or.reduce([targets[key] != columns[key] for key in TARGETS])
+        index = np.flatnonzero(changed)
+        stats["updated"] += len(index)
+        if len(index) and not dry_run:
+            conn.exec_driver_sql(_UPSERT, list(zip(
+                columns["user_id"][index].tolist(),
+                columns["goal_type"][index].tolist(),
+                *(targets[key][index].tolist() for key in TARGETS),
+            )))
+            versions.bump(conn, versions.GOALS, columns["user_id"][index].tolist())
+            conn.commit()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the goals that would change")
+    parser.add_argument("--check", action="store_true", help="Compare with the per-user calculation without writing")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        stats = recompute(conn, args.chunk_size, dry_run=args.dry_run, check=args.check)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{stats['scanned']} goals scanned, {stats['updated']} {'to update' if args.dry_run else 'updated'}, "
+        f"{stats['skipped']} skipped (incomplete profile or no weight) in {elapsed:.1f}s"
+    )
+    if args.check:
+        print(f"{stats['mismatched']} differ from the per-user calculation")
+        sys.exit(1 if stats["mismatched"] else 0)
+
+
+if __name__ == "__main__":
+    main()
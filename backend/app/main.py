@@ -1,18 +1,33 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine
-from .models import Base
-import os
-from dotenv import load_dotenv
-from .routers import users, foods, foodlogs, weightlogs, goals, auth
+from .database import DATABASE_AUTO_MIGRATE, dispose, engine
+from . import goal_updates, group_commit, migrations
+from .routers import users, foods, foodlogs, weightlogs, goals, auth, imports, export, series
+from .core.passwords import password_pool
+from .services import http_client
+from .core import metrics
+from .core.config import settings
+from .core.instrumentation import MetricsMiddleware
 
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Deploys run `python -m backend.app.migrations` once instead, so workers
+    # start without touching the database file
+    if DATABASE_AUTO_MIGRATE:
+        migrations.bootstrap(engine)
+    await http_client.startup()
+    password_pool.start()
+    yield
+    await http_client.shutdown()
+    password_pool.shutdown()
+    goal_updates.recalculator.stop()
+    await group_commit.writer.stop()
+    await dispose()
 
-Base.metadata.create_all(bind=engine)
+app = FastAPI(title="ChunkLog API", lifespan=lifespan)
 
-app = FastAPI(title="ChunkLog API")
-
-allowed_origins_str = os.getenv("ALLOWED_ORIGINS", "")
+allowed_origins_str = settings.get("ALLOWED_ORIGINS", "")
 origins = allowed_origins_str.split(",") if allowed_origins_str else []
 
 app.add_middleware(
@@ -23,13 +38,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency, status and database time by route, served at /metrics
+METRICS_ENABLED = settings.get_bool("METRICS_ENABLED", True)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(foods.router)
 app.include_router(foodlogs.router)
 app.include_router(weightlogs.router)
 app.include_router(goals.router)
+app.include_router(imports.router)
+app.include_router(export.router)
+app.include_router(series.router)
 
 @app.get("/")
 def root():
     return {"message": "ChunkLog API running!"}
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        """Prometheus text format; expose it to the scraper only, e.g. at the reverse proxy."""
+        return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
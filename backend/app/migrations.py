@@ -0,0 +1,61 @@
+"""
+Schema setup and upgrades.
+
+    python -m backend.app.migrations
+
+brings DATABASE_URL's database up to date: run it once per deploy, before
+starting the workers. Development servers run it on startup instead
+(DATABASE_AUTO_MIGRATE). Safe to run repeatedly.
+"""
+import argparse
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from . import food_index, models
+from .database import engine
+from .jobs import rebuild_summaries
+
+# Columns added to existing tables since they were first created, as
+# (table, column, DDL type). create_all only creates missing tables.
+ADDED_COLUMNS = [
+    ("foods", "external_id", "VARCHAR"),
+    ("foods", "source", "VARCHAR"),
+]
+
+
+def upgrade(engine: Engine):
+    """Bring an existing database up to date with the models. Safe to run repeatedly."""
+    had_summaries = inspect(engine).has_table(models.DailyNutritionSummary.__tablename__)
+    models.Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl_type in ADDED_COLUMNS:
+            existing = {col["name"] for col in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+        if not had_summaries:
+            # Backfill totals for logs written before the summary table existed
+            rebuild_summaries.rebuild(conn)
+
+    # create_all skips indexes on tables that already existed
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def bootstrap(engine: Engine):
+    """Everything the app needs from the database before serving: the schema and the food search index."""
+    upgrade(engine)
+    food_index.create(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    bootstrap(engine)
+    print(f"Database {engine.url.render_as_string(hide_password=True)} is up to date")
+
+
+if __name__ == "__main__":
+    main()
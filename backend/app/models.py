@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Enum, Index
 from sqlalchemy.orm import relationship, declarative_base
 import datetime
 import enum
@@ -39,6 +39,7 @@ class User(Base):
     weight_logs = relationship("WeightLog", back_populates="user", cascade="all, delete-orphan")
 
     goal = relationship("Goal", uselist=False, back_populates="user", cascade="all, delete-orphan")
+    daily_summaries = relationship("DailyNutritionSummary", cascade="all, delete-orphan")
 
 class Food(Base):
     __tablename__ = "foods"
@@ -53,8 +54,17 @@ class Food(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="foods")
 
+    # Set for foods that came from an external database (e.g. USDA fdcId),
+    # so logging the same item again reuses this row
+    external_id = Column(String, nullable=True)
+    source = Column(String, nullable=True)
+
     logs = relationship("FoodLog", back_populates="food", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_foods_owner_external", "owner_id", "source", "external_id", unique=True),
+    )
+
 
 class FoodLog(Base):
     __tablename__ = "food_logs"
@@ -70,6 +80,33 @@ class FoodLog(Base):
     user = relationship("User", back_populates="food_logs")
     food = relationship("Food", back_populates="logs")
 
+    __table_args__ = (
+        # Serves per-day lookups and keyset pagination over date ranges
+        Index("ix_food_logs_user_date", "user_id", "date", "timestamp", "id"),
+    )
+
+
+class DailyNutritionSummary(Base):
+    """Per-day totals of a user's food logs, kept up to date by the crud write functions."""
+    __tablename__ = "daily_nutrition_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    calories = Column(Float, nullable=False, default=0)
+    protein = Column(Float, nullable=False, default=0)
+    carbs = Column(Float, nullable=False, default=0)
+    fat = Column(Float, nullable=False, default=0)
+    log_count = Column(Integer, nullable=False, default=0)
+
+
+class DataVersion(Base):
+    """Counter of writes to one of a user's collections, served as its ETag (see versions.py)."""
+    __tablename__ = "data_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    collection = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 
 class WeightLog(Base):
     __tablename__ = "weight_logs"
@@ -82,6 +119,11 @@ class WeightLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="weight_logs")
 
+    __table_args__ = (
+        # Per-user history in date order, and the latest weigh-in
+        Index("ix_weight_logs_user_date", "user_id", "date", "timestamp", "id"),
+    )
+
 class Goal(Base):
     __tablename__ = "goals"
 
@@ -1,29 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from .. import crud, models
-from ..database import get_db
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud_async, models
+from ..database import AsyncSessionLocal, get_async_read_db
 from ..core import security
+from ..core.passwords import password_pool
 
 router = APIRouter(
     prefix="/auth",
     tags=["auth"],
 )
 
-@router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    login_identifier = form_data.username.lower()
-
+async def _find_user(db: AsyncSession, login_identifier: str):
     # Try to find by email first, then username
-    user = crud.get_user_by_email(db, login_identifier)
+    user = await crud_async.get_user_by_email(db, login_identifier)
     if not user:
-        user = db.query(models.User).filter(models.User.username == login_identifier).first()
+        user = await crud_async.get_user_by_username(db, login_identifier)
+    credentials = (user.id, user.hashed_password) if user else None
+    # Give the connection back to the pool while bcrypt runs
+    await db.close()
+    return credentials
+
+async def _save_hash(user_id: int, hashed_password: str):
+    # Looked up on a read session; the rare rehash takes a writer
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password))
+        await db.commit()
+
+@router.post("/login")
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_read_db)):
+    credentials = await _find_user(db, form_data.username.lower())
+    if not credentials:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    user_id, hashed_password = credentials
 
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = await password_pool.verify(form_data.password, hashed_password)
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # Stored with an outdated bcrypt cost
+        await _save_hash(user_id, new_hash)
 
-    access_token = security.create_access_token(data={"sub": str(user.id)})
-    refresh_token = security.create_refresh_token(data={"sub": str(user.id)})
+    access_token = security.create_access_token(data={"sub": str(user_id)})
+    refresh_token = security.create_refresh_token(data={"sub": str(user_id)})
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -36,7 +56,7 @@ class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
 @router.post("/refresh")
-def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+def refresh_token(request: RefreshTokenRequest):
     try:
         payload = security.verify_refresh_token(request.refresh_token)
         user_id = payload.get("sub")
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from .. import export
+from ..database import ReadSessionLocal
+from ..core import security
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"],
+)
+
+# collection -> (columns, row reader)
+COLLECTIONS = {
+    "foodlogs": (export.FOOD_LOG_COLUMNS, export.food_log_rows),
+    "weightlogs": (export.WEIGHT_LOG_COLUMNS, export.weight_log_rows),
+    "goals": (export.GOAL_COLUMNS, export.goal_rows),
+}
+
+def _stream_export(user_id: int, collections: list, format: str, gzip: bool):
+    # The response outlives the request's dependencies, so the generator
+    # uses its own session for as long as it is being read
+    db = ReadSessionLocal()
+    try:
+        if format == "csv":
+            columns, reader = COLLECTIONS[collections[0]]
+            chunks = export.encode_csv(columns, reader(db, user_id))
+        else:
+            chunks = export.encode_ndjson(
+                (name, COLLECTIONS[name][0], COLLECTIONS[name][1](db, user_id)) for name in collections
+            )
+        if gzip:
+            chunks = export.gzip_chunks(chunks)
+        yield from chunks
+    finally:
+        db.close()
+
+def _response(user_id: int, collections: list, filename: str, format: str, gzip: bool) -> StreamingResponse:
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{filename}.{format}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        _stream_export(user_id, collections, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/")
+def export_account(
+    gzip: bool = False,
+    current_user_id: int = Depends(security.get_current_user_id),
+):
+    """Everything in the account as NDJSON, one record per line with a `type` field."""
+    return _response(current_user_id, list(COLLECTIONS), "chunklog-export", "ndjson", gzip)
+
+@router.get("/{collection}")
+def export_collection(
+    collection: str,
+    format: str = "csv",
+    gzip: bool = False,
+    current_user_id: int = Depends(security.get_current_user_id),
+):
+    """One of foodlogs, weightlogs or goals as CSV (default) or NDJSON."""
+    if collection not in COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    return _response(current_user_id, [collection], collection, format, gzip)
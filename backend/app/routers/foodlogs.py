@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
-from .. import crud, schemas, models
-from ..database import get_db
-from ..core.security import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, timedelta
+from .. import crud_async, schemas, versions
+from ..database import get_async_read_db
+from ..core.responses import etag_matches, json_rows, not_modified, set_etag
+from ..core.security import get_current_user_id
 
 router = APIRouter(
     prefix="/foodlogs",
@@ -12,53 +13,91 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.FoodLogRead)
-def create_food_log(
+async def create_food_log(
     log: schemas.FoodLogCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    # Handle external food (from USDA database)
-    if log.food_id is None and log.external_food is not None:
-        # Create temporary food entry for this log
-        db_food = models.Food(
-            name=log.external_food.name,
-            calories=log.external_food.calories,
-            protein=log.external_food.protein,
-            carbs=log.external_food.carbs,
-            fat=log.external_food.fat,
-            owner_id=current_user.id
-        )
-        db.add(db_food)
-        db.commit()
-        db.refresh(db_food)
-        log.food_id = db_food.id
-    
-    # Validate food exists
-    if log.food_id is None:
+    # food_id, or an external food (from the USDA database) added with the log
+    if log.food_id is None and log.external_food is None:
         raise HTTPException(status_code=400, detail="Either food_id or external_food must be provided")
-    
-    db_food = db.query(models.Food).filter(models.Food.id == log.food_id).first()
-    if not db_food:
+
+    db_log = await crud_async.log_food(log=log, user_id=current_user_id)
+    if db_log is None:
         raise HTTPException(status_code=404, detail="Food not found")
-    
-    return crud.log_food(db=db, log=log, user_id=current_user.id)
+    return db_log
 
 @router.get("/", response_model=List[schemas.FoodLogRead])
-def read_food_logs(
+async def read_food_logs(
+    request: Request,
     log_date: date = date.today(),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    etag = await versions.etag(db, current_user_id, versions.FOODLOGS)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    rows = await crud_async.get_food_log_rows(db, user_id=current_user_id, log_date=log_date, skip=skip, limit=limit)
+    return set_etag(json_rows(schemas.food_log_rows, rows), etag)
+
+def _encode_cursor(row: dict) -> str:
+    return f"{row['log_date'].isoformat()}_{row['timestamp']}_{row['id']}"
+
+def _decode_cursor(cursor: str):
+    try:
+        log_date, timestamp, log_id = cursor.split("_")
+        return date.fromisoformat(log_date), int(timestamp), int(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/range", response_model=schemas.FoodLogPage)
+async def read_food_logs_range(
+    start: date,
+    end: date,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Food logs from start to end (inclusive), oldest first, one page at a time.
+    Follow next_cursor until it is null to read the whole range.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    rows = await crud_async.get_food_log_rows_range(
+        db, user_id=current_user_id, start=start, end=end, after=after, limit=limit
+    )
+    next_cursor = _encode_cursor(rows[-1]) if len(rows) == limit else None
+    return json_rows(schemas.food_log_page_rows, {"items": rows, "next_cursor": next_cursor})
+
+@router.get("/summary", response_model=List[schemas.DailyNutritionSummaryRead])
+async def read_daily_summaries(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    return crud.get_food_logs(db, user_id=current_user.id, log_date=log_date, skip=skip, limit=limit)
+    """Calorie and macro totals per day from start to end (both default to today), one row per day."""
+    start = start or date.today()
+    end = end or start
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days >= 366:
+        raise HTTPException(status_code=400, detail="Date range is limited to one year")
+
+    summaries = {
+        summary.date: summary
+        for summary in await crud_async.get_daily_summaries(db, user_id=current_user_id, start=start, end=end)
+    }
+    days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+    return [summaries.get(day) or schemas.DailyNutritionSummaryRead(date=day) for day in days]
 
 @router.delete("/{log_id}")
-def delete_food_log(
+async def delete_food_log(
     log_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    if crud.delete_food_log(db, log_id=log_id, user_id=current_user.id):
+    if await crud_async.delete_food_log(log_id=log_id, user_id=current_user_id):
         return {"message": "Food log deleted successfully"}
     return {"message": "Food log not found"}
\ No newline at end of file
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from .. import crud, schemas, models
-from ..database import get_db
+from .. import crud_async, schemas
+from ..database import AsyncReadSessionLocal, get_async_db, get_async_read_db
 from ..core import security
+from ..core.responses import json_rows
 from ..services.usda_api import search_usda_foods
+from ..services import usda_mirror
+from ..services.food_search import SearchSource, federated_search
+from ..services.openfoodfacts import search_openfoodfacts_foods
+from ..core.config import settings
 
 router = APIRouter(
     prefix="/foods",
@@ -12,115 +18,155 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.FoodRead)
-def create_food(
+async def create_food(
     food: schemas.FoodCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    return crud.create_food(db=db, food=food, user_id=current_user.id)
+    return await crud_async.create_food(food=food, user_id=current_user_id)
 
 @router.get("/", response_model=List[schemas.FoodRead])
-def read_foods(
+async def read_foods(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    return crud.get_foods(db, user_id=current_user.id, skip=skip, limit=limit)
+    rows = await crud_async.get_food_rows(db, user_id=current_user_id, skip=skip, limit=limit)
+    return json_rows(schemas.food_rows, rows)
+
+def _external_results(foods) -> List[schemas.FoodSearchResult]:
+    return [
+        schemas.FoodSearchResult(
+            id=None,
+            name=food.name,
+            calories=food.calories,
+            protein=food.protein,
+            carbs=food.carbs,
+            fat=food.fat,
+            is_from_library=False,
+            external_id=food.external_id,
+            source=food.source
+        )
+        for food in foods
+    ]
+
+async def _search_library(user_id: int, query: str) -> List[schemas.FoodSearchResult]:
+    # Its own session so a timed-out search never shares a session with
+    # the request that abandoned it
+    async with AsyncReadSessionLocal() as db:
+        library_foods = await crud_async.get_foods(db, user_id=user_id, search_term=query)
+        return [
+            schemas.FoodSearchResult(
+                id=food.id,
+                name=food.name,
+                calories=food.calories,
+                protein=food.protein,
+                carbs=food.carbs,
+                fat=food.fat,
+                is_from_library=True,
+                external_id=None
+            )
+            for food in library_foods
+        ]
+
+async def _search_usda(query: str) -> List[schemas.FoodSearchResult]:
+    # The local mirror when one has been imported, otherwise the USDA API
+    if usda_mirror.is_available():
+        return _external_results(await run_in_threadpool(usda_mirror.search, query, 5))
+    return _external_results(await search_usda_foods(query, page_size=5))
+
+async def _search_openfoodfacts(query: str) -> List[schemas.FoodSearchResult]:
+    return _external_results(await search_openfoodfacts_foods(query, page_size=5))
+
+def _search_sources(user_id: int) -> List[SearchSource]:
+    async def search_library(query: str):
+        return await _search_library(user_id, query)
+
+    sources = [
+        SearchSource("library", search_library, timeout=float(settings.get("SEARCH_TIMEOUT_LIBRARY", 1.0))),
+        SearchSource("usda", _search_usda, timeout=float(settings.get("SEARCH_TIMEOUT_USDA", 1.5))),
+    ]
+    if settings.get_bool("SEARCH_OPENFOODFACTS"):
+        sources.append(SearchSource(
+            "openfoodfacts", _search_openfoodfacts,
+            timeout=float(settings.get("SEARCH_TIMEOUT_OPENFOODFACTS", 1.5)),
+        ))
+    return sources
 
 @router.get("/search", response_model=List[schemas.FoodSearchResult])
 async def search_foods(
     q: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
     """
-    Search for foods in USDA database and user's library.
-    Returns USDA results first, followed by library results.
+    Search for foods in the user's library, USDA database and any other
+    enabled sources concurrently.
+    Returns one list ranked by relevance, with library foods boosted.
     """
     if not q or len(q.strip()) < 2:
         return []
-    
-    results = []
-    
-    # Search USDA database
-    try:
-        usda_foods = await search_usda_foods(q.strip(), page_size=5)
-        for usda_food in usda_foods:
-            results.append(schemas.FoodSearchResult(
-                id=None,
-                name=usda_food.name,
-                calories=usda_food.calories,
-                protein=usda_food.protein,
-                carbs=usda_food.carbs,
-                fat=usda_food.fat,
-                is_from_library=False,
-                external_id=usda_food.external_id
-            ))
-    except Exception as e:
-        print(f"Error searching USDA database: {e}")
-    
-    # Search user's library
-    library_foods = crud.get_foods(db, user_id=current_user.id, search_term=q.strip())
-    for food in library_foods:
-        results.append(schemas.FoodSearchResult(
-            id=food.id,
-            name=food.name,
-            calories=food.calories,
-            protein=food.protein,
-            carbs=food.carbs,
-            fat=food.fat,
-            is_from_library=True,
-            external_id=None
-        ))
-    
-    return results
+
+    return await federated_search(q.strip(), _search_sources(current_user_id))
 
 @router.get("/{food_id}", response_model=schemas.FoodRead)
-def read_food(
+async def read_food(
     food_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    food = db.query(models.Food).filter(
-        models.Food.id == food_id, models.Food.owner_id == current_user.id
-    ).first()
+    food = await crud_async.get_food(db, food_id, current_user_id)
     if not food:
         raise HTTPException(status_code=404, detail="Food not found")
     return food
 
 @router.put("/{food_id}", response_model=schemas.FoodRead)
-def update_food(
+async def update_food(
     food_id: int,
     food_update: schemas.FoodCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    food = db.query(models.Food).filter(
-        models.Food.id == food_id, models.Food.owner_id == current_user.id
-    ).first()
+    food = await crud_async.get_food(db, food_id, current_user_id)
     if not food:
         raise HTTPException(status_code=404, detail="Food not found")
 
-    for key, value in food_update.dict().items():
+    # Move the daily totals of every day this food was logged on by the change
+    await crud_async.adjust_daily_summaries_for_food(
+        db, food.id,
+        calories=food_update.calories - food.calories,
+        protein=food_update.protein - (food.protein or 0),
+        carbs=food_update.carbs - (food.carbs or 0),
+        fat=food_update.fat - (food.fat or 0),
+    )
+
+    # Keep the link to an external food unless the client changes it explicitly
+    update_data = food_update.model_dump(exclude={"external_id", "source"})
+    update_data.update(food_update.model_dump(include={"external_id", "source"}, exclude_unset=True))
+    for key, value in update_data.items():
         setattr(food, key, value)
 
-    db.commit()
-    db.refresh(food)
+    await db.commit()
     return food
 
 @router.delete("/{food_id}")
-def delete_food(
+async def delete_food(
     food_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    food = db.query(models.Food).filter(
-        models.Food.id == food_id, models.Food.owner_id == current_user.id
-    ).first()
+    food = await crud_async.get_food(db, food_id, current_user_id, with_logs=True)
     if not food:
         raise HTTPException(status_code=404, detail="Food not found")
 
-    db.delete(food)
-    db.commit()
+    # Deleting a food also deletes its logs
+    await crud_async.adjust_daily_summaries_for_food(
+        db, food.id,
+        calories=-food.calories,
+        protein=-(food.protein or 0),
+        carbs=-(food.carbs or 0),
+        fat=-(food.fat or 0),
+        remove_logs=True,
+    )
+    await db.delete(food)
+    await db.commit()
     return {"detail": "Food deleted"}
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
-from .. import crud, schemas, models
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from .. import crud_async, goal_updates, schemas, versions
+from ..database import get_async_db, get_async_read_db
 from ..core import security
+from ..core.responses import etag_matches, not_modified, set_etag
 
 router = APIRouter(
     prefix="/goals",
@@ -12,70 +12,49 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.GoalRead)
-def set_user_goal(
+async def set_user_goal(
     goal: schemas.GoalCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    return crud.create_or_update_user_goal(db=db, goal=goal, user_id=current_user.id)
+    # Let a recompute queued by an earlier write land first, so it can't overwrite this one.
+    # flush may recompute inline on a sync session, so it runs in the threadpool
+    await run_in_threadpool(goal_updates.recalculator.flush, current_user_id)
+    return await crud_async.create_or_update_user_goal(db=db, goal=goal, user_id=current_user_id)
 
 @router.get("/", response_model=schemas.GoalRead)
-def read_user_goal(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+async def read_user_goal(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    goal = crud.get_user_goal(db, user_id=current_user.id)
+    # Targets reflect every write made before this request
+    await run_in_threadpool(goal_updates.recalculator.flush, current_user_id)
+    etag = await versions.etag(db, current_user_id, versions.GOALS)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    goal = await crud_async.get_user_goal(db, user_id=current_user_id)
     if goal is None:
         raise HTTPException(status_code=404, detail="Goal not found")
+    set_etag(response, etag)
     return goal
 
 @router.post("/calculate", response_model=schemas.GoalRead)
-def calculate_and_set_goal(
+async def calculate_and_set_goal(
     calculation_input: schemas.GoalCalculationRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    if not all([current_user.date_of_birth, current_user.gender, current_user.height_cm]):
-        raise HTTPException(status_code=400, detail="User profile is incomplete. Please provide date of birth, gender, and height.")
-    latest_weight_log = db.query(models.WeightLog).filter(models.WeightLog.user_id == current_user.id).order_by(models.WeightLog.date.desc()).first()
-    if not latest_weight_log:
-        raise HTTPException(status_code=400, detail="No weight logged. Please log your weight at least once.")
-    
-    weight_kg = latest_weight_log.weight
-    age = (date.today() - current_user.date_of_birth).days // 365
-
-    if current_user.gender.value == "male":
-        bmr = (10 * weight_kg) + (6.25 * current_user.height_cm) - (5 * age) + 5
-    else: # FEMALE
-        bmr = (10 * weight_kg) + (6.25 * current_user.height_cm) - (5 * age) - 161
-
-    activity_multipliers = {
-        models.ActivityLevel.SEDENTARY: 1.2,
-        models.ActivityLevel.LIGHT: 1.375,
-        models.ActivityLevel.MODERATE: 1.55,
-        models.ActivityLevel.ACTIVE: 1.725,
-        models.ActivityLevel.VERY_ACTIVE: 1.9,
-    }
-    tdee = bmr * activity_multipliers[current_user.activity_level]
-
-    goal_type = calculation_input.goal_type
-    if goal_type == models.GoalType.WEIGHT_LOSS:
-        target_calories = tdee - 500
-    elif goal_type == models.GoalType.MUSCLE_GROWTH:
-        target_calories = tdee + 300
-    else: # MAINTENANCE
-        target_calories = tdee
-        
-    target_carbs = (target_calories * 0.40) / 4
-    target_protein = (target_calories * 0.30) / 4
-    target_fat = (target_calories * 0.30) / 9
-
-    goal_to_create = schemas.GoalCreate(
-        goal_type=calculation_input.goal_type,
-        target_calories=round(target_calories),
-        target_carbs=round(target_carbs),
-        target_protein=round(target_protein),
-        target_fat=round(target_fat)
-    )
-    
-    return crud.create_or_update_user_goal(db, goal_to_create, user_id=current_user.id)
\ No newline at end of file
+    await run_in_threadpool(goal_updates.recalculator.flush, current_user_id)
+    # The stored profile, not the cached snapshot, which another worker's update may have outdated
+    current_user = await crud_async.get_user(db, current_user_id)
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    try:
+        targets = await db.run_sync(goal_updates.targets_for_user, current_user, calculation_input.goal_type)
+    except goal_updates.IncompleteProfile as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    goal_to_create = schemas.GoalCreate(goal_type=calculation_input.goal_type, **targets)
+    return await crud_async.create_or_update_user_goal(db, goal_to_create, user_id=current_user_id)
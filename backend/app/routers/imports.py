@@ -0,0 +1,63 @@
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import bulk_import, schemas
+from ..database import get_db
+from ..core import security
+
+router = APIRouter(
+    prefix="/import",
+    tags=["import"],
+)
+
+def _upload_format(file: UploadFile, format: Optional[str]) -> str:
+    fmt = (format or "").lower()
+    if not fmt:
+        fmt = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    return fmt
+
+def _text_stream(file: UploadFile) -> io.TextIOWrapper:
+    # utf-8-sig drops the BOM spreadsheet exports like to add
+    return io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+
+@router.post("/foodlogs", response_model=schemas.ImportResult)
+def import_food_logs(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(security.get_current_user_id),
+):
+    """
+    Import food logs from an NDJSON or CSV file (format from the `format`
+    parameter or the file extension). Each row has a `date`, optional
+    `servings` and `timestamp`, and either the `food_id` of a library food or
+    the food itself (`name`, `calories`, `protein`, `carbs`, `fat`, optional
+    `external_id`/`source`). Invalid rows are reported and skipped.
+    """
+    fmt = _upload_format(file, format)
+    stream = _text_stream(file)
+    try:
+        return bulk_import.import_food_logs(db, stream, fmt, user_id=current_user_id)
+    finally:
+        stream.detach()
+
+@router.post("/weightlogs", response_model=schemas.ImportResult)
+def import_weight_logs(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(security.get_current_user_id),
+):
+    """
+    Import weight logs (`date`, `weight`, optional `timestamp`) from an NDJSON
+    or CSV file. The goal is recalculated once after the import.
+    """
+    fmt = _upload_format(file, format)
+    stream = _text_stream(file)
+    try:
+        return bulk_import.import_weight_logs(db, stream, fmt, user_id=current_user_id)
+    finally:
+        stream.detach()
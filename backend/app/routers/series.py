@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+import numpy as np
+from .. import crud_async, schemas, series, weight_trend
+from ..database import get_async_read_db
+from ..core import security
+
+router = APIRouter(
+    prefix="/series",
+    tags=["series"],
+)
+
+async def _daily_weights(db: AsyncSession, user_id: int, start: date, end: date):
+    return await db.run_sync(weight_trend.daily_weights, user_id, start, end)
+
+async def _daily_calories(db: AsyncSession, user_id: int, start: date, end: date):
+    rows = await crud_async.get_daily_calories(db, user_id=user_id, start=start, end=end)
+    days = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+    return days, values
+
+METRICS = {
+    "weight": _daily_weights,
+    "calories": _daily_calories,
+}
+
+@router.get("/{metric}", response_model=schemas.Series)
+async def read_series(
+    metric: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    points: int = Query(500, ge=10, le=5000),
+    resolution: str = "auto",
+    method: str = "lttb",
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(security.get_current_user_id),
+):
+    """
+    Daily weight or calories from start (default: first log) to end (default:
+    today), rolled up by week or month and downsampled to at most `points`
+    points. resolution=auto picks day, week or month from the range length.
+    """
+    if metric not in METRICS:
+        raise HTTPException(status_code=404, detail="Unknown series")
+    if resolution not in series.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(series.RESOLUTIONS)}")
+    if method not in series.METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(series.METHODS)}")
+    end = end or date.today()
+    start = start or date.min
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    days, values = await METRICS[metric](db, current_user_id, start, end)
+    days, values, resolution, method = series.build(days, values, points, resolution, method)
+    return schemas.Series(
+        metric=metric,
+        resolution=resolution,
+        method=method,
+        points=[
+            schemas.SeriesPoint(date=date.fromordinal(int(day)), value=float(value))
+            for day, value in zip(days, values)
+        ],
+    )
@@ -1,58 +1,55 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import crud, schemas, models
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud_async, goal_updates, schemas
+from ..database import get_async_db
 from ..core import security
-from .goals import calculate_and_set_goal
+from ..core.passwords import password_pool
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
 )
 
-@router.post("/", response_model=schemas.UserRead)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def _check_available(db: AsyncSession, user: schemas.UserCreate):
+    db_user = await crud_async.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    db_user = db.query(models.User).filter(models.User.username == user.username.lower()).first()
+    db_user = await crud_async.get_user_by_username(db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already taken")
+    # Give the connection back to the pool while bcrypt runs
+    await db.close()
+
+@router.post("/", response_model=schemas.UserRead)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    await _check_available(db, user)
 
     # Hash password before saving
-    hashed_password = security.get_password_hash(user.password)
+    hashed_password = await password_pool.hash(user.password)
 
-    return crud.create_user(db=db, user=user, hashed_password=hashed_password)
+    return await crud_async.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @router.get("/me", response_model=schemas.UserRead)
-def read_current_user(current_user: models.User = Depends(security.get_current_user)):
+def read_current_user(current_user: schemas.UserRead = Depends(security.get_current_user)):
     return current_user
 
 @router.put("/me", response_model=schemas.UserRead)
-def update_current_user(
+async def update_current_user(
     user_update: schemas.UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    user_data = user_update.dict(exclude_unset=True)
+    db_user = await crud_async.get_user(db, current_user_id)
+    if db_user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    user_data = user_update.model_dump(exclude_unset=True)
     for key, value in user_data.items():
-        setattr(current_user, key, value)
+        setattr(db_user, key, value)
     
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-
-    current_goal = crud.get_user_goal(db, user_id=current_user.id)
-    if current_goal and current_goal.goal_type:
-        latest_weight_log = db.query(models.WeightLog).filter(models.WeightLog.user_id == current_user.id).order_by(models.WeightLog.date.desc()).first()
-        
-        if latest_weight_log:
-            calculation_input = schemas.GoalCalculationRequest(
-                goal_type=current_goal.goal_type,
-                current_weight_kg=latest_weight_log.weight
-            )
-            calculate_and_set_goal(calculation_input, db, current_user)
-
-    db.refresh(current_user)
-    return current_user
\ No newline at end of file
+    db.add(db_user)
+    await db.commit()
+    security.user_cache.invalidate(current_user_id)
+    goal_updates.recalculator.schedule(current_user_id)
+    return db_user
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
-from .. import crud, schemas, models
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, timedelta
+from .. import crud_async, goal_updates, schemas, versions, weight_trend
+from ..database import get_async_read_db
 from ..core import security
-from .goals import calculate_and_set_goal
+from ..core.responses import etag_matches, json_rows, not_modified, set_etag
 
 router = APIRouter(
     prefix="/weightlogs",
@@ -13,37 +13,61 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.WeightLogRead)
-def create_weight_log(
+async def create_weight_log(
     log: schemas.WeightLogCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    db_log = crud.log_weight(db=db, log=log, user_id=current_user.id)
-    current_goal = crud.get_user_goal(db, user_id=current_user.id)
-    
-    if current_goal and current_goal.goal_type:
-        calculation_input = schemas.GoalCalculationRequest(
-            goal_type=current_goal.goal_type,
-            current_weight_kg=log.weight
-        )
-        calculate_and_set_goal(calculation_input, db, current_user)
+    db_log = await crud_async.log_weight(log=log, user_id=current_user_id)
+    goal_updates.recalculator.schedule(current_user_id)
     return db_log
 
 @router.get("/", response_model=List[schemas.WeightLogRead])
-def read_weight_logs(
+async def read_weight_logs(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    return crud.get_weight_logs(db, user_id=current_user.id, skip=skip, limit=limit)
+    etag = await versions.etag(db, current_user_id, versions.WEIGHTLOGS)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    rows = await crud_async.get_weight_log_rows(db, user_id=current_user_id, skip=skip, limit=limit)
+    return set_etag(json_rows(schemas.weight_log_rows, rows), etag)
+
+@router.get("/trend", response_model=schemas.WeightTrend)
+async def read_weight_trend(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user_id: int = Depends(security.get_current_user_id),
+):
+    """
+    Smoothed weight trend with 7/30 day means for each logged day from start
+    to end (defaults to the last 90 days), plus the current weekly rate of
+    change and the projected date to reach the goal's target weight.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=89)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    goal = await crud_async.get_user_goal(db, user_id=current_user_id)
+    # weight_trend works on a sync Session; run_sync gives it one on this connection
+    return await db.run_sync(
+        weight_trend.get_trend,
+        user_id=current_user_id,
+        start=start,
+        end=end,
+        target_weight=goal.target_weight if goal else None,
+    )
 
 @router.delete("/{log_id}")
-def delete_weight_log(
+async def delete_weight_log(
     log_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user),
+    current_user_id: int = Depends(security.get_current_user_id),
 ):
-    if crud.delete_weight_log(db, log_id=log_id, user_id=current_user.id):
+    if await crud_async.delete_weight_log(log_id=log_id, user_id=current_user_id):
+        goal_updates.recalculator.schedule(current_user_id)
         return {"message": "Weight log deleted successfully"}
     return {"message": "Weight log not found"}
\ No newline at end of file
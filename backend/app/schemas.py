@@ -1,7 +1,8 @@
 from backend.app.models import ActivityLevel, Gender, GoalType
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, EmailStr, Field, TypeAdapter, model_validator
 from datetime import date, datetime
 from typing import List, Optional
+from typing_extensions import TypedDict
 
 # User schemas
 class UserBase(BaseModel):
@@ -24,8 +25,7 @@ class UserRead(UserBase):
     height_cm: Optional[float] = None
     activity_level: Optional[ActivityLevel] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Food schemas
 class FoodBase(BaseModel):
@@ -36,14 +36,16 @@ class FoodBase(BaseModel):
     fat: float = 0
 
 class FoodCreate(FoodBase):
-    pass
+    external_id: Optional[str] = None
+    source: Optional[str] = None
 
 class FoodRead(FoodBase):
     id: int
     owner_id: int
+    external_id: Optional[str] = None
+    source: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class FoodSearchResult(BaseModel):
     id: Optional[int] = None
@@ -54,6 +56,7 @@ class FoodSearchResult(BaseModel):
     fat: float
     is_from_library: bool
     external_id: Optional[str] = None
+    source: Optional[str] = None
 
 # Log schemas
 class FoodLogBase(BaseModel):
@@ -65,14 +68,30 @@ class FoodLogCreate(FoodLogBase):
     external_food: Optional[FoodCreate] = None
 
 class FoodLogRead(FoodLogBase):
+    # The ORM model calls this column `date`
+    log_date: date = Field(default_factory=date.today, validation_alias=AliasChoices("date", "log_date"))
     id: int
     user_id: int
     food_id: int
     food: FoodRead
     timestamp: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class FoodLogPage(BaseModel):
+    items: List[FoodLogRead]
+    # Pass back as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class DailyNutritionSummaryRead(BaseModel):
+    date: date
+    calories: float = 0
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+    log_count: int = 0
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class WeightLogBase(BaseModel):
@@ -83,12 +102,115 @@ class WeightLogCreate(WeightLogBase):
     pass
 
 class WeightLogRead(WeightLogBase):
+    log_date: date = Field(default_factory=date.today, validation_alias=AliasChoices("date", "log_date"))
     id: int
     user_id: int
     timestamp: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class WeightTrendPoint(BaseModel):
+    date: date
+    weight: float
+    trend: float
+    mean_7d: float
+    mean_30d: float
+
+class WeightTrend(BaseModel):
+    points: List[WeightTrendPoint] = []
+    current_trend: Optional[float] = None
+    # Change per week, negative when losing
+    weekly_rate: Optional[float] = None
+    target_weight: Optional[float] = None
+    projected_date: Optional[date] = None
+
+class SeriesPoint(BaseModel):
+    date: date
+    value: float
+
+class Series(BaseModel):
+    metric: str
+    # day, week or month; week and month points are means dated by their first day
+    resolution: str
+    # Downsampling applied, None if the series already fit
+    method: Optional[str] = None
+    points: List[SeriesPoint] = []
+
+# Rows of the list endpoints' fast path: the fields of FoodRead, FoodLogRead
+# and WeightLogRead as plain dicts read straight from columns. The adapters
+# encode a whole list to JSON in one pass, without a model per row.
+class FoodRow(TypedDict):
+    name: str
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+    id: int
+    owner_id: int
+    external_id: Optional[str]
+    source: Optional[str]
+
+class FoodLogRow(TypedDict):
+    log_date: date
+    servings: float
+    id: int
+    user_id: int
+    food_id: int
+    food: FoodRow
+    timestamp: int
+
+class FoodLogPageRows(TypedDict):
+    items: List[FoodLogRow]
+    next_cursor: Optional[str]
+
+class WeightLogRow(TypedDict):
+    log_date: date
+    weight: float
+    id: int
+    user_id: int
+    timestamp: int
+
+food_rows = TypeAdapter(List[FoodRow])
+food_log_rows = TypeAdapter(List[FoodLogRow])
+food_log_page_rows = TypeAdapter(FoodLogPageRows)
+weight_log_rows = TypeAdapter(List[WeightLogRow])
+
+# Bulk import schemas
+class FoodLogImportRow(BaseModel):
+    """One imported food log: either food_id of a library food, or the food itself."""
+    date: date
+    servings: float = 1.0
+    timestamp: Optional[int] = None
+    food_id: Optional[int] = None
+    name: Optional[str] = None
+    calories: Optional[float] = None
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+    external_id: Optional[str] = None
+    source: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_food(self):
+        if self.food_id is None and (not self.name or self.calories is None):
+            raise ValueError("Either food_id or name and calories must be provided")
+        return self
+
+class WeightLogImportRow(BaseModel):
+    date: date
+    weight: float
+    timestamp: Optional[int] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    foods_created: int = 0
+    # Only the first errors are listed; `failed` has the full count
+    errors: List[ImportRowError] = []
 
 # Goal schemas
 class GoalBase(BaseModel):
@@ -108,5 +230,4 @@ class GoalCreate(GoalBase):
 class GoalRead(GoalBase):
     user_id: int
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+Chart series: daily values rolled up by week or month and downsampled to a
+target number of points.
+
+Daily values come from data that is already aggregated per day (the weight
+trend series, whose per-process cache is checked against the user's data
+version on every read, and daily_nutrition_summary), so weekly and monthly
+rollups are a single reduceat over at most a few thousand rows per user.
+Downsampling is either Largest-Triangle-Three-Buckets, which keeps the
+visual shape of the line, or min/max per bucket, which keeps every peak and
+trough.
+"""
+from datetime import date
+from typing import Optional, Tuple
+import numpy as np
+
+RESOLUTIONS = ("auto", "day", "week", "month")
+METHODS = ("lttb", "minmax")
+# auto picks the finest resolution with at most this many rows per requested point
+AUTO_ROWS_PER_POINT = 4
+
+_PERIOD_DAYS = (("day", 1), ("week", 7), ("month", 30.44))
+# Ordinal of 1970-01-01, to convert between date ordinals and datetime64
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def rollup(days: np.ndarray, values: np.ndarray, period: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean of `values` per week (starting Monday) or calendar month. `days` are
+    ascending date ordinals; each bucket is dated by its first day.
+    """
+    if len(days) == 0 or period == "day":
+        return days, values
+    if period == "week":
+        # Ordinal 1 (0001-01-01) was a Monday
+        keys = days - (days - 1) % 7
+    else:
+        months = (days - _EPOCH).astype("datetime64[D]").astype("datetime64[M]")
+        keys = months.astype("datetime64[D]").astype(np.int64) + _EPOCH
+    starts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+    counts = np.diff(np.append(starts, len(days)))
+    return keys[starts], np.add.reduceat(values, starts) / counts
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the `threshold` points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; the rest are split into
+    threshold - 2 buckets, and from each the point forming the largest
+    triangle with the previously kept point and the next bucket's average
+    is picked. Every point is looked at once.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    # Average of the bucket after each bucket; the last one looks at the final point
+    next_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes, y[-1])[1:]
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of each of (threshold - 2) / 2 buckets,
+    plus the first and last points, in order.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+
+    buckets = (threshold - 2) // 2
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    sizes = np.diff(np.append(starts, n))
+    index = np.arange(n)
+    # First position in each bucket holding the bucket's min / max
+    is_min = y == np.repeat(np.minimum.reduceat(y, starts), sizes)
+    is_max = y == np.repeat(np.maximum.reduceat(y, starts), sizes)
+    first_min = np.minimum.reduceat(np.where(is_min, index, n), starts)
+    first_max = np.minimum.reduceat(np.where(is_max, index, n), starts)
+    return np.unique(np.concatenate(([0, n - 1], first_min, first_max)))
+
+
+def build(
+    days: np.ndarray,
+    values: np.ndarray,
+    points: int,
+    resolution: str = "auto",
+    method: str = "lttb",
+) -> Tuple[np.ndarray, np.ndarray, str, Optional[str]]:
+    """
+    Roll up and downsample a daily series to at most about `points` points.
+
+    Returns (days, values, resolution used, downsampling method used or None).
+    """
+    if resolution == "auto":
+        span = int(days[-1] - days[0]) + 1 if len(days) else 0
+        resolution = next(
+            (period for period, length in _PERIOD_DAYS if span / length <= points * AUTO_ROWS_PER_POINT),
+            "month",
+        )
+
+    days, values = rollup(days, values, resolution)
+    if len(days) <= points:
+        return days, values, resolution, None
+
+    if method == "minmax":
+        keep = minmax(values, points)
+    else:
+        keep = lttb(days.astype(float), values, points)
+    return days[keep], values[keep], resolution, method
@@ -0,0 +1,116 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, List, Optional
+from .. import schemas
+from ..core import metrics
+from ..core.config import settings
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SEARCH_SOURCE_RESULTS = metrics.counter(
+    "food_search_source_results_total",
+    "Federated search source outcomes (ok, timeout, error, over_budget)",
+    ["source", "outcome"],
+)
+
+# Added to a result's score when it comes from the user's own library
+LIBRARY_BOOST = 15.0
+
+
+class SearchSource:
+    """
+    One backend of the federated food search.
+
+    Args:
+        name: Used in logs
+        search: Coroutine function taking the query and returning FoodSearchResults
+        timeout: Seconds this source may take before its results are dropped
+    """
+
+    def __init__(self, name: str, search: Callable[[str], Awaitable[List[schemas.FoodSearchResult]]], timeout: float):
+        self.name = name
+        self.search = search
+        self.timeout = timeout
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def score(query: str, result: schemas.FoodSearchResult) -> float:
+    """
+    Relevance of `result` for `query`: exact name match, then name prefix,
+    then the share of query words that prefix-match a word of the name.
+    Library foods are boosted so a user's own entries win close calls.
+    """
+    query_tokens = _tokens(query)
+    name_tokens = _tokens(result.name)
+    normalized_query = " ".join(query_tokens)
+    normalized_name = " ".join(name_tokens)
+
+    if normalized_name == normalized_query:
+        value = 100.0
+    elif normalized_name.startswith(normalized_query):
+        value = 60.0
+    else:
+        matched = sum(
+            1 for token in query_tokens
+            if any(name_token.startswith(token) for name_token in name_tokens)
+        )
+        value = 40.0 * matched / len(query_tokens) if query_tokens else 0.0
+        if query_tokens and name_tokens and name_tokens[0].startswith(query_tokens[0]):
+            value += 5.0
+
+    if result.is_from_library:
+        value += LIBRARY_BOOST
+    return value
+
+
+def rank(query: str, results: List[schemas.FoodSearchResult]) -> List[schemas.FoodSearchResult]:
+    # Sorting is stable, so equal scores keep source order; shorter names break ties
+    return sorted(results, key=lambda result: (-score(query, result), len(result.name)))
+
+
+async def _run_source(source: SearchSource, query: str) -> List[schemas.FoodSearchResult]:
+    return await asyncio.wait_for(source.search(query), source.timeout)
+
+
+async def federated_search(
+    query: str,
+    sources: List[SearchSource],
+    budget: Optional[float] = None,
+) -> List[schemas.FoodSearchResult]:
+    """
+    Query all sources concurrently and merge their results into one ranking.
+
+    Each source is bounded by its own timeout, and the whole search by
+    `budget` seconds (SEARCH_BUDGET). Sources that fail or run late are
+    left out, so the response may be partial but is never slower than the budget.
+    """
+    if budget is None:
+        budget = float(settings.get("SEARCH_BUDGET", 2.0))
+
+    tasks = {asyncio.ensure_future(_run_source(source, query)): source for source in sources}
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+    for task in pending:
+        SEARCH_SOURCE_RESULTS.labels(tasks[task].name, "over_budget").inc()
+        print(f"Search source {tasks[task].name} exceeded the search budget")
+        task.cancel()
+
+    results = []
+    # Collect in source order so ties rank the same way on every request
+    for task, source in tasks.items():
+        if task not in done:
+            continue
+        error = task.exception()
+        if isinstance(error, asyncio.TimeoutError):
+            SEARCH_SOURCE_RESULTS.labels(source.name, "timeout").inc()
+            print(f"Search source {source.name} timed out")
+        elif error is not None:
+            SEARCH_SOURCE_RESULTS.labels(source.name, "error").inc()
+            print(f"Error searching {source.name}: {error}")
+        else:
+            SEARCH_SOURCE_RESULTS.labels(source.name, "ok").inc()
+            results.extend(task.result())
+
+    return rank(query, results)
@@ -0,0 +1,101 @@
+import asyncio
+import importlib.util
+import random
+from typing import Optional
+import httpx
+from ..core.config import settings
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Build the pooled client used for all upstream nutrition APIs.
+
+    Pool sizes and timeouts come from UPSTREAM_* environment variables.
+    HTTP/2 is used when UPSTREAM_HTTP2 is set and the `h2` package is installed.
+    """
+    limits = httpx.Limits(
+        max_connections=int(settings.get("UPSTREAM_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(settings.get("UPSTREAM_MAX_KEEPALIVE", 20)),
+        keepalive_expiry=float(settings.get("UPSTREAM_KEEPALIVE_EXPIRY", 30)),
+    )
+    timeout = httpx.Timeout(
+        float(settings.get("UPSTREAM_TIMEOUT", 10)),
+        connect=float(settings.get("UPSTREAM_CONNECT_TIMEOUT", 5)),
+        pool=float(settings.get("UPSTREAM_POOL_TIMEOUT", 5)),
+    )
+
+    http2 = settings.get_bool("UPSTREAM_HTTP2")
+    if http2 and not _http2_available():
+        print("UPSTREAM_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=http2,
+        headers={"User-Agent": "ChunkLog/1.0"},
+    )
+
+
+async def startup():
+    """Create the shared client. Called from the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+
+
+async def shutdown():
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the shared client.
+
+    Outside the app lifespan (scripts, one-off jobs) the client is created on first use.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+async def get_with_retry(url: str, params: Optional[dict] = None, **kwargs) -> httpx.Response:
+    """
+    GET `url` through the shared client, retrying transport errors and
+    retryable status codes with exponential backoff and jitter.
+
+    Raises httpx.HTTPError once retries are exhausted, or immediately for
+    non-retryable error responses.
+    """
+    retries = int(settings.get("UPSTREAM_RETRIES", 2))
+    backoff = float(settings.get("UPSTREAM_RETRY_BACKOFF", 0.2))
+    client = get_client()
+
+    attempt = 0
+    while True:
+        try:
+            response = await client.get(url, params=params, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                response.raise_for_status()
+                return response
+        except httpx.TransportError:
+            if attempt >= retries:
+                raise
+
+        delay = backoff * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay))
+        attempt += 1
@@ -0,0 +1,62 @@
+import httpx
+from typing import List
+from .http_client import get_with_retry
+from .usda_api import USDAFoodData
+
+
+async def search_openfoodfacts_foods(query: str, page_size: int = 10) -> List[USDAFoodData]:
+    """
+    Search the Open Food Facts product database.
+
+    Args:
+        query: Search term
+        page_size: Number of results to return
+
+    Returns:
+        List of USDAFoodData objects (source="OpenFoodFacts") with nutrition per 100g
+    """
+    url = "https://world.openfoodfacts.org/cgi/search.pl"
+
+    try:
+        response = await get_with_retry(
+            url,
+            params={
+                "search_terms": query,
+                "search_simple": 1,
+                "json": 1,
+                "page_size": page_size,
+                "fields": "code,product_name,nutriments",
+            },
+        )
+        data = response.json()
+    except httpx.HTTPError as e:
+        print(f"Open Food Facts API error: {e}")
+        return []
+    except Exception as e:
+        print(f"Unexpected error in Open Food Facts search: {e}")
+        return []
+
+    foods = []
+    for product in data.get("products", []):
+        try:
+            name = product.get("product_name")
+            nutriments = product.get("nutriments", {})
+            calories = float(nutriments.get("energy-kcal_100g") or 0)
+
+            # Only include foods with valid data
+            if name and calories > 0:
+                foods.append(USDAFoodData(
+                    name=name,
+                    calories=calories,
+                    protein=float(nutriments.get("proteins_100g") or 0),
+                    carbs=float(nutriments.get("carbohydrates_100g") or 0),
+                    fat=float(nutriments.get("fat_100g") or 0),
+                    external_id=str(product.get("code", "")),
+                    source="OpenFoodFacts"
+                ))
+        except Exception as e:
+            # Skip products that can't be parsed
+            print(f"Error parsing product: {e}")
+            continue
+
+    return foods
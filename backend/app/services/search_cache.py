@@ -0,0 +1,205 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from ..core.config import settings
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so equivalent searches share a key."""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """
+    Two-tier cache for upstream food search results.
+
+    Tier one is an in-process LRU holding ready-to-return objects, tier two is
+    a small SQLite file that survives restarts and is shared by all workers.
+    Entries older than ``ttl`` are considered stale: they are not served on a
+    normal lookup, but stay around (up to ``max_stale``) so they can be returned
+    when the upstream API is unavailable.
+
+    Args:
+        path: SQLite file for the persistent tier, or None to keep it in memory only
+        ttl: Seconds an entry is considered fresh
+        max_stale: Seconds after which an entry is dropped even as a fallback
+        memory_size: Maximum number of entries in the in-process LRU
+        disk_size: Maximum number of rows in the persistent tier
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        ttl: float = 86400,
+        max_stale: float = 7 * 86400,
+        memory_size: int = 512,
+        disk_size: int = 10000,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+
+        self._memory: "OrderedDict[Tuple[str, int], Tuple[float, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    # --- persistent tier ---
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # This is a cache: losing the last few writes on a crash is fine
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " query TEXT NOT NULL,"
+                " page_size INTEGER NOT NULL,"
+                " fetched_at REAL NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " PRIMARY KEY (query, page_size))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_search_cache_fetched_at ON search_cache (fetched_at)"
+            )
+            self._disk_rows = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _disk_get(self, key: Tuple[str, int]) -> Optional[Tuple[float, list]]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT fetched_at, payload FROM search_cache WHERE query = ? AND page_size = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_set(self, key: Tuple[str, int], fetched_at: float, payload: list):
+        conn = self._connect()
+        if conn is None:
+            return
+        # INSERT OR REPLACE reports one changed row whether or not the key was
+        # there already, so only count keys that weren't
+        exists = conn.execute(
+            "SELECT 1 FROM search_cache WHERE query = ? AND page_size = ?", key
+        ).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO search_cache (query, page_size, fetched_at, payload) VALUES (?, ?, ?, ?)",
+            (key[0], key[1], fetched_at, json.dumps(payload)),
+        )
+        if exists is None:
+            self._disk_rows += 1
+        if self._disk_rows > self.disk_size:
+            self._disk_evict(conn)
+
+    def _disk_evict(self, conn: sqlite3.Connection):
+        # Drop everything past max_stale, then the oldest rows until back under
+        # the size limit (leaving 10% headroom so we don't evict on every insert)
+        conn.execute("DELETE FROM search_cache WHERE fetched_at < ?", (time.time() - self.max_stale,))
+        keep = int(self.disk_size * 0.9)
+        conn.execute(
+            "DELETE FROM search_cache WHERE rowid NOT IN "
+            "(SELECT rowid FROM search_cache ORDER BY fetched_at DESC LIMIT ?)",
+            (keep,),
+        )
+        self._disk_rows = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+    # --- in-process tier ---
+    def _memory_set(self, key: Tuple[str, int], fetched_at: float, value: list):
+        self._memory[key] = (fetched_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: Tuple[str, int], decode) -> Optional[Tuple[float, list]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        entry = self._disk_get(key)
+        if entry is None:
+            return None
+        fetched_at, payload = entry
+        value = decode(payload)
+        self._memory_set(key, fetched_at, value)
+        self.disk_hits += 1
+        return fetched_at, value
+
+    # --- public API ---
+    def get(self, query: str, page_size: int, decode=lambda payload: payload) -> Optional[list]:
+        """
+        Return a fresh cached result, or None on a miss.
+
+        ``decode`` turns the JSON payload read from disk back into result objects.
+        """
+        key = (normalize_query(query), page_size)
+        with self._lock:
+            entry = self._lookup(key, decode)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def get_stale(self, query: str, page_size: int, decode=lambda payload: payload) -> Optional[list]:
+        """Return a cached result regardless of TTL (up to ``max_stale``), or None."""
+        key = (normalize_query(query), page_size)
+        with self._lock:
+            entry = self._lookup(key, decode)
+            if entry is None or time.time() - entry[0] >= self.max_stale:
+                return None
+            self.stale_hits += 1
+            return entry[1]
+
+    def set(self, query: str, page_size: int, value: list, payload: list):
+        """Store ``value`` in memory and its JSON-serializable ``payload`` on disk."""
+        key = (normalize_query(query), page_size)
+        fetched_at = time.time()
+        with self._lock:
+            self._memory_set(key, fetched_at, value)
+            self._disk_set(key, fetched_at, payload)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM search_cache")
+            self._disk_rows = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_rows,
+        }
+
+
+usda_search_cache = SearchCache(
+    path=settings.get("USDA_CACHE_PATH", "./usda_cache.db") or None,
+    ttl=float(settings.get("USDA_CACHE_TTL", 86400)),
+    max_stale=float(settings.get("USDA_CACHE_MAX_STALE", 7 * 86400)),
+    memory_size=int(settings.get("USDA_CACHE_MEMORY_SIZE", 512)),
+    disk_size=int(settings.get("USDA_CACHE_DISK_SIZE", 10000)),
+)
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts the call as its own task; callers that
+    arrive while it is running await the same task. Each caller awaits it
+    through asyncio.shield, so a cancelled request only stops its own wait and
+    never the shared call. Once more than ``max_keys`` keys are in flight, new
+    keys run uncoalesced rather than growing the table.
+
+    Args:
+        max_keys: Maximum number of keys tracked at once
+    """
+
+    def __init__(self, max_keys: int = 1000):
+        self.max_keys = max_keys
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+        self.calls = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.bypassed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of ``fn()``, sharing it with concurrent callers for ``key``."""
+        self.calls += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.upstream_calls += 1
+        if len(self._inflight) >= self.max_keys:
+            self.bypassed += 1
+            return await fn()
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "inflight": len(self._inflight),
+        }
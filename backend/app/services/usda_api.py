@@ -1,7 +1,12 @@
-import os
+import time
 import httpx
 from typing import List, Optional
 from pydantic import BaseModel
+from .http_client import get_with_retry
+from .search_cache import normalize_query, usda_search_cache
+from .single_flight import SingleFlight
+from ..core import metrics
+from ..core.config import settings
 
 
 class USDAFoodData(BaseModel):
@@ -14,9 +19,120 @@ class USDAFoodData(BaseModel):
     source: str = "USDA"
 
 
+# FoodData Central API root; benchmarks point it at a local stand-in
+USDA_API_URL = settings.get("USDA_API_URL", "https://api.nal.usda.gov/fdc/v1").rstrip("/")
+
+USDA_REQUESTS = metrics.counter("usda_requests_total", "USDA API searches by outcome (ok, http_error, error)", ["outcome"])
+USDA_LATENCY = metrics.histogram("usda_request_duration_seconds", "USDA API search latency, retries included")
+
+usda_search_flight = SingleFlight(max_keys=int(settings.get("USDA_MAX_INFLIGHT_SEARCHES", 1000)))
+
+metrics.collected(
+    "usda_search_cache_lookups_total", "USDA search cache lookups by result", "counter", ["result"],
+    lambda: {
+        ("hit",): usda_search_cache.hits,
+        ("disk_hit",): usda_search_cache.disk_hits,
+        ("miss",): usda_search_cache.misses,
+        ("stale_hit",): usda_search_cache.stale_hits,
+    },
+)
+metrics.collected(
+    "usda_search_cache_entries", "USDA search cache entries by tier", "gauge", ["tier"],
+    lambda: {(tier,): usda_search_cache.stats()[f"{tier}_entries"] for tier in ("memory", "disk")},
+)
+metrics.collected(
+    "usda_search_calls_total", "USDA searches by how they reached the API (upstream, coalesced, bypassed)",
+    "counter", ["path"],
+    lambda: {
+        ("upstream",): usda_search_flight.upstream_calls - usda_search_flight.bypassed,
+        ("coalesced",): usda_search_flight.coalesced,
+        ("bypassed",): usda_search_flight.bypassed,
+    },
+)
+
+
+def _parse_usda_foods(data: dict) -> List[USDAFoodData]:
+    foods = []
+    for food_item in data.get("foods", []):
+        try:
+            # Extract food name
+            name = food_item.get("description", "Unknown")
+            
+            # Extract nutrients
+            nutrients = food_item.get("foodNutrients", [])
+            nutrient_map = {item.get("nutrientName"): item.get("value", 0) for item in nutrients if item.get("value")}
+            
+            # Map USDA nutrients to our format (per 100g)
+            calories = nutrient_map.get("Energy", 0)
+            protein = nutrient_map.get("Protein", 0)
+            carbs = nutrient_map.get("Carbohydrate, by difference", 0)
+            fat = nutrient_map.get("Total lipid (fat)", 0)
+            
+            # Only include foods with valid data
+            if name and calories > 0:
+                foods.append(USDAFoodData(
+                    name=name,
+                    calories=calories,
+                    protein=protein,
+                    carbs=carbs,
+                    fat=fat,
+                    external_id=str(food_item.get("fdcId", "")),
+                    source="USDA"
+                ))
+        except Exception as e:
+            # Skip foods that can't be parsed
+            print(f"Error parsing food item: {e}")
+            continue
+    
+    return foods
+
+
+def _decode_cached(payload: list) -> List[USDAFoodData]:
+    return [USDAFoodData(**item) for item in payload]
+
+
+async def _fetch_usda_foods(query: str, page_size: int, api_key: str) -> List[USDAFoodData]:
+    url = f"{USDA_API_URL}/foods/search"
+    
+    started = time.perf_counter()
+    try:
+        response = await get_with_retry(
+            url,
+            params={
+                "query": query,
+                "pageSize": page_size,
+                "api_key": api_key,
+                "dataType": ["Foundation", "Branded", "SR Legacy"]  # Focus on quality data
+            },
+        )
+        foods = _parse_usda_foods(response.json())
+            
+    except httpx.HTTPError as e:
+        USDA_REQUESTS.labels("http_error").inc()
+        USDA_LATENCY.observe(time.perf_counter() - started)
+        print(f"USDA API error: {e}")
+        stale = usda_search_cache.get_stale(query, page_size, decode=_decode_cached)
+        return stale if stale is not None else []
+    except Exception as e:
+        USDA_REQUESTS.labels("error").inc()
+        USDA_LATENCY.observe(time.perf_counter() - started)
+        print(f"Unexpected error in USDA search: {e}")
+        return []
+
+    USDA_REQUESTS.labels("ok").inc()
+    USDA_LATENCY.observe(time.perf_counter() - started)
+
+    usda_search_cache.set(query, page_size, foods, [food.model_dump() for food in foods])
+    return foods
+
+
 async def search_usda_foods(query: str, page_size: int = 10) -> List[USDAFoodData]:
     """
     Search USDA FoodData Central API for foods.
+
+    Results are cached by normalized query and page size (see services/search_cache.py).
+    If the API is unreachable, a stale cached result is returned when one exists.
+    Concurrent searches for the same query share a single API request.
     
     Args:
         query: Search term
@@ -25,65 +141,16 @@ async def search_usda_foods(query: str, page_size: int = 10) -> List[USDAFoodDat
     Returns:
         List of USDAFoodData objects with normalized nutritional data
     """
-    api_key = os.getenv("USDA_API_KEY")
+    api_key = settings.get("USDA_API_KEY")
     if not api_key:
         return []
-    
-    url = "https://api.nal.usda.gov/fdc/v1/foods/search"
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                params={
-                    "query": query,
-                    "pageSize": page_size,
-                    "api_key": api_key,
-                    "dataType": ["Foundation", "Branded", "SR Legacy"]  # Focus on quality data
-                },
-                timeout=10.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            foods = []
-            for food_item in data.get("foods", []):
-                try:
-                    # Extract food name
-                    name = food_item.get("description", "Unknown")
-                    
-                    # Extract nutrients
-                    nutrients = food_item.get("foodNutrients", [])
-                    nutrient_map = {item.get("nutrientName"): item.get("value", 0) for item in nutrients if item.get("value")}
-                    
-                    # Map USDA nutrients to our format (per 100g)
-                    calories = nutrient_map.get("Energy", 0)
-                    protein = nutrient_map.get("Protein", 0)
-                    carbs = nutrient_map.get("Carbohydrate, by difference", 0)
-                    fat = nutrient_map.get("Total lipid (fat)", 0)
-                    
-                    # Only include foods with valid data
-                    if name and calories > 0:
-                        foods.append(USDAFoodData(
-                            name=name,
-                            calories=calories,
-                            protein=protein,
-                            carbs=carbs,
-                            fat=fat,
-                            external_id=str(food_item.get("fdcId", "")),
-                            source="USDA"
-                        ))
-                except Exception as e:
-                    # Skip foods that can't be parsed
-                    print(f"Error parsing food item: {e}")
-                    continue
-            
-            return foods
-            
-    except httpx.HTTPError as e:
-        print(f"USDA API error: {e}")
-        return []
-    except Exception as e:
-        print(f"Unexpected error in USDA search: {e}")
-        return []
 
+    cached = usda_search_cache.get(query, page_size, decode=_decode_cached)
+    if cached is not None:
+        return list(cached)
+
+    foods = await usda_search_flight.do(
+        (normalize_query(query), page_size),
+        lambda: _fetch_usda_foods(query, page_size, api_key),
+    )
+    return list(foods)
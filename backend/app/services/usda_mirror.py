@@ -0,0 +1,390 @@
+"""
+Local mirror of USDA FoodData Central with an FTS5 search index.
+
+Populate it from the downloadable FDC dumps (https://fdc.nal.usda.gov/download-datasets):
+
+    python -m backend.app.services.usda_mirror FoodData_Central_foundation_food_json.zip
+    python -m backend.app.services.usda_mirror FoodData_Central_sr_legacy_food_csv/
+
+JSON files (or zips containing one) and CSV directories (or zips containing
+food.csv and food_nutrient.csv) are supported. Dumps are parsed incrementally
+and upserted by fdcId, so re-importing a newer release only rewrites foods whose
+publication date changed. Once the mirror file exists, /foods/search queries it
+instead of the USDA API.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Optional, TextIO
+from .usda_api import USDAFoodData
+from ..core.config import settings
+
+# FDC nutrient ids we keep (energy has several ids depending on the data type)
+ENERGY_IDS = (1008, 2047, 2048)  # Energy (kcal), Atwater General, Atwater Specific
+PROTEIN_ID = 1003
+FAT_ID = 1004
+CARBS_ID = 1005  # Carbohydrate, by difference
+
+DEFAULT_BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usda_foods (
+    fdc_id INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    data_type TEXT,
+    calories REAL NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    carbs REAL NOT NULL DEFAULT 0,
+    fat REAL NOT NULL DEFAULT 0,
+    published TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS usda_foods_fts USING fts5(
+    description,
+    content='usda_foods',
+    content_rowid='fdc_id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS usda_foods_ai AFTER INSERT ON usda_foods BEGIN
+    INSERT INTO usda_foods_fts(rowid, description) VALUES (new.fdc_id, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS usda_foods_ad AFTER DELETE ON usda_foods BEGIN
+    INSERT INTO usda_foods_fts(usda_foods_fts, rowid, description) VALUES ('delete', old.fdc_id, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS usda_foods_au AFTER UPDATE OF description ON usda_foods BEGIN
+    INSERT INTO usda_foods_fts(usda_foods_fts, rowid, description) VALUES ('delete', old.fdc_id, old.description);
+    INSERT INTO usda_foods_fts(rowid, description) VALUES (new.fdc_id, new.description);
+END;
+"""
+
+# Only rewrite a food when the dump has a newer (or previously unknown) publication date
+UPSERT_SQL = """
+INSERT INTO usda_foods (fdc_id, description, data_type, calories, protein, carbs, fat, published)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(fdc_id) DO UPDATE SET
+    description = excluded.description,
+    data_type = excluded.data_type,
+    calories = excluded.calories,
+    protein = excluded.protein,
+    carbs = excluded.carbs,
+    fat = excluded.fat,
+    published = excluded.published
+WHERE excluded.published IS NULL
+    OR usda_foods.published IS NULL
+    OR excluded.published > usda_foods.published
+"""
+
+_local = threading.local()
+
+
+def mirror_path() -> Optional[str]:
+    return settings.get("USDA_MIRROR_PATH", "./usda_mirror.db") or None
+
+
+def is_available() -> bool:
+    """True when a mirror database has been imported at USDA_MIRROR_PATH."""
+    path = mirror_path()
+    return bool(path) and os.path.exists(path)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _reader() -> sqlite3.Connection:
+    # One read-only connection per thread; searches run in the threadpool
+    path = mirror_path()
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != path:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        _local.conn, _local.path = conn, path
+    return conn
+
+
+# --- Search ---
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query that prefix-matches every word."""
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search(query: str, page_size: int = 10) -> List[USDAFoodData]:
+    """
+    Search the local mirror.
+
+    Returns results normalized the same way as the USDA API path: foods
+    without calories are skipped and nutrition is per 100g.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    rows = _reader().execute(
+        """
+        SELECT f.fdc_id, f.description, f.calories, f.protein, f.carbs, f.fat
+        FROM usda_foods_fts
+        JOIN usda_foods f ON f.fdc_id = usda_foods_fts.rowid
+        WHERE usda_foods_fts MATCH ? AND f.calories > 0
+        ORDER BY bm25(usda_foods_fts), length(f.description)
+        LIMIT ?
+        """,
+        (match, page_size),
+    ).fetchall()
+
+    return [
+        USDAFoodData(
+            name=description,
+            calories=calories,
+            protein=protein,
+            carbs=carbs,
+            fat=fat,
+            external_id=str(fdc_id),
+            source="USDA"
+        )
+        for fdc_id, description, calories, protein, carbs, fat in rows
+    ]
+
+
+# --- JSON dumps ---
+def iter_json_array_items(fp: TextIO, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Yield the elements of the first JSON array in `fp` one at a time.
+
+    FDC JSON dumps are a single object wrapping one large array
+    ({"FoundationFoods": [...]}), so this keeps only the current chunk and
+    the element being decoded in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+
+    # Skip to the opening bracket of the array
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            return
+        buf += chunk
+        start = buf.find("[")
+        if start != -1:
+            pos = start + 1
+            break
+        buf = ""
+
+    eof = False
+    while True:
+        # Skip separators between elements
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            buf = buf[pos:]
+            pos = 0
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            continue
+        if buf[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The element continues past the end of the buffer
+            buf = buf[pos:]
+            pos = 0
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            continue
+
+        yield item
+        pos = end
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+def _nutrient_values(food_nutrients: list) -> dict:
+    values = {}
+    for entry in food_nutrients:
+        nutrient = entry.get("nutrient") or {}
+        nutrient_id = nutrient.get("id")
+        amount = entry.get("amount")
+        if nutrient_id is None or amount is None:
+            continue
+        if nutrient_id in ENERGY_IDS and nutrient.get("unitName", "kcal").lower() != "kcal":
+            continue
+        values.setdefault(nutrient_id, amount)
+    return values
+
+
+def _energy(values: dict) -> float:
+    for nutrient_id in ENERGY_IDS:
+        if values.get(nutrient_id):
+            return values[nutrient_id]
+    return 0
+
+
+def json_food_rows(fp: TextIO) -> Iterator[tuple]:
+    for food in iter_json_array_items(fp):
+        fdc_id = food.get("fdcId")
+        description = food.get("description")
+        if fdc_id is None or not description:
+            continue
+        values = _nutrient_values(food.get("foodNutrients", []))
+        yield (
+            int(fdc_id),
+            description,
+            food.get("dataType"),
+            _energy(values),
+            values.get(PROTEIN_ID, 0),
+            values.get(CARBS_ID, 0),
+            values.get(FAT_ID, 0),
+            food.get("modifiedDate") or food.get("publicationDate"),
+        )
+
+
+# --- CSV dumps ---
+def csv_food_rows(fp: TextIO) -> Iterator[tuple]:
+    """Rows from food.csv, with nutrients filled in later from food_nutrient.csv."""
+    for row in csv.DictReader(fp):
+        if not row.get("fdc_id") or not row.get("description"):
+            continue
+        yield (
+            int(row["fdc_id"]),
+            row["description"],
+            row.get("data_type"),
+            0, 0, 0, 0,
+            row.get("publication_date") or None,
+        )
+
+
+def csv_nutrient_updates(fp: TextIO) -> Iterator[tuple]:
+    """(column, amount, fdc_id) updates from food_nutrient.csv for the nutrients we keep."""
+    columns = {PROTEIN_ID: "protein", FAT_ID: "fat", CARBS_ID: "carbs"}
+    columns.update({nutrient_id: "calories" for nutrient_id in ENERGY_IDS})
+    for row in csv.DictReader(fp):
+        try:
+            nutrient_id = int(row["nutrient_id"])
+        except (KeyError, ValueError):
+            continue
+        column = columns.get(nutrient_id)
+        if column is None or not row.get("amount"):
+            continue
+        yield column, float(row["amount"]), int(row["fdc_id"])
+
+
+# --- Import ---
+def _batches(rows: Iterable, batch_size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_food_rows(conn: sqlite3.Connection, rows: Iterable[tuple], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Upsert food rows in batches, one transaction per batch. Returns rows written."""
+    written = 0
+    for batch in _batches(rows, batch_size):
+        with conn:
+            # rowcount skips unchanged foods (the upsert's WHERE) and trigger writes
+            written += conn.executemany(UPSERT_SQL, batch).rowcount
+    return written
+
+
+def apply_nutrient_updates(conn: sqlite3.Connection, updates: Iterable[tuple], batch_size: int = DEFAULT_BATCH_SIZE):
+    statements = {
+        column: f"UPDATE usda_foods SET {column} = ? WHERE fdc_id = ?"
+        for column in ("protein", "fat", "carbs")
+    }
+    # A food can have several energy rows; keep the first one seen
+    statements["calories"] = "UPDATE usda_foods SET calories = ? WHERE fdc_id = ? AND calories = 0"
+    for batch in _batches(updates, batch_size):
+        by_column = {}
+        for column, amount, fdc_id in batch:
+            by_column.setdefault(column, []).append((amount, fdc_id))
+        with conn:
+            for column, params in by_column.items():
+                conn.executemany(statements[column], params)
+
+
+def _open_text(zf: zipfile.ZipFile, name: str) -> TextIO:
+    return io.TextIOWrapper(zf.open(name), encoding="utf-8", newline="")
+
+
+def import_path(conn: sqlite3.Connection, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Import one FDC dump (JSON file, CSV directory, or a zip of either)."""
+    if os.path.isdir(path):
+        with open(os.path.join(path, "food.csv"), encoding="utf-8", newline="") as fp:
+            written = import_food_rows(conn, csv_food_rows(fp), batch_size)
+        with open(os.path.join(path, "food_nutrient.csv"), encoding="utf-8", newline="") as fp:
+            apply_nutrient_updates(conn, csv_nutrient_updates(fp), batch_size)
+        return written
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            names = zf.namelist()
+            json_names = [name for name in names if name.endswith(".json")]
+            if json_names:
+                with _open_text(zf, json_names[0]) as fp:
+                    return import_food_rows(conn, json_food_rows(fp), batch_size)
+
+            food_csv = next((n for n in names if os.path.basename(n) == "food.csv"), None)
+            nutrient_csv = next((n for n in names if os.path.basename(n) == "food_nutrient.csv"), None)
+            if not food_csv or not nutrient_csv:
+                raise ValueError(f"{path}: expected a .json file or food.csv and food_nutrient.csv")
+            with _open_text(zf, food_csv) as fp:
+                written = import_food_rows(conn, csv_food_rows(fp), batch_size)
+            with _open_text(zf, nutrient_csv) as fp:
+                apply_nutrient_updates(conn, csv_nutrient_updates(fp), batch_size)
+            return written
+
+    with open(path, encoding="utf-8") as fp:
+        return import_food_rows(conn, json_food_rows(fp), batch_size)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Import USDA FoodData Central dumps into the local search mirror.")
+    parser.add_argument("paths", nargs="+", help="FDC JSON files, CSV directories, or zips of either")
+    parser.add_argument("--db", default=mirror_path() or "./usda_mirror.db", help="Mirror database file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        for path in args.paths:
+            started = time.perf_counter()
+            written = import_path(conn, path, args.batch_size)
+            print(f"{path}: {written} foods added or updated in {time.perf_counter() - started:.1f}s")
+        with conn:
+            conn.execute("INSERT INTO usda_foods_fts(usda_foods_fts) VALUES ('optimize')")
+        total = conn.execute("SELECT COUNT(*) FROM usda_foods").fetchone()[0]
+        print(f"{args.db}: {total} foods indexed")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-user data versions for conditional GETs.
+
+Every write to one of a user's collections bumps the (user, collection)
+counter in data_versions, in the same transaction as the write, so a new
+version is visible exactly when the data it covers is. GET routes serve the
+version as a weak ETag and answer a matching If-None-Match with 304 before
+running their query.
+
+Routes read the version before the data. A write committed in between makes
+the response newer than its ETag, which only costs the client a full
+response next time; the other order could answer 304 to a stale copy.
+"""
+from typing import Iterable
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+
+# Collections, as stored in data_versions.collection
+FOODLOGS = "foodlogs"
+WEIGHTLOGS = "weightlogs"
+GOALS = "goals"
+
+
+def _bump_upsert():
+    table = models.DataVersion.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.collection],
+        set_={"version": table.c.version + 1},
+    )
+
+# Built once so the compiled statement is reused across calls
+_BUMP_UPSERT = _bump_upsert()
+
+def _bump_params(collection: str, user_ids: Iterable[int]):
+    return [{"user_id": user_id, "collection": collection, "version": 1} for user_id in set(user_ids)]
+
+def bump(db, collection: str, user_ids: Iterable[int]):
+    """
+    Bump the version of `collection` for each user, on a Session or Connection.
+    Runs in the caller's transaction, so it commits (or rolls back) with the write.
+    """
+    params = _bump_params(collection, user_ids)
+    if params:
+        db.execute(_BUMP_UPSERT, params)
+
+async def bump_async(db: AsyncSession, collection: str, user_ids: Iterable[int]):
+    """See bump."""
+    params = _bump_params(collection, user_ids)
+    if params:
+        await db.execute(_BUMP_UPSERT, params)
+
+def _version_query(user_id: int, collection: str):
+    return select(models.DataVersion.version).where(
+        models.DataVersion.user_id == user_id,
+        models.DataVersion.collection == collection,
+    )
+
+def current(db, user_id: int, collection: str) -> int:
+    """Version of the user's collection, 0 until its first write, on a Session or Connection."""
+    return db.scalar(_version_query(user_id, collection)) or 0
+
+async def etag(db: AsyncSession, user_id: int, collection: str) -> str:
+    """Weak ETag of the user's collection; version 0 until its first write."""
+    version = await db.scalar(_version_query(user_id, collection))
+    return f'W/"{collection}-{user_id}-{version or 0}"'
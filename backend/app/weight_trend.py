@@ -0,0 +1,277 @@
+"""
+Weight trend analytics.
+
+A user's weight logs are reduced to one value per day (the mean of that day's
+logs) and smoothed with a time-aware exponentially weighted moving average:
+each day is blended in with weight ALPHA and the previous trend decays by
+(1 - ALPHA) per calendar day elapsed, so gaps in logging are handled without
+resampling. 7 and 30 day rolling means are taken over calendar windows.
+
+Series are cached per user in memory. log_weight and delete_weight_log update
+the cached series in place and recompute only from the changed day onwards,
+which for a new log is just the last day. The cache is per process, so each
+series also records the user's weightlogs data version (versions.py) it
+reflects, counting the in-place updates; every read checks it against
+data_versions and reloads the series after a write this process didn't see
+(another worker's, or a bulk import).
+"""
+import math
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from . import models, schemas, versions
+from .core.config import settings
+
+ALPHA = float(settings.get("WEIGHT_TREND_ALPHA", 0.1))
+CACHE_SIZE = int(settings.get("WEIGHT_TREND_CACHE_SIZE", 1000))
+# Days of daily weights the weekly rate is fitted over
+RATE_WINDOW_DAYS = 28
+# Projections further out than this are reported as None
+MAX_PROJECTION_DAYS = 3650
+
+_DECAY = 1.0 - ALPHA
+# Longest stretch of days the EWMA scan handles at once; decay ** -days must stay finite
+_MAX_SPAN = max(1, int(300 / -math.log(_DECAY))) if 0 < _DECAY < 1 else 1
+
+
+def _ewma(days: np.ndarray, values: np.ndarray, prev_day: int, prev_trend: float) -> np.ndarray:
+    """
+    EWMA of `values` continuing from `prev_trend` as of `prev_day`.
+
+    s_i = d^g_i * s_(i-1) + (1 - d^g_i) * x_i, with g_i the days since the
+    previous value, unrolls to s_i = d^t_i * (s_0 + cumsum(x_k * (1 - d^g_k) * d^-t_k))
+    with t measured from prev_day. It is evaluated in blocks short enough for
+    d^-t to stay finite, each block continuing from the last.
+    """
+    out = np.empty(len(values))
+    start = 0
+    while start < len(values):
+        if days[start] - prev_day > _MAX_SPAN:
+            # Anything this old has decayed to nothing
+            prev_day, prev_trend = int(days[start]) - 1, float(values[start])
+        end = int(np.searchsorted(days, prev_day + _MAX_SPAN, side="right"))
+        t = (days[start:end] - prev_day).astype(float)
+        gaps = np.diff(t, prepend=0.0)
+        gain = values[start:end] * (1.0 - _DECAY ** gaps)
+        out[start:end] = _DECAY ** t * (prev_trend + np.cumsum(gain * _DECAY ** -t))
+        prev_day, prev_trend = int(days[end - 1]), float(out[end - 1])
+        start = end
+    return out
+
+
+class _Series:
+    """One user's daily weights and the statistics derived from them."""
+
+    def __init__(self, days: np.ndarray, sums: np.ndarray, counts: np.ndarray):
+        # days are date ordinals, ascending and unique
+        self.days = days
+        self.sums = sums
+        self.counts = counts
+        n = len(days)
+        self.weights = np.empty(n)
+        self.trend = np.empty(n)
+        self.mean_7 = np.empty(n)
+        self.mean_30 = np.empty(n)
+        # prefix[i] is the sum of the first i daily weights
+        self.prefix = np.zeros(n + 1)
+        # weightlogs data version of the logs this holds
+        self.version = 0
+        self._recompute(0)
+
+    def _recompute(self, start: int):
+        """Refresh derived values for days[start:]; earlier days don't depend on later ones."""
+        n = len(self.days)
+        if start >= n:
+            return
+        days = self.days[start:]
+        weights = self.sums[start:] / self.counts[start:]
+        self.weights[start:] = weights
+        self.prefix[start + 1:] = self.prefix[start] + np.cumsum(weights)
+
+        if start == 0:
+            prev_day, prev_trend = int(days[0]), float(weights[0])
+        else:
+            prev_day, prev_trend = int(self.days[start - 1]), float(self.trend[start - 1])
+        self.trend[start:] = _ewma(days, weights, prev_day, prev_trend)
+
+        index = np.arange(start, n)
+        for window, out in ((7, self.mean_7), (30, self.mean_30)):
+            first = np.searchsorted(self.days, days - (window - 1), side="left")
+            out[start:] = (self.prefix[index + 1] - self.prefix[first]) / (index + 1 - first)
+
+    def add(self, day: date, weight: float):
+        ordinal = day.toordinal()
+        i = int(np.searchsorted(self.days, ordinal))
+        if i < len(self.days) and self.days[i] == ordinal:
+            self.sums[i] += weight
+            self.counts[i] += 1
+        else:
+            self.days = np.insert(self.days, i, ordinal)
+            self.sums = np.insert(self.sums, i, weight)
+            self.counts = np.insert(self.counts, i, 1.0)
+            for name in ("weights", "trend", "mean_7", "mean_30"):
+                setattr(self, name, np.insert(getattr(self, name), i, 0.0))
+            self.prefix = np.insert(self.prefix, i + 1, 0.0)
+        self._recompute(i)
+
+    def remove(self, day: date, weight: float) -> bool:
+        """False if there is no log on `day`, meaning the cached series is out of date."""
+        ordinal = day.toordinal()
+        i = int(np.searchsorted(self.days, ordinal))
+        if i >= len(self.days) or self.days[i] != ordinal:
+            return False
+        self.counts[i] -= 1
+        self.sums[i] -= weight
+        if self.counts[i] <= 0:
+            self.days = np.delete(self.days, i)
+            self.sums = np.delete(self.sums, i)
+            self.counts = np.delete(self.counts, i)
+            for name in ("weights", "trend", "mean_7", "mean_30"):
+                setattr(self, name, np.delete(getattr(self, name), i))
+            self.prefix = np.delete(self.prefix, i + 1)
+        self._recompute(i)
+        return True
+
+    def weekly_rate(self) -> Optional[float]:
+        """Least-squares slope of the daily weights over the last RATE_WINDOW_DAYS, per week."""
+        if len(self.days) < 2:
+            return None
+        first = int(np.searchsorted(self.days, self.days[-1] - (RATE_WINDOW_DAYS - 1)))
+        if len(self.days) - first < 2:
+            return None
+        x = (self.days[first:] - self.days[-1]).astype(float)
+        slope = np.polyfit(x, self.weights[first:], 1)[0]
+        return float(slope * 7)
+
+
+def _load(db: Session, user_id: int) -> _Series:
+    rows = (
+        db.query(models.WeightLog.date, models.WeightLog.weight)
+        .filter(models.WeightLog.user_id == user_id)
+        .all()
+    )
+    ordinals = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    weights = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+    days, inverse = np.unique(ordinals, return_inverse=True)
+    sums = np.bincount(inverse, weights=weights, minlength=len(days))
+    counts = np.bincount(inverse, minlength=len(days)).astype(float)
+    return _Series(days, sums, counts)
+
+
+_cache: "OrderedDict[int, _Series]" = OrderedDict()
+_lock = threading.Lock()
+# Bumped on every change, so a series loaded while a write landed isn't cached
+_generation = 0
+
+
+def _changed(user_id: int, update) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        series = _cache.get(user_id)
+        if series is None:
+            return
+        if update(series) is False:
+            del _cache[user_id]
+        else:
+            # Each committed weight log write bumps the version once
+            series.version += 1
+
+
+def log_added(user_id: int, day: date, weight: float):
+    _changed(user_id, lambda series: series.add(day, weight))
+
+
+def log_removed(user_id: int, day: date, weight: float):
+    _changed(user_id, lambda series: series.remove(day, weight))
+
+
+def invalidate(user_id: int):
+    _changed(user_id, lambda series: False)
+
+
+def _get_series(db: Session, user_id: int) -> _Series:
+    # Read before the logs: a write landing in between leaves the series
+    # newer than its version, which only costs a reload next time
+    version = versions.current(db, user_id, versions.WEIGHTLOGS)
+    with _lock:
+        series = _cache.get(user_id)
+        if series is not None and series.version == version:
+            _cache.move_to_end(user_id)
+            return series
+        generation = _generation
+
+    series = _load(db, user_id)
+    series.version = version
+    with _lock:
+        if generation == _generation:
+            _cache[user_id] = series
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return series
+
+
+def daily_weights(db: Session, user_id: int, start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+    """(date ordinals, mean weight per day) of the days with logs from start to end."""
+    series = _get_series(db, user_id)
+    with _lock:
+        first = int(np.searchsorted(series.days, start.toordinal(), side="left"))
+        last = int(np.searchsorted(series.days, end.toordinal(), side="right"))
+        return series.days[first:last].copy(), series.weights[first:last].copy()
+
+
+def get_trend(
+    db: Session,
+    user_id: int,
+    start: date,
+    end: date,
+    target_weight: Optional[float] = None,
+) -> schemas.WeightTrend:
+    series = _get_series(db, user_id)
+    with _lock:
+        trend = schemas.WeightTrend(target_weight=target_weight)
+        if len(series.days) == 0:
+            return trend
+
+        first = int(np.searchsorted(series.days, start.toordinal(), side="left"))
+        last = int(np.searchsorted(series.days, end.toordinal(), side="right"))
+        trend.points = [
+            schemas.WeightTrendPoint(
+                date=date.fromordinal(int(day)),
+                weight=float(weight),
+                trend=float(smoothed),
+                mean_7d=float(mean_7),
+                mean_30d=float(mean_30),
+            )
+            for day, weight, smoothed, mean_7, mean_30 in zip(
+                series.days[first:last],
+                series.weights[first:last],
+                series.trend[first:last],
+                series.mean_7[first:last],
+                series.mean_30[first:last],
+            )
+        ]
+        trend.current_trend = float(series.trend[-1])
+        trend.weekly_rate = series.weekly_rate()
+        last_day = int(series.days[-1])
+
+    trend.projected_date = _projected_date(trend.current_trend, trend.weekly_rate, target_weight, last_day)
+    return trend
+
+
+def _projected_date(current: float, weekly_rate: Optional[float], target: Optional[float], last_day: int) -> Optional[date]:
+    """Day the target is reached at the current rate, or None if it isn't being approached."""
+    if target is None or weekly_rate is None:
+        return None
+    remaining = target - current
+    if abs(remaining) < 0.05:
+        return date.fromordinal(last_day)
+    if remaining * weekly_rate <= 0:
+        return None
+    days_needed = remaining / weekly_rate * 7
+    if days_needed > MAX_PROJECTION_DAYS:
+        return None
+    return date.fromordinal(last_day + math.ceil(days_needed))
@@ -0,0 +1,170 @@
+"""
+Throughput and tail latency of the async database path (AsyncSession on
+aiosqlite, async def endpoints) against the sync path (Session in
+threadpool endpoints) under concurrent load.
+
+    python -m backend.benchmarks.async_db [--concurrency 1 16 64 256] [--seconds 5]
+
+Both paths serve the same two endpoints: a day of food logs with their foods
+(the dashboard read) and adding a weight log. Each client loops sending
+requests, one in --write-every being a write, through an in-process ASGI
+transport. The database is seeded in a temporary directory.
+
+Failed requests are counted as errors. Past ~40 clients the sync path can
+fill every threadpool thread with requests waiting for a pooled connection,
+while the sessions holding the connections wait for a thread to close them,
+until the pool's checkout timeout fails them.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+USER_ID = 1
+FOODS = 200
+DAYS = 60
+LOGS_PER_DAY = 20
+START = date(2024, 1, 1)
+
+
+def populate():
+    from sqlalchemy import insert
+    from backend.app import models
+    from backend.app.database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": USER_ID, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models.Food), [
+            {"id": i, "name": f"Food {i}", "calories": rng.uniform(20, 600), "protein": 10, "carbs": 20, "fat": 5, "owner_id": USER_ID}
+            for i in range(1, FOODS + 1)
+        ])
+        conn.execute(insert(models.FoodLog), [
+            {
+                "user_id": USER_ID,
+                "food_id": rng.randint(1, FOODS),
+                "servings": 1.0,
+                "date": START + timedelta(days=day),
+                "timestamp": 1704067200 + day * 86400 + i,
+            }
+            for day in range(DAYS) for i in range(LOGS_PER_DAY)
+        ])
+
+
+def build_app():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+    from backend.app import crud, crud_async, schemas
+    from backend.app.database import get_async_db, get_db
+
+    app = FastAPI()
+
+    @app.get("/sync/foodlogs", response_model=List[schemas.FoodLogRead])
+    def sync_food_logs(log_date: date, db: Session = Depends(get_db)):
+        return crud.get_food_logs(db, user_id=USER_ID, log_date=log_date)
+
+    @app.post("/sync/weightlogs", response_model=schemas.WeightLogRead)
+    def sync_weight_log(log: schemas.WeightLogCreate, db: Session = Depends(get_db)):
+        return crud.log_weight(db, log=log, user_id=USER_ID)
+
+    @app.get("/async/foodlogs", response_model=List[schemas.FoodLogRead])
+    async def async_food_logs(log_date: date, db: AsyncSession = Depends(get_async_db)):
+        return await crud_async.get_food_logs(db, user_id=USER_ID, log_date=log_date)
+
+    @app.post("/async/weightlogs", response_model=schemas.WeightLogRead)
+    async def async_weight_log(log: schemas.WeightLogCreate):
+        return await crud_async.log_weight(log=log, user_id=USER_ID)
+
+    return app
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+async def _client(client, path: str, write_every: int, stop: asyncio.Event, latencies: list, errors: list, seed: int):
+    rng = random.Random(seed)
+    sent = 0
+    while not stop.is_set():
+        sent += 1
+        started = time.perf_counter()
+        if write_every and sent % write_every == 0:
+            response = await client.post(f"/{path}/weightlogs", json={"weight": rng.uniform(60, 90)})
+        else:
+            day = START + timedelta(days=rng.randrange(DAYS))
+            response = await client.get(f"/{path}/foodlogs", params={"log_date": day.isoformat()})
+        if response.is_success:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            errors.append(response.status_code)
+
+
+async def measure(app, path: str, concurrency: int, seconds: float, write_every: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        stop = asyncio.Event()
+        latencies, errors = [], []
+        tasks = [
+            asyncio.create_task(_client(client, path, write_every, stop, latencies, errors, seed))
+            for seed in range(concurrency)
+        ]
+        started = time.perf_counter()
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    print(
+        f"{path:>5} c={concurrency:<4} {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {_percentile(latencies, 50):7.1f} ms  p99 {_percentile(latencies, 99):7.1f} ms  errors {len(errors)}"
+    )
+
+
+async def run(concurrency: List[int], seconds: float, write_every: int):
+    from backend.app.database import dispose
+    from backend.app.group_commit import writer
+
+    app = build_app()
+    for level in concurrency:
+        for path in ("sync", "async"):
+            await measure(app, path, level, seconds, write_every)
+    await writer.stop()
+    await dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-every", type=int, default=10, help="One request in N adds a weight log (0: reads only)")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        populate()
+        asyncio.run(run(args.concurrency, args.seconds, args.write_every))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app's database lives in the working directory
+        subprocess.run(
+            [sys.executable, "-m", "backend.benchmarks.async_db", "--measure",
+             "--concurrency", *map(str, args.concurrency),
+             "--seconds", str(args.seconds), "--write-every", str(args.write_every)],
+            cwd=tmp, env=dict(os.environ, PYTHONPATH=root), check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Requests per second for the conditional GET routes when the client's copy is
+stale (full 200 response) against when it is current (304).
+
+    python -m backend.benchmarks.conditional_get [--rows 100] [--seconds 3]
+
+Serves a day of --rows food logs, --rows weight logs and a goal through the
+app's routes with an in-process ASGI transport, one request at a time.
+"full" sends no If-None-Match; "revalidate" sends the ETag of the previous
+response, as a browser does for its cached copy.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+USER_ID = 1
+DAY = date(2024, 1, 1)
+
+
+def populate(rows: int):
+    from sqlalchemy import insert
+    from backend.app import migrations, models
+    from backend.app.database import engine
+
+    migrations.bootstrap(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": USER_ID, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models.Food), [
+            {"id": i, "name": f"Food {i}", "calories": 100 + i, "protein": 10, "carbs": 20, "fat": 5, "owner_id": USER_ID}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(models.FoodLog), [
+            {"user_id": USER_ID, "food_id": i % rows + 1, "servings": 1.5, "date": DAY, "timestamp": 1704067200 + i}
+            for i in range(rows)
+        ])
+        conn.execute(insert(models.WeightLog), [
+            {"user_id": USER_ID, "weight": 70 + i / 100, "date": DAY - timedelta(days=i), "timestamp": 1704067200 - i * 86400}
+            for i in range(rows)
+        ])
+        conn.execute(insert(models.Goal), [
+            {"user_id": USER_ID, "goal_type": models.GoalType.MAINTENANCE, "target_calories": 2200,
+             "target_protein": 165, "target_carbs": 220, "target_fat": 73}
+        ])
+
+
+async def _rate(client, path: str, params: dict, headers: dict, revalidate: bool, seconds: float) -> float:
+    expected = 304 if revalidate else 200
+    served = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        response = await client.get(path, params=params, headers=headers)
+        if response.status_code != expected:
+            raise SystemExit(f"{path}: expected {expected}, got {response.status_code}")
+        served += 1
+    return served / (time.perf_counter() - started)
+
+
+async def _measure(rows: int, seconds: float):
+    import httpx
+    from backend.app.core import security
+    from backend.app.database import dispose
+    from backend.app.group_commit import writer
+    from backend.app.main import app
+
+    token = security.create_access_token(data={"sub": str(USER_ID)})
+    auth = {"Authorization": f"Bearer {token}"}
+    routes = {
+        "foodlogs": ("/foodlogs/", {"log_date": DAY.isoformat(), "limit": rows}),
+        "weightlogs": ("/weightlogs/", {"limit": rows}),
+        "goals": ("/goals/", {}),
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (path, params) in routes.items():
+            first = await client.get(path, params=params, headers=auth)
+            first.raise_for_status()
+            current = dict(auth, **{"If-None-Match": first.headers["etag"]})
+            full = await _rate(client, path, params, auth, False, seconds)
+            revalidate = await _rate(client, path, params, current, True, seconds)
+            print(f"{name:>10}  full {full:7.0f} req/s  revalidate {revalidate:7.0f} req/s  x{revalidate / full:4.1f}  "
+                  f"({len(first.content)} bytes saved per request)")
+    await writer.stop()
+    await dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="Food logs and weight logs served")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Per route and variant")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        populate(args.rows)
+        asyncio.run(_measure(args.rows, args.seconds))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app's database lives in the working directory
+        subprocess.run(
+            [sys.executable, "-m", "backend.benchmarks.conditional_get", "--measure",
+             "--rows", str(args.rows), "--seconds", str(args.seconds)],
+            cwd=tmp, env=dict(os.environ, PYTHONPATH=root), check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
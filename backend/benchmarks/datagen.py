@@ -0,0 +1,169 @@
+"""
+Synthetic dataset for benchmarks: users with complete profiles, food
+libraries, and years of food and weight logs, bulk inserted into DATABASE_URL's
+database.
+
+    DATABASE_URL=sqlite:///./bench.db python -m backend.benchmarks.datagen [--users 100] [--days 730] [--foods 500]
+
+Every user is named user<id> with the password --password. Each keeps --foods
+foods of their own and logs on most days, mostly from a set of favourites,
+and weighs in on about two days out of three, drifting towards a goal. Days
+run up to today, so the app's "today" views have data. The generated rows
+are appended to whatever the database holds; their summaries are rebuilt and
+the food search index created or updated afterwards.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from backend.app import food_index, migrations, models
+from backend.app.core import passwords
+from backend.app.jobs import rebuild_summaries
+from .food_search import WORDS
+
+BATCH = 50000
+MEALS = [(7, 9), (12, 14), (18, 21), (10, 23)]
+
+
+def _foods(rng: random.Random, count: int, owner_id: int, first_id: int) -> list:
+    rows = []
+    for i in range(count):
+        protein, carbs, fat = rng.uniform(0, 40), rng.uniform(0, 80), rng.uniform(0, 30)
+        rows.append((
+            first_id + i,
+            " ".join(rng.sample(WORDS, rng.randint(2, 4))).capitalize(),
+            round(protein * 4 + carbs * 4 + fat * 9, 1),
+            round(protein, 1), round(carbs, 1), round(fat, 1),
+            owner_id,
+        ))
+    return rows
+
+
+def _day_logs(rng: random.Random, day: date, food_ids: range, favourites: int, user_id: int) -> list:
+    midnight = int(time.mktime(day.timetuple()))
+    rows = []
+    for _ in range(rng.randint(2, 8)):
+        # Most logs repeat a handful of favourite foods
+        if rng.random() < 0.8:
+            food_id = food_ids[rng.randrange(favourites)]
+        else:
+            food_id = rng.choice(food_ids)
+        start, end = rng.choice(MEALS)
+        timestamp = midnight + rng.randint(start * 3600, end * 3600 - 1)
+        rows.append((day.isoformat(), rng.choice((0.5, 1, 1, 1, 1.5, 2)), timestamp, food_id, user_id))
+    return rows
+
+
+class _Writer:
+    """Buffers rows per statement and inserts them BATCH at a time."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, sql: str, rows: list):
+        buffer = self.buffers.setdefault(sql, [])
+        buffer.extend(rows)
+        if len(buffer) >= BATCH:
+            self.flush(sql)
+
+    def flush(self, sql: str = None):
+        for key in [sql] if sql else list(self.buffers):
+            rows, self.buffers[key] = self.buffers[key], []
+            if rows:
+                self.conn.exec_driver_sql(key, rows)
+                self.counts[key] = self.counts.get(key, 0) + len(rows)
+
+
+_FOOD_SQL = "INSERT INTO foods (id, name, calories, protein, carbs, fat, owner_id) VALUES (?, ?, ?, ?, ?, ?, ?)"
+_FOOD_LOG_SQL = "INSERT INTO food_logs (date, servings, timestamp, food_id, user_id) VALUES (?, ?, ?, ?, ?)"
+_WEIGHT_LOG_SQL = "INSERT INTO weight_logs (date, weight, timestamp, user_id) VALUES (?, ?, ?, ?)"
+
+
+def generate(
+    engine: Engine,
+    users: int = 100,
+    days: int = 730,
+    foods: int = 500,
+    password: str = "bench",
+    seed: int = 0,
+    end: date = None,
+) -> dict:
+    """
+    Add `users` users with `foods` foods each and `days` days of logs ending
+    at `end` (today). Returns the number of rows added per table.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    # bcrypt is slow on purpose; every user shares one hash of the password
+    hashed_password = passwords._hash(password, passwords.BCRYPT_ROUNDS)
+
+    # Without the search index, whose triggers would fire on every insert
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        first_user = (conn.scalar(select(func.max(models.User.id))) or 0) + 1
+        next_food = (conn.scalar(select(func.max(models.Food.id))) or 0) + 1
+        user_ids = range(first_user, first_user + users)
+        conn.execute(insert(models.User), [
+            {
+                "id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com",
+                "hashed_password": hashed_password,
+                "date_of_birth": date(rng.randint(1955, 2005), rng.randint(1, 12), rng.randint(1, 28)),
+                "gender": rng.choice(list(models.Gender)),
+                "height_cm": round(rng.gauss(172, 9), 1),
+                "activity_level": rng.choice(list(models.ActivityLevel)),
+            }
+            for user_id in user_ids
+        ])
+
+        writer = _Writer(conn)
+        for user_id in user_ids:
+            food_ids = range(next_food, next_food + foods)
+            next_food += foods
+            writer.add(_FOOD_SQL, _foods(rng, foods, user_id, food_ids[0]))
+
+            favourites = max(1, foods // 20)
+            weight = rng.uniform(55, 110)
+            drift = rng.choice((-0.05, 0, 0.03))
+            for offset in range(days, 0, -1):
+                day = end - timedelta(days=offset - 1)
+                if rng.random() < 0.9:
+                    writer.add(_FOOD_LOG_SQL, _day_logs(rng, day, food_ids, favourites, user_id))
+                weight = max(40.0, weight + drift + rng.gauss(0, 0.3))
+                if rng.random() < 0.65:
+                    timestamp = int(time.mktime(day.timetuple())) + rng.randint(6 * 3600, 10 * 3600)
+                    writer.add(_WEIGHT_LOG_SQL, [(day.isoformat(), round(weight, 1), timestamp, user_id)])
+        writer.flush()
+        summaries = rebuild_summaries.rebuild(conn)
+
+    food_index.create(engine)
+    return {
+        "users": users,
+        "foods": writer.counts.get(_FOOD_SQL, 0),
+        "food_logs": writer.counts.get(_FOOD_LOG_SQL, 0),
+        "weight_logs": writer.counts.get(_WEIGHT_LOG_SQL, 0),
+        "daily_summaries": summaries,
+    }
+
+
+def main():
+    from backend.app.database import engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=730, help="Days of logs per user, ending today")
+    parser.add_argument("--foods", type=int, default=500, help="Foods in each user's library")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(engine, users=args.users, days=args.days, foods=args.foods, password=args.password, seed=args.seed)
+    print(", ".join(f"{count} {table}" for table, count in counts.items()) + f" in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Peak memory and throughput of the streaming food log export, compared with
+loading every log through the ORM before encoding it.
+
+    python -m backend.benchmarks.export --sizes 100000 1000000
+
+Each measurement runs in a fresh interpreter so peak RSS isn't carried over.
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import joinedload, sessionmaker
+from backend.app import export, models
+
+FOODS = 500
+
+
+def populate(path: str, size: int):
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(size)
+    start = date(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models.Food), [
+            {"id": i, "name": f"Food {i}", "calories": rng.uniform(20, 600), "protein": 10, "carbs": 20, "fat": 5, "owner_id": 1}
+            for i in range(1, FOODS + 1)
+        ])
+        batch = []
+        for i in range(size):
+            batch.append({
+                "user_id": 1,
+                "food_id": rng.randint(1, FOODS),
+                "servings": rng.choice([0.5, 1.0, 1.5, 2.0]),
+                "date": start + timedelta(days=i // 20),
+                "timestamp": 1577836800 + i * 3600,
+            })
+            if len(batch) == 50000:
+                conn.execute(insert(models.FoodLog), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.FoodLog), batch)
+    engine.dispose()
+
+
+def _loaded_rows(db):
+    logs = (
+        db.query(models.FoodLog)
+        .options(joinedload(models.FoodLog.food))
+        .filter(models.FoodLog.user_id == 1)
+        .order_by(models.FoodLog.date, models.FoodLog.timestamp, models.FoodLog.id)
+        .all()
+    )
+    for log in logs:
+        food = log.food
+        yield (log.id, log.date, log.timestamp, log.servings, food.id, food.name,
+               food.calories, food.protein, food.carbs, food.fat, food.external_id, food.source)
+
+
+def measure(path: str, mode: str, fmt: str, gzip: bool, size: int):
+    """Runs in the child process; prints one result line."""
+    engine = create_engine(f"sqlite:///{path}")
+    db = sessionmaker(bind=engine)()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    rows = export.food_log_rows(db, 1) if mode == "stream" else _loaded_rows(db)
+    if fmt == "csv":
+        chunks = export.encode_csv(export.FOOD_LOG_COLUMNS, rows)
+    else:
+        chunks = export.encode_ndjson([("foodlogs", export.FOOD_LOG_COLUMNS, rows)])
+    if gzip:
+        chunks = export.gzip_chunks(chunks)
+    written = sum(len(chunk) for chunk in chunks)
+    elapsed = time.perf_counter() - started
+
+    # ru_maxrss is in KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>6} {fmt:>6}{' gz' if gzip else '   '}  {elapsed:6.2f}s  {size / elapsed:8.0f} rows/s  "
+          f"{written / 1e6:7.1f} MB out  peak RSS {peak:7.1f} MB (idle {baseline / 1024:.1f} MB)")
+    db.close()
+    engine.dispose()
+
+
+def run(size: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        populate(path, size)
+        print(f"{size} food logs (setup {time.perf_counter() - started:.1f}s)")
+        for mode, fmt, gzip in [
+            ("load", "csv", False),
+            ("stream", "csv", False),
+            ("stream", "ndjson", False),
+            ("stream", "csv", True),
+        ]:
+            args = [sys.executable, "-m", "backend.benchmarks.export", "--measure", path, mode, fmt, str(size)]
+            if gzip:
+                args.append("--gzip")
+            subprocess.run(args, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--measure", nargs=4, metavar=("DB", "MODE", "FORMAT", "ROWS"), help=argparse.SUPPRESS)
+    parser.add_argument("--gzip", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        path, mode, fmt, rows = args.measure
+        measure(path, mode, fmt, args.gzip, int(rows))
+        return
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
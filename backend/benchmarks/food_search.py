@@ -0,0 +1,96 @@
+"""
+Compare library food search through the FTS index against the old ilike scan.
+
+    python -m backend.benchmarks.food_search --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from backend.app import crud, food_index, models
+
+WORDS = [
+    "chicken", "breast", "thigh", "beef", "ground", "lean", "pork", "loin", "salmon", "tuna",
+    "rice", "brown", "white", "basmati", "pasta", "whole", "wheat", "bread", "sourdough", "oats",
+    "greek", "yogurt", "plain", "vanilla", "milk", "skim", "cheese", "cheddar", "mozzarella", "egg",
+    "apple", "banana", "blueberry", "strawberry", "orange", "juice", "spinach", "broccoli", "carrot", "potato",
+    "sweet", "roasted", "grilled", "baked", "fried", "raw", "cooked", "organic", "protein", "bar",
+    "peanut", "butter", "almond", "olive", "oil", "avocado", "chocolate", "dark", "granola", "honey",
+]
+QUERIES = ["chicken", "greek yog", "rice", "pea but", "str", "grilled salmon", "choc bar", "xyz"]
+OWNERS = 100
+
+
+def populate(engine, size: int):
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(size)
+    batch = []
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": owner, "username": f"user{owner}", "email": f"user{owner}@example.com", "hashed_password": "x"}
+            for owner in range(1, OWNERS + 1)
+        ])
+        for i in range(size):
+            batch.append({
+                "name": " ".join(rng.sample(WORDS, rng.randint(2, 4))).capitalize(),
+                "calories": rng.uniform(20, 600),
+                "owner_id": rng.randint(1, OWNERS),
+            })
+            if len(batch) == 50000:
+                conn.execute(insert(models.Food), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Food), batch)
+    # Index created after the bulk insert, as on an existing database
+    food_index.create(engine)
+
+
+def ilike_search(db, user_id: int, search_term: str, limit: int = 100):
+    return (
+        db.query(models.Food)
+        .filter(models.Food.owner_id == user_id, models.Food.name.ilike(f"%{search_term}%"))
+        .limit(limit)
+        .all()
+    )
+
+
+def measure(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - started) / (repeat * len(QUERIES)) * 1000
+
+
+def run(size: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        started = time.perf_counter()
+        populate(engine, size)
+        setup = time.perf_counter() - started
+
+        db = sessionmaker(bind=engine)()
+        try:
+            fts_ms = measure(lambda q: crud.get_foods(db, user_id=1, search_term=q), repeat)
+            ilike_ms = measure(lambda q: ilike_search(db, 1, q), repeat)
+        finally:
+            db.close()
+            engine.dispose()
+
+    print(f"{size:>9} foods  setup {setup:6.1f}s  ilike {ilike_ms:8.3f} ms/query  fts {fts_ms:8.3f} ms/query  {ilike_ms / fts_ms:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Write throughput of group commit against one commit per write.
+
+    python -m backend.benchmarks.group_commit [--clients 1 16 64] [--seconds 5] [--durability full normal]
+
+Each client loops adding a food log or a weight log (alternately) through
+crud_async, as the POST endpoints do, with the production database profile.
+"per-row" sets GROUP_COMMIT_MAX_BATCH=1, so every write is its own
+transaction as before; "group" uses the configured delay and batch size. Every
+configuration runs in a fresh interpreter on its own seeded database file,
+for each WRITE_DURABILITY level.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import List
+
+USER_ID = 1
+FOODS = 100
+MODES = {"per-row": {"GROUP_COMMIT_MAX_BATCH": "1", "GROUP_COMMIT_DELAY_MS": "0"}, "group": {}}
+
+
+def populate():
+    from sqlalchemy import insert
+    from backend.app import migrations, models
+    from backend.app.database import engine
+
+    migrations.upgrade(engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": USER_ID, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models.Food), [
+            {"id": i, "name": f"Food {i}", "calories": rng.uniform(20, 600), "protein": 10, "carbs": 20, "fat": 5, "owner_id": USER_ID}
+            for i in range(1, FOODS + 1)
+        ])
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+async def _client(stop: asyncio.Event, latencies: list, errors: list, seed: int):
+    from backend.app import crud_async, schemas
+
+    rng = random.Random(seed)
+    sent = 0
+    while not stop.is_set():
+        sent += 1
+        started = time.perf_counter()
+        try:
+            if sent % 2:
+                log = schemas.FoodLogCreate(food_id=rng.randint(1, FOODS), servings=1, log_date=date.today())
+                await crud_async.log_food(log=log, user_id=USER_ID)
+            else:
+                await crud_async.log_weight(log=schemas.WeightLogCreate(weight=rng.uniform(60, 70)), user_id=USER_ID)
+        except Exception as e:
+            errors.append(e)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _measure(mode: str, clients: List[int], seconds: float):
+    from backend.app.database import WRITE_DURABILITY, dispose
+    from backend.app.group_commit import writer
+
+    for level in clients:
+        groups, committed = writer.groups, writer.committed
+        stop = asyncio.Event()
+        latencies, errors = [], []
+        tasks = [asyncio.create_task(_client(stop, latencies, errors, seed)) for seed in range(level)]
+        started = time.perf_counter()
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        group = (writer.committed - committed) / max(1, writer.groups - groups)
+        print(
+            f"{WRITE_DURABILITY.lower():>6} {mode:>7} c={level:<4} {len(latencies) / elapsed:8.1f} writes/s  "
+            f"p50 {_percentile(latencies, 50):7.1f} ms  p99 {_percentile(latencies, 99):7.1f} ms  "
+            f"mean group {group:5.1f}  errors {len(errors)}"
+        )
+    await writer.stop()
+    await dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--durability", nargs="+", default=["full", "normal"], choices=["full", "normal", "off"])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        populate()
+        asyncio.run(_measure(args.measure, args.clients, args.seconds))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for durability in args.durability:
+        for mode in args.modes:
+            env = dict(os.environ, DATABASE_PROFILE="production", WRITE_DURABILITY=durability, PYTHONPATH=root, **MODES[mode])
+            with tempfile.TemporaryDirectory() as tmp:
+                # The app's database lives in the working directory
+                subprocess.run(
+                    [sys.executable, "-m", "backend.benchmarks.group_commit", "--measure", mode,
+                     "--clients", *map(str, args.clients), "--seconds", str(args.seconds)],
+                    cwd=tmp, env=env, check=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Load test of the API: requests per second and p50/p95/p99 latency per endpoint.
+
+    python -m backend.benchmarks.load [--users 100] [--days 365] [--foods 500] [--dataset bench.db]
+        [--endpoints search foodlogs weightlogs goals_calculate login]
+        [--concurrency 16] [--seconds 10] [--output load.json] [--baseline previous.json]
+
+Runs the real app (with its startup and shutdown) in a fresh interpreter on a
+copy of --dataset, or on a dataset generated with datagen, through an
+in-process ASGI transport. USDA searches go to the local stand-in server
+(usda_stub) with --usda-latency-ms per call. Each endpoint is driven on its
+own by --concurrency clients for --seconds after --warmup seconds, every
+request as a random generated user:
+
+    search           GET /foods/search with one or two (partial) food words
+    foodlogs         GET /foodlogs/ for a random day with logs
+    weightlogs       GET /weightlogs/
+    goals_calculate  POST /goals/calculate with a random goal type
+    login            POST /auth/login (bcrypt at the configured BCRYPT_ROUNDS)
+
+The results, with the commit, configuration and dataset they were measured
+on, are written as JSON to --output (default load-<commit>.json). With
+--baseline, each endpoint is also compared with an earlier results file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+ENDPOINTS = ["search", "foodlogs", "weightlogs", "goals_calculate", "login"]
+GOAL_TYPES = ["weight_loss", "maintenance", "muscle_growth"]
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+def _search_query(rng: random.Random) -> str:
+    from .food_search import WORDS
+
+    words = rng.sample(WORDS, rng.choice((1, 1, 2)))
+    # Typed as far as a search-as-you-type box would have sent it
+    words[-1] = words[-1][:rng.randint(3, len(words[-1]))]
+    return " ".join(words)
+
+
+class Scenario:
+    """The generated users and days to draw requests from."""
+
+    def __init__(self, users: list, first_day: date, last_day: date, password: str):
+        from backend.app.core import security
+
+        self.users = users
+        self.first_day = first_day
+        self.last_day = last_day
+        self.password = password
+        self.headers = {
+            user_id: {"Authorization": f"Bearer {security.create_access_token(data={'sub': str(user_id)})}"}
+            for user_id, _ in users
+        }
+
+    def request(self, name: str, rng: random.Random) -> tuple:
+        """(method, path, httpx request arguments) of one request to endpoint `name`."""
+        user_id, username = rng.choice(self.users)
+        headers = self.headers[user_id]
+        if name == "search":
+            return "GET", "/foods/search", {"params": {"q": _search_query(rng)}, "headers": headers}
+        if name == "foodlogs":
+            day = self.first_day + timedelta(days=rng.randint(0, (self.last_day - self.first_day).days))
+            return "GET", "/foodlogs/", {"params": {"log_date": day.isoformat()}, "headers": headers}
+        if name == "weightlogs":
+            return "GET", "/weightlogs/", {"headers": headers}
+        if name == "goals_calculate":
+            return "POST", "/goals/calculate", {"json": {"goal_type": rng.choice(GOAL_TYPES)}, "headers": headers}
+        if name == "login":
+            return "POST", "/auth/login", {"data": {"username": username, "password": self.password}}
+        raise ValueError(f"Unknown endpoint {name}")
+
+
+async def _client(client, scenario: Scenario, name: str, stop: asyncio.Event, latencies: list, statuses: Counter, seed: int):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        method, path, kwargs = scenario.request(name, rng)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except Exception as e:
+            statuses[type(e).__name__] += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses[str(response.status_code)] += 1
+
+
+async def drive(client, scenario: Scenario, name: str, concurrency: int, seconds: float) -> dict:
+    """Run `concurrency` clients against one endpoint for `seconds`; their latencies and throughput."""
+    stop = asyncio.Event()
+    latencies, statuses = [], Counter()
+    tasks = [
+        asyncio.create_task(_client(client, scenario, name, stop, latencies, statuses, seed))
+        for seed in range(concurrency)
+    ]
+    started = time.perf_counter()
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "status": dict(statuses),
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "mean": sum(latencies) / len(latencies) if latencies else float("nan"),
+            "max": max(latencies, default=float("nan")),
+        },
+    }
+
+
+def _prepare(args) -> dict:
+    """Put the dataset in place and bring it up to date; what it holds."""
+    from sqlalchemy import func, select
+    from backend.app import migrations, models
+    from backend.app.database import engine
+    from . import datagen
+
+    if args.dataset:
+        generated = None
+    else:
+        generated = datagen.generate(engine, users=args.users, days=args.days, foods=args.foods, password=args.password)
+    migrations.bootstrap(engine)
+    with engine.connect() as conn:
+        counts = {
+            table.__tablename__: conn.scalar(select(func.count()).select_from(table))
+            for table in (models.User, models.Food, models.FoodLog, models.WeightLog)
+        }
+    engine.dispose()
+    return {"source": os.path.basename(args.dataset) if args.dataset else "datagen", "generated": generated, "rows": counts}
+
+
+async def _measure(args) -> dict:
+    import httpx
+    from sqlalchemy import func, select
+    from backend.app import models
+    from backend.app.database import engine
+    from backend.app.main import app
+
+    with engine.connect() as conn:
+        users = [tuple(row) for row in conn.execute(select(models.User.id, models.User.username).order_by(models.User.id))]
+        first_day, last_day = conn.execute(select(func.min(models.FoodLog.date), func.max(models.FoodLog.date))).one()
+    scenario = Scenario(users, first_day or date.today(), last_day or date.today(), args.password)
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in args.endpoints:
+                if args.warmup:
+                    await drive(client, scenario, name, args.concurrency, args.warmup)
+                results[name] = await drive(client, scenario, name, args.concurrency, args.seconds)
+                print(_row(name, results[name]), flush=True)
+    return results
+
+
+def _row(name: str, result: dict) -> str:
+    latency = result["latency_ms"]
+    return (
+        f"{name:>16} {result['rps']:9.1f} req/s  p50 {latency['p50']:8.1f}  p95 {latency['p95']:8.1f}  "
+        f"p99 {latency['p99']:8.1f} ms  errors {result['errors']}"
+    )
+
+
+def _git(root: str, *args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: dict, baseline: dict):
+    """Print each endpoint's throughput and p95/p99 latency change against a baseline results file."""
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')}):")
+    for name, result in results["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:>16}  not in baseline")
+            continue
+        changes = [f"req/s {(result['rps'] / before['rps'] - 1) * 100:+6.1f}%"]
+        for q in ("p95", "p99"):
+            changes.append(f"{q} {(result['latency_ms'][q] / before['latency_ms'][q] - 1) * 100:+6.1f}%")
+        print(f"{name:>16}  " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="Users to generate")
+    parser.add_argument("--days", type=int, default=365, help="Days of logs to generate per user")
+    parser.add_argument("--foods", type=int, default=500, help="Foods to generate per user")
+    parser.add_argument("--dataset", help="SQLite database to run on (a copy) instead of generating one")
+    parser.add_argument("--password", default="bench", help="Password of the dataset's users")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Per endpoint")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds per endpoint before measuring")
+    parser.add_argument("--usda-latency-ms", type=float, default=50)
+    parser.add_argument("--profile", default="production", choices=["development", "production"], help="DATABASE_PROFILE")
+    parser.add_argument("--output", help="Results file (default load-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        from backend.app.core import passwords
+        from . import usda_stub
+
+        # Before the app is imported, so its settings see the stand-in
+        server, url = usda_stub.serve(latency=args.usda_latency_ms / 1000)
+        os.environ.update(USDA_API_URL=url, USDA_API_KEY="bench")
+        dataset = _prepare(args)
+        results = asyncio.run(_measure(args))
+        server.shutdown()
+        with open(args.measure, "w") as f:
+            json.dump({
+                "bcrypt_rounds": passwords.BCRYPT_ROUNDS,
+                "dataset": dataset,
+                "usda_requests": server.RequestHandlerClass.requests,
+                "results": results,
+            }, f)
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    commit = _git(root, "rev-parse", "--short", "HEAD")
+    output = args.output or f"load-{commit or 'unknown'}.json"
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [
+            sys.executable, "-m", "backend.benchmarks.load", "--measure", os.path.join(tmp, "results.json"),
+            "--endpoints", *args.endpoints, "--concurrency", str(args.concurrency), "--seconds", str(args.seconds),
+            "--warmup", str(args.warmup), "--usda-latency-ms", str(args.usda_latency_ms), "--password", args.password,
+        ]
+        if args.dataset:
+            shutil.copyfile(args.dataset, os.path.join(tmp, "chunklog.db"))
+            command += ["--dataset", args.dataset]
+        else:
+            command += ["--users", str(args.users), "--days", str(args.days), "--foods", str(args.foods)]
+        # The app's database and USDA cache live in the working directory
+        env = dict(
+            os.environ, PYTHONPATH=root, DATABASE_PROFILE=args.profile, DATABASE_URL="sqlite:///./chunklog.db",
+            ASYNC_DATABASE_URL="", USDA_MIRROR_PATH="", SEARCH_OPENFOODFACTS="0",
+        )
+        subprocess.run(command, cwd=tmp, env=env, check=True)
+        with open(os.path.join(tmp, "results.json")) as f:
+            measured = json.load(f)
+
+    results = {
+        "commit": commit,
+        "dirty": bool(_git(root, "status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "concurrency": args.concurrency, "seconds": args.seconds, "warmup": args.warmup,
+            "usda_latency_ms": args.usda_latency_ms, "database_profile": args.profile,
+        },
+        **measured,
+    }
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Latency of ordinary endpoints during a login storm, with bcrypt in the
+request threadpool (PASSWORD_HASH_WORKERS=0, the old behaviour) and in the
+password process pool.
+
+    python -m backend.benchmarks.login_storm [--logins 100] [--seconds 5]
+
+A steady probe requests GET /foodlogs/ while --logins clients log in back
+to back. Clients that get a
+503 wait for its Retry-After before trying again.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+async def _probe(client, headers, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/foodlogs/", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def _login_loop(client, stop: asyncio.Event, counts: dict):
+    while not stop.is_set():
+        response = await client.post("/auth/login", data={"username": "bench", "password": "benchpass"})
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+async def _measure(logins: int, seconds: float):
+    import httpx
+    from backend.app import migrations
+    from backend.app.main import app
+    from backend.app.core.passwords import password_pool
+    from backend.app.database import dispose, engine
+
+    migrations.bootstrap(engine)
+    password_pool.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await client.post("/users/", json={"username": "bench", "email": "bench@example.com", "password": "benchpass"})
+        token = (await client.post("/auth/login", data={"username": "bench", "password": "benchpass"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        results = {}
+        for phase, storm in (("idle", 0), ("storm", logins)):
+            stop = asyncio.Event()
+            latencies, counts = [], {}
+            tasks = [asyncio.create_task(_probe(client, headers, stop, latencies))]
+            tasks += [asyncio.create_task(_login_loop(client, stop, counts)) for _ in range(storm)]
+            started = time.perf_counter()
+            await asyncio.sleep(seconds)
+            stop.set()
+            await asyncio.gather(*tasks)
+            # Logins already in flight finish after stop, so rate over the whole phase
+            results[phase] = (latencies, counts, time.perf_counter() - started)
+    password_pool.shutdown()
+    # No lifespan runs under ASGITransport; aiosqlite's threads keep the process alive until disposed
+    await dispose()
+
+    label = f"workers={password_pool.workers}"
+    for phase, (latencies, counts, elapsed) in results.items():
+        logins_done = counts.get(200, 0)
+        print(
+            f"{label:>10} {phase:>5}: probe p50 {_percentile(latencies, 50):7.1f} ms  p99 {_percentile(latencies, 99):7.1f} ms  "
+            f"({len(latencies)} probes)  logins {logins_done / elapsed:5.1f}/s  shed {counts.get(503, 0)}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100, help="Concurrent login clients")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Password pool size to compare with")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        asyncio.run(_measure(args.logins, args.seconds))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for workers, queue in ((0, 100000), (args.workers, None)):
+        env = dict(os.environ, PASSWORD_HASH_WORKERS=str(workers), PYTHONPATH=root)
+        if queue is not None:
+            env["PASSWORD_HASH_QUEUE"] = str(queue)
+        with tempfile.TemporaryDirectory() as tmp:
+            # The app's database lives in the working directory
+            subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.login_storm", "--measure",
+                 "--logins", str(args.logins), "--seconds", str(args.seconds)],
+                cwd=tmp, env=env, check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cost of the request and database instrumentation.
+
+    python -m backend.benchmarks.metrics_overhead [--requests 50000] [--queries 50000]
+
+"request" calls a minimal ASGI app (headers and a body, as a matched route)
+directly, without and with MetricsMiddleware (and with Server-Timing headers
+on top), so the difference is the middleware alone; "query" runs SELECT 1 on
+an in-memory SQLite engine without and with instrument_engine's hooks.
+Reported per request / per query, best of --rounds interleaved runs.
+"""
+import argparse
+import asyncio
+import time
+
+
+class _Route:
+    path = "/items/{item_id}"
+
+
+async def _endpoint(scope, receive, send):
+    # What the router leaves in the scope for the middleware
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"id":1}'})
+
+
+def build_app(middleware: bool, server_timing: bool = False):
+    from backend.app.core.instrumentation import MetricsMiddleware
+
+    return MetricsMiddleware(_endpoint, server_timing=server_timing) if middleware else _endpoint
+
+
+async def _requests(app, count: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/items/1", "raw_path": b"/items/1", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / count
+
+
+def _queries(instrumented: bool, count: int) -> float:
+    from sqlalchemy import create_engine, text
+    from backend.app.core.instrumentation import instrument_engine
+
+    engine = create_engine("sqlite://")
+    if instrumented:
+        instrument_engine(engine)
+    statement = text("SELECT 1")
+    with engine.connect() as conn:
+        conn.execute(statement)
+        started = time.perf_counter()
+        for _ in range(count):
+            conn.execute(statement)
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    apps = {
+        "plain": build_app(False),
+        "metrics": build_app(True),
+        "metrics+timing": build_app(True, server_timing=True),
+    }
+    # Interleaved, so drift in machine load affects every variant alike
+    times = {name: float("inf") for name in apps}
+    for _ in range(args.rounds):
+        for name, app in apps.items():
+            times[name] = min(times[name], asyncio.run(_requests(app, args.requests)))
+    for name, per_request in times.items():
+        print(f"request {name:>15} {per_request * 1e6:7.1f} us  overhead {(per_request - times['plain']) * 1e6:5.1f} us")
+
+    plain = hooked = float("inf")
+    for _ in range(args.rounds):
+        plain = min(plain, _queries(False, args.queries))
+        hooked = min(hooked, _queries(True, args.queries))
+    print(f"query   {'plain':>15} {plain * 1e6:7.1f} us")
+    print(f"query   {'instrumented':>15} {hooked * 1e6:7.1f} us  overhead {(hooked - plain) * 1e6:5.1f} us")
+
+
+if __name__ == "__main__":
+    main()
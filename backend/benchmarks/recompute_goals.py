@@ -0,0 +1,85 @@
+"""
+Time the bulk goal recomputation job and check it against the per-user path.
+
+    python -m backend.benchmarks.recompute_goals --users 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from backend.app import models
+from backend.app.jobs import recompute_goals
+
+GENDERS = ["MALE", "FEMALE", None]
+ACTIVITY = ["SEDENTARY", "LIGHT", "MODERATE", "ACTIVE", "VERY_ACTIVE", None]
+GOALS = ["WEIGHT_LOSS", "MAINTENANCE", "MUSCLE_GROWTH"]
+
+
+def populate(engine, users: int):
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(users)
+    start = date(2024, 1, 1)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for first in range(1, users + 1, 100000):
+            ids = range(first, min(first + 100000, users + 1))
+            cursor.executemany(
+                "INSERT INTO users (id, username, email, hashed_password, date_of_birth, gender, height_cm, activity_level) "
+                "VALUES (?, ?, ?, 'x', ?, ?, ?, ?)",
+                [(
+                    i, f"user{i}", f"user{i}@example.com",
+                    (date(1950, 1, 1) + timedelta(days=rng.randint(0, 20000))).isoformat() if rng.random() > 0.02 else None,
+                    rng.choice(GENDERS) if rng.random() < 0.05 else rng.choice(GENDERS[:2]),
+                    round(rng.uniform(150, 200), 1),
+                    rng.choice(ACTIVITY[:5]) if rng.random() > 0.01 else None,
+                ) for i in ids],
+            )
+            cursor.executemany(
+                "INSERT INTO goals (user_id, goal_type, target_weight, target_calories) VALUES (?, ?, ?, ?)",
+                [(i, rng.choice(GOALS), None, 2000.0) for i in ids],
+            )
+            logs = []
+            for i in ids:
+                for n in range(rng.choice([0, 1, 2, 3])):
+                    logs.append((i, (start + timedelta(days=rng.randint(0, 300))).isoformat(), n, round(rng.uniform(45, 150), 1)))
+            cursor.executemany("INSERT INTO weight_logs (user_id, date, timestamp, weight) VALUES (?, ?, ?, ?)", logs)
+            raw.commit()
+    finally:
+        raw.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--check-users", type=int, default=100000, help="Parity check on a database of this size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'check.db')}")
+        populate(engine, args.check_users)
+        with engine.connect() as conn:
+            stats = recompute_goals.recompute(conn, args.chunk_size, check=True)
+        print(f"parity: {stats['scanned']} users, {stats['skipped']} incomplete, {stats['mismatched']} mismatched")
+        engine.dispose()
+
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        started = time.perf_counter()
+        populate(engine, args.users)
+        print(f"{args.users} users (setup {time.perf_counter() - started:.1f}s)")
+        for label in ("first run", "unchanged rerun"):
+            started = time.perf_counter()
+            with engine.connect() as conn:
+                stats = recompute_goals.recompute(conn, args.chunk_size)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>16}: {elapsed:6.1f}s  {stats['scanned'] / elapsed:9.0f} users/s  "
+                  f"{stats['updated']} updated, {stats['skipped']} skipped")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Rows per second served by the list endpoints, encoding ORM objects through
+their response_model (orm) against column rows encoded by the schemas' row
+adapters (rows).
+
+    python -m backend.benchmarks.serialization [--rows 500] [--seconds 3]
+
+For each endpoint (a day of food logs with their foods, a page of the food
+log range, weight logs, the food library) both variants serve the same
+query through an in-process ASGI transport, one request at a time; the
+responses are checked to be identical first. "encode" times the encoding
+step alone on rows already loaded: validating into the Read models and
+dumping them, against dumping the dicts.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+USER_ID = 1
+DAY = date(2024, 1, 1)
+
+
+def populate(rows: int):
+    from sqlalchemy import insert
+    from backend.app import migrations, models
+    from backend.app.database import engine
+
+    migrations.bootstrap(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": USER_ID, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models.Food), [
+            {"id": i, "name": f"Food {i}", "calories": 100 + i, "protein": 10, "carbs": 20, "fat": 5,
+             "owner_id": USER_ID, "external_id": str(i) if i % 2 else None, "source": "USDA" if i % 2 else None}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(models.FoodLog), [
+            {"user_id": USER_ID, "food_id": i % rows + 1, "servings": 1.5, "date": DAY, "timestamp": 1704067200 + i}
+            for i in range(rows)
+        ])
+        conn.execute(insert(models.WeightLog), [
+            {"user_id": USER_ID, "weight": 70 + i / 100, "date": DAY - timedelta(days=i), "timestamp": 1704067200 - i * 86400}
+            for i in range(rows)
+        ])
+
+
+def build_app():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from backend.app import crud_async, schemas
+    from backend.app.core.responses import json_rows
+    from backend.app.database import get_async_read_db
+
+    app = FastAPI()
+
+    @app.get("/orm/foodlogs", response_model=List[schemas.FoodLogRead])
+    async def orm_food_logs(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        return await crud_async.get_food_logs(db, user_id=USER_ID, log_date=DAY, limit=limit)
+
+    @app.get("/rows/foodlogs", response_model=List[schemas.FoodLogRead])
+    async def rows_food_logs(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        return json_rows(schemas.food_log_rows, await crud_async.get_food_log_rows(db, user_id=USER_ID, log_date=DAY, limit=limit))
+
+    @app.get("/orm/range", response_model=schemas.FoodLogPage)
+    async def orm_range(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        logs = await crud_async.get_food_logs_range(db, user_id=USER_ID, start=DAY, end=DAY, limit=limit)
+        return {"items": logs, "next_cursor": None}
+
+    @app.get("/rows/range", response_model=schemas.FoodLogPage)
+    async def rows_range(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        rows = await crud_async.get_food_log_rows_range(db, user_id=USER_ID, start=DAY, end=DAY, limit=limit)
+        return json_rows(schemas.food_log_page_rows, {"items": rows, "next_cursor": None})
+
+    @app.get("/orm/weightlogs", response_model=List[schemas.WeightLogRead])
+    async def orm_weight_logs(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        return await crud_async.get_weight_logs(db, user_id=USER_ID, limit=limit)
+
+    @app.get("/rows/weightlogs", response_model=List[schemas.WeightLogRead])
+    async def rows_weight_logs(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        return json_rows(schemas.weight_log_rows, await crud_async.get_weight_log_rows(db, user_id=USER_ID, limit=limit))
+
+    @app.get("/orm/foods", response_model=List[schemas.FoodRead])
+    async def orm_foods(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        return await crud_async.get_foods(db, user_id=USER_ID, limit=limit)
+
+    @app.get("/rows/foods", response_model=List[schemas.FoodRead])
+    async def rows_foods(limit: int, db: AsyncSession = Depends(get_async_read_db)):
+        return json_rows(schemas.food_rows, await crud_async.get_food_rows(db, user_id=USER_ID, limit=limit))
+
+    return app
+
+
+async def _rate(client, path: str, rows: int, seconds: float) -> float:
+    served = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        response = await client.get(path, params={"limit": rows})
+        response.raise_for_status()
+        served += rows
+    return served / (time.perf_counter() - started)
+
+
+async def _encode_rates(rows: int, seconds: float) -> dict:
+    """Encoding alone, on rows already loaded by each variant's query."""
+    from pydantic import TypeAdapter
+    from backend.app import crud_async, schemas
+    from backend.app.database import AsyncReadSessionLocal
+
+    cases = {
+        "foodlogs": (List[schemas.FoodLogRead], crud_async.get_food_logs, crud_async.get_food_log_rows, schemas.food_log_rows, {"log_date": DAY}),
+        "weightlogs": (List[schemas.WeightLogRead], crud_async.get_weight_logs, crud_async.get_weight_log_rows, schemas.weight_log_rows, {}),
+        "foods": (List[schemas.FoodRead], crud_async.get_foods, crud_async.get_food_rows, schemas.food_rows, {}),
+    }
+    rates = {}
+    async with AsyncReadSessionLocal() as db:
+        for name, (model, get_objects, get_rows, adapter, kwargs) in cases.items():
+            objects = await get_objects(db, user_id=USER_ID, limit=rows, **kwargs)
+            dicts = await get_rows(db, user_id=USER_ID, limit=rows, **kwargs)
+            model_adapter = TypeAdapter(model)
+            for variant, encode in (
+                ("orm", lambda: model_adapter.dump_json(model_adapter.validate_python(objects, from_attributes=True))),
+                ("rows", lambda: adapter.dump_json(dicts)),
+            ):
+                runs = 0
+                started = time.perf_counter()
+                while time.perf_counter() - started < seconds / 2:
+                    encode()
+                    runs += 1
+                rates[(name, variant)] = runs * rows / (time.perf_counter() - started)
+    return rates
+
+
+async def _measure(rows: int, seconds: float):
+    import httpx
+    from backend.app.database import dispose
+
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in ("foodlogs", "range", "weightlogs", "foods"):
+            orm = (await client.get(f"/orm/{endpoint}", params={"limit": rows})).json()
+            fast = (await client.get(f"/rows/{endpoint}", params={"limit": rows})).json()
+            if orm != fast:
+                raise SystemExit(f"/{endpoint}: responses differ")
+            before = await _rate(client, f"/orm/{endpoint}", rows, seconds)
+            after = await _rate(client, f"/rows/{endpoint}", rows, seconds)
+            print(f"{endpoint:>10}  endpoint  orm {before:9.0f} rows/s  rows {after:9.0f} rows/s  x{after / before:4.1f}")
+    encode = await _encode_rates(rows, seconds)
+    for endpoint in ("foodlogs", "weightlogs", "foods"):
+        before, after = encode[(endpoint, "orm")], encode[(endpoint, "rows")]
+        print(f"{endpoint:>10}    encode  orm {before:9.0f} rows/s  rows {after:9.0f} rows/s  x{after / before:4.1f}")
+    await dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="Rows per response")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Per endpoint and variant")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        populate(args.rows)
+        asyncio.run(_measure(args.rows, args.seconds))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app's database lives in the working directory
+        subprocess.run(
+            [sys.executable, "-m", "backend.benchmarks.serialization", "--measure",
+             "--rows", str(args.rows), "--seconds", str(args.seconds)],
+            cwd=tmp, env=dict(os.environ, PYTHONPATH=root), check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Mixed read/write load against the app with the development database profile
+(SQLite defaults, one pool) and the production profile (WAL, tuned pragmas,
+separate read pool and a single writer connection).
+
+    python -m backend.benchmarks.sqlite_profile [--clients 32] [--seconds 10] [--write-every 5]
+
+Each client loops over the dashboard reads (a day of food logs, the month's
+daily summaries) and, every --write-every requests, a write (a food log or a
+weigh-in, the latter also recalculating the goal in the background). Each
+profile runs in a fresh interpreter on its own seeded database file.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+FOODS = 200
+DAYS = 90
+LOGS_PER_DAY = 10
+TODAY = date.today()
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+def populate():
+    from sqlalchemy import insert
+    from backend.app import migrations, models
+    from backend.app.core.security import get_password_hash
+    from backend.app.database import engine
+    from backend.app.jobs import rebuild_summaries
+
+    migrations.bootstrap(engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": get_password_hash("benchpass"),
+            "date_of_birth": date(1990, 1, 1), "gender": models.Gender.FEMALE, "height_cm": 170,
+        }])
+        conn.execute(insert(models.Goal), [{"user_id": 1, "goal_type": models.GoalType.MAINTENANCE}])
+        conn.execute(insert(models.Food), [
+            {"id": i, "name": f"Food {i}", "calories": rng.uniform(20, 600), "protein": 10, "carbs": 20, "fat": 5, "owner_id": 1}
+            for i in range(1, FOODS + 1)
+        ])
+        conn.execute(insert(models.FoodLog), [
+            {
+                "user_id": 1,
+                "food_id": rng.randint(1, FOODS),
+                "servings": 1.0,
+                "date": TODAY - timedelta(days=day),
+                "timestamp": int(time.time()) - day * 86400 + i,
+            }
+            for day in range(DAYS) for i in range(LOGS_PER_DAY)
+        ])
+        rebuild_summaries.rebuild(conn)
+
+
+async def _client(client, headers, write_every: int, stop: asyncio.Event, stats: dict, seed: int):
+    rng = random.Random(seed)
+    sent = 0
+    while not stop.is_set():
+        sent += 1
+        write = write_every and sent % write_every == 0
+        started = time.perf_counter()
+        if write and rng.random() < 0.5:
+            response = await client.post("/foodlogs/", json={"food_id": rng.randint(1, FOODS), "servings": 1}, headers=headers)
+        elif write:
+            response = await client.post("/weightlogs/", json={"weight": rng.uniform(60, 70)}, headers=headers)
+        elif rng.random() < 0.5:
+            day = TODAY - timedelta(days=rng.randrange(DAYS))
+            response = await client.get("/foodlogs/", params={"log_date": day.isoformat()}, headers=headers)
+        else:
+            start = TODAY - timedelta(days=29)
+            response = await client.get("/foodlogs/summary", params={"start": start.isoformat(), "end": TODAY.isoformat()}, headers=headers)
+        kind = "write" if write else "read"
+        if response.is_success:
+            stats[kind].append((time.perf_counter() - started) * 1000)
+        else:
+            stats["errors"] += 1
+
+
+async def _measure(clients: int, seconds: float, write_every: int):
+    import httpx
+    from backend.app.database import DATABASE_PROFILE, dispose
+    from backend.app.group_commit import writer
+    from backend.app.main import app
+
+    populate()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        token = (await client.post("/auth/login", data={"username": "bench", "password": "benchpass"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        stop = asyncio.Event()
+        stats = {"read": [], "write": [], "errors": 0}
+        tasks = [
+            asyncio.create_task(_client(client, headers, write_every, stop, stats, seed))
+            for seed in range(clients)
+        ]
+        started = time.perf_counter()
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    # No lifespan runs under ASGITransport; aiosqlite's threads keep the process alive until disposed
+    await writer.stop()
+    await dispose()
+
+    reads, writes = stats["read"], stats["write"]
+    print(
+        f"{DATABASE_PROFILE:>11}: {(len(reads) + len(writes)) / elapsed:7.1f} req/s  "
+        f"read p50 {_percentile(reads, 50):6.1f} p99 {_percentile(reads, 99):7.1f} ms  "
+        f"write p50 {_percentile(writes, 50):6.1f} p99 {_percentile(writes, 99):7.1f} ms  errors {stats['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-every", type=int, default=5, help="One request in N is a write")
+    parser.add_argument("--profiles", nargs="+", default=["development", "production"])
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        asyncio.run(_measure(args.clients, args.seconds, args.write_every))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for profile in args.profiles:
+        # Cheap bcrypt; logins aren't what's being measured
+        env = dict(os.environ, DATABASE_PROFILE=profile, BCRYPT_ROUNDS="4", PYTHONPATH=root)
+        with tempfile.TemporaryDirectory() as tmp:
+            # The app's database lives in the working directory
+            subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.sqlite_profile", "--measure",
+                 "--clients", str(args.clients), "--seconds", str(args.seconds), "--write-every", str(args.write_every)],
+                cwd=tmp, env=env, check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
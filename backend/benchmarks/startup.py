@@ -0,0 +1,141 @@
+"""
+Worker startup: cold import time and time to first response.
+
+    python -m backend.benchmarks.startup [--workers 1 8] [--rounds 3]
+
+Starts --workers fresh interpreters at once against one database (production
+profile), as a multi-worker server does on deploy. Each imports the app, runs
+its startup, then serves its first request (GET /) and its first database
+read (GET /foods/) through an in-process ASGI transport.
+
+"per-worker" has every worker bootstrap the database on startup (schema
+check and upgrade, food search index), as importing the app used to;
+"once" runs `python -m backend.app.migrations` before starting the workers,
+which then don't touch the database until their first request. Both run on
+a new empty database ("fresh", a first deploy) and on a seeded, already
+migrated one ("seeded", a redeploy). Reported per phase as median/slowest
+worker in ms: importing the app, its startup, the first response and the
+first database read; then the time from launch (including the one-off
+migration) until the last worker has served both.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+USER_ID = 1
+FOODS = 2000
+MODES = {"per-worker": "1", "once": "0"}
+
+
+def populate():
+    from sqlalchemy import insert
+    from backend.app import migrations, models
+    from backend.app.database import engine
+
+    migrations.bootstrap(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": USER_ID, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models.Food), [
+            {"name": f"Food {i}", "calories": 100, "owner_id": USER_ID} for i in range(FOODS)
+        ])
+    engine.dispose()
+
+
+async def _first_requests(app, started: float) -> dict:
+    import httpx
+    from backend.app.core import security
+
+    timings = {}
+    async with app.router.lifespan_context(app):
+        timings["startup"] = time.perf_counter() - started
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            mark = time.perf_counter()
+            (await client.get("/")).raise_for_status()
+            timings["first_response"] = time.perf_counter() - mark
+            token = security.create_access_token(data={"sub": str(USER_ID)})
+            mark = time.perf_counter()
+            (await client.get("/foods/", headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+            timings["first_db_read"] = time.perf_counter() - mark
+    return timings
+
+
+def _worker():
+    started = time.perf_counter()
+    from backend.app.main import app
+
+    imported = time.perf_counter()
+    timings = asyncio.run(_first_requests(app, imported))
+    timings["import"] = imported - started
+    print(json.dumps({key: value * 1000 for key, value in timings.items()}))
+
+
+def _run(mode: str, workers: int, env: dict, seeded: bool) -> Tuple[List[dict], float]:
+    env = dict(env, DATABASE_AUTO_MIGRATE=MODES[mode])
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app's database lives in the working directory
+        if seeded:
+            subprocess.run([sys.executable, "-m", "backend.benchmarks.startup", "--populate"], cwd=tmp, env=env, check=True)
+        launched = time.perf_counter()
+        if mode == "once":
+            subprocess.run([sys.executable, "-m", "backend.app.migrations"], cwd=tmp, env=env, check=True, capture_output=True)
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-m", "backend.benchmarks.startup", "--worker"],
+                cwd=tmp, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            )
+            for _ in range(workers)
+        ]
+        results = []
+        for process in processes:
+            out, _ = process.communicate()
+            results.append(json.loads(out.strip().splitlines()[-1]) if process.returncode == 0 else None)
+        total = (time.perf_counter() - launched) * 1000
+    return results, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--populate", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker()
+        return
+    if args.populate:
+        populate()
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, DATABASE_PROFILE="production", PASSWORD_HASH_WORKERS="0", PYTHONPATH=root)
+    for seeded in (False, True):
+        for workers in args.workers:
+            for mode in MODES:
+                results, totals = [], []
+                for _ in range(args.rounds):
+                    round_results, total = _run(mode, workers, env, seeded)
+                    results += round_results
+                    totals.append(total)
+                ok = [result for result in results if result]
+                phases = "  ".join(
+                    f"{key} {statistics.median(r[key] for r in ok):5.0f}/{max(r[key] for r in ok):5.0f}"
+                    for key in ("import", "startup", "first_response", "first_db_read")
+                ) if ok else ""
+                print(
+                    f"{'seeded' if seeded else 'fresh':>6} workers={workers:<3} {mode:>10}  {phases}  "
+                    f"total {statistics.median(totals):6.0f} ms  failed {len(results) - len(ok)}"
+                )
+
+
+if __name__ == "__main__":
+    main()
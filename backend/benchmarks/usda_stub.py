@@ -0,0 +1,91 @@
+"""
+Local stand-in for the USDA FoodData Central search API, so benchmarks and
+development don't depend on (or hammer) the real one.
+
+    python -m backend.benchmarks.usda_stub [--port 8081] [--latency-ms 50]
+
+then run the app with USDA_API_URL=http://127.0.0.1:8081 and any
+USDA_API_KEY. GET /foods/search answers with pageSize made-up foods named
+after the query, the same ones for the same query, after --latency-ms.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+def search_results(query: str, page_size: int) -> dict:
+    rng = random.Random(query)
+    foods = []
+    for i in range(page_size):
+        protein, carbs, fat = rng.uniform(0, 40), rng.uniform(0, 80), rng.uniform(0, 30)
+        foods.append({
+            "fdcId": rng.randint(100000, 2999999),
+            "description": f"{query.upper()}, VARIETY {i + 1}",
+            "dataType": rng.choice(["Foundation", "Branded", "SR Legacy"]),
+            "foodNutrients": [
+                {"nutrientName": "Energy", "unitName": "KCAL", "value": round(protein * 4 + carbs * 4 + fat * 9)},
+                {"nutrientName": "Protein", "unitName": "G", "value": round(protein, 2)},
+                {"nutrientName": "Carbohydrate, by difference", "unitName": "G", "value": round(carbs, 2)},
+                {"nutrientName": "Total lipid (fat)", "unitName": "G", "value": round(fat, 2)},
+            ],
+        })
+    return {"totalHits": page_size, "foods": foods}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    requests = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path.rstrip("/").split("/")[-2:] != ["foods", "search"] or "api_key" not in params:
+            self.send_error(404 if "api_key" in params else 403)
+            return
+        type(self).requests += 1
+        time.sleep(self.latency)
+        body = json.dumps(search_results(params.get("query", [""])[0], int(params.get("pageSize", ["50"])[0]))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = 0, latency: float = 0.05) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stand-in on 127.0.0.1 in a background thread (port 0 picks a free
+    one). Returns the server, for shutdown(), and its URL for USDA_API_URL.
+    """
+    handler = type("Handler", (_Handler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    server, url = serve(args.port, args.latency_ms / 1000)
+    print(f"USDA stand-in on {url} (USDA_API_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
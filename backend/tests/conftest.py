@@ -0,0 +1,52 @@
+"""
+The app under test runs on a fresh SQLite file in a temporary directory,
+with the upstream food APIs and the password process pool switched off.
+The environment is set before anything imports backend.app, whose modules
+read their settings at import time.
+"""
+import itertools
+import os
+import tempfile
+
+_DATA_DIR = tempfile.mkdtemp(prefix="chunklog-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_DATA_DIR, 'chunklog.db')}",
+    ASYNC_DATABASE_URL="",
+    DATABASE_PROFILE="development",
+    USDA_API_KEY="",
+    USDA_CACHE_PATH="",
+    USDA_MIRROR_PATH="",
+    SEARCH_OPENFOODFACTS="0",
+    PASSWORD_HASH_WORKERS="0",
+    BCRYPT_ROUNDS="4",
+    # Recomputes only run when a read flushes them (or at shutdown)
+    GOAL_RECALC_DELAY="60",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.main import app
+
+_user_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Authorization headers of a new user with a complete profile."""
+    n = next(_user_ids)
+    password = "correct horse"
+    response = client.post("/users/", json={"username": f"user{n}", "email": f"user{n}@example.com", "password": password})
+    assert response.status_code == 200, response.text
+    response = client.post("/auth/login", data={"username": f"user{n}", "password": password})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = client.put("/users/me", json={
+        "date_of_birth": "1990-05-17", "gender": "female", "height_cm": 168, "activity_level": "moderate",
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    return headers
@@ -0,0 +1,48 @@
+import json
+from datetime import date, timedelta
+import pytest
+from backend.app import bulk_import, goal_updates, models
+
+ROWS = 600
+
+
+def _upload(rows, fmt: str) -> bytes:
+    if fmt == "csv":
+        lines = ["date,weight"] + [f"{day.isoformat()},{weight}" for day, weight in rows]
+    else:
+        lines = [json.dumps({"date": day.isoformat(), "weight": weight}) for day, weight in rows]
+    return "".join(line + "\n" for line in lines).encode()
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_invalid_utf8_part_way_keeps_earlier_chunks_and_reports_it(client, auth_headers, monkeypatch, fmt):
+    client.post("/weightlogs/", json={"log_date": "2024-12-31", "weight": 80}, headers=auth_headers)
+    client.post("/goals/calculate", json={"goal_type": "maintenance"}, headers=auth_headers)
+
+    monkeypatch.setattr(bulk_import, "CHUNK_SIZE", 50)
+    rows = [(date(2025, 1, 1) + timedelta(days=i), round(70 + i / 100, 2)) for i in range(ROWS)]
+    # The bad byte lands well past the first chunk and the reader's first buffer
+    body = _upload(rows, fmt) + b"\xff\xfe garbage\n" + _upload(rows[:5], "ndjson")
+    response = client.post(
+        f"/import/weightlogs?format={fmt}", files={"file": ("weights", body)}, headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    imported = result["imported"]
+    assert bulk_import.CHUNK_SIZE < imported <= ROWS
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == imported + 1
+    assert "UTF-8" in result["errors"][0]["error"]
+
+    logs = client.get("/weightlogs/?limit=1000", headers=auth_headers).json()
+    assert len(logs) == imported + 1
+
+    # The goal was recalculated from the newest imported weigh-in
+    goal = client.get("/goals/", headers=auth_headers).json()
+    expected = goal_updates.calculate_targets(
+        goal_type=models.GoalType.MAINTENANCE, weight_kg=rows[imported - 1][1], height_cm=168,
+        gender=models.Gender.FEMALE, date_of_birth=date(1990, 5, 17),
+        activity_level=models.ActivityLevel.MODERATE, today=date.today(),
+    )
+    assert goal["target_calories"] == expected["target_calories"]
@@ -0,0 +1,43 @@
+from datetime import date
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Query, Session
+from backend.app import crud, models, schemas
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'crud.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(models.User(id=1, username="user1", email="user1@example.com", hashed_password="x"))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def test_losing_the_external_food_race_keeps_the_callers_writes(engine, monkeypatch):
+    food = schemas.FoodCreate(name="Rice", calories=130, protein=2, carbs=28, fat=0.3, external_id="123", source="USDA")
+    with Session(engine) as other:
+        other.add(models.Food(**food.model_dump(), owner_id=1))
+        other.commit()
+
+    # The lookup misses, as if the other request committed right after it
+    original_first = Query.first
+    misses = [None]
+
+    def first(self):
+        return misses.pop() if misses else original_first(self)
+
+    monkeypatch.setattr(Query, "first", first)
+
+    with Session(engine) as db:
+        db.add(models.WeightLog(user_id=1, date=date(2026, 3, 1), weight=70, timestamp=0))
+        db.flush()
+        db_food = crud.get_or_create_external_food(db, food, user_id=1)
+        assert db_food.external_id == "123"
+        db.commit()
+
+    with Session(engine) as db:
+        assert db.scalar(select(func.count()).select_from(models.Food)) == 1
+        assert db.scalar(select(func.count()).select_from(models.WeightLog)) == 1
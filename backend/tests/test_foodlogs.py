@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from backend.app import database
+
+
+@contextmanager
+def count_queries():
+    """Statements run by the read sessions request handlers use, inside the block."""
+    statements = []
+    engine = database.async_read_engine.sync_engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _add_logs(client, headers, foods, count, log_date="2026-03-02"):
+    for i in range(count):
+        response = client.post("/foodlogs/", json={
+            "log_date": log_date, "servings": 1 + i % 3, "food_id": foods[i % len(foods)],
+        }, headers=headers)
+        assert response.status_code == 200, response.text
+
+
+def _items(response):
+    body = response.json()
+    return body["items"] if isinstance(body, dict) else body
+
+
+@pytest.mark.parametrize("path", [
+    "/foodlogs/?log_date=2026-03-02",
+    "/foodlogs/range?start=2026-03-01&end=2026-03-31",
+])
+def test_listing_runs_the_same_queries_for_one_log_and_many(client, auth_headers, path):
+    foods = []
+    for i in range(8):
+        response = client.post("/foods/", json={
+            "name": f"Food {i}", "calories": 100 + i, "protein": 10, "carbs": 20, "fat": 5,
+        }, headers=auth_headers)
+        foods.append(response.json()["id"])
+
+    _add_logs(client, auth_headers, foods, 1)
+    with count_queries() as one:
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
+    assert len(_items(response)) == 1
+
+    _add_logs(client, auth_headers, foods, 39)
+    with count_queries() as many:
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
+    items = _items(response)
+    assert len(items) == 40
+    assert {item["food"]["id"] for item in items} == set(foods)
+
+    assert one
+    assert len(many) == len(one), many
@@ -0,0 +1,73 @@
+from datetime import date
+from backend.app import goal_updates, models
+from backend.app.database import SessionLocal
+
+PROFILE = dict(
+    height_cm=168, gender=models.Gender.FEMALE, date_of_birth=date(1990, 5, 17),
+    activity_level=models.ActivityLevel.MODERATE,
+)
+
+
+def _expected(goal_type, weight):
+    targets = goal_updates.calculate_targets(goal_type=goal_type, weight_kg=weight, today=date.today(), **PROFILE)
+    return {key: float(value) for key, value in targets.items()}
+
+
+def _targets(goal):
+    return {key: goal[key] for key in ("target_calories", "target_protein", "target_carbs", "target_fat")}
+
+
+def _weigh_in(client, headers, log_date, weight):
+    response = client.post("/weightlogs/", json={"log_date": log_date, "weight": weight}, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_schedules_for_one_user_collapse_into_one_recompute(monkeypatch):
+    recomputed = []
+    monkeypatch.setattr(goal_updates, "recalculate", lambda db, user_id: recomputed.append(user_id))
+    recalculator = goal_updates.GoalRecalculator(SessionLocal, delay=60)
+
+    for _ in range(5):
+        recalculator.schedule(1)
+    recalculator.schedule(2)
+    recalculator.flush(1)
+    assert recomputed == [1]
+    assert recalculator.stats()["coalesced"] == 4
+
+    # Nothing left pending for the user
+    recalculator.flush(1)
+    assert recomputed == [1]
+
+    recalculator.stop()
+    assert recomputed == [1, 2]
+
+
+def test_read_after_weigh_ins_sees_the_latest_weight(client, auth_headers):
+    _weigh_in(client, auth_headers, "2026-04-01", 90)
+    response = client.post("/goals/calculate", json={"goal_type": "weight_loss"}, headers=auth_headers)
+    assert _targets(response.json()) == _expected(models.GoalType.WEIGHT_LOSS, 90)
+
+    recomputed = goal_updates.recalculator.recomputed
+    for log_date, weight in (("2026-04-02", 88), ("2026-04-03", 86.5), ("2026-04-04", 85)):
+        _weigh_in(client, auth_headers, log_date, weight)
+    # Logged last but dated earliest, so not the latest weight
+    _weigh_in(client, auth_headers, "2026-01-15", 95)
+
+    response = client.get("/goals/", headers=auth_headers)
+    assert _targets(response.json()) == _expected(models.GoalType.WEIGHT_LOSS, 85)
+    # Four weigh-ins, one recompute
+    assert goal_updates.recalculator.recomputed == recomputed + 1
+
+
+def test_goal_set_after_a_weigh_in_is_not_overwritten(client, auth_headers):
+    _weigh_in(client, auth_headers, "2026-04-01", 70)
+    client.post("/goals/calculate", json={"goal_type": "maintenance"}, headers=auth_headers)
+    _weigh_in(client, auth_headers, "2026-04-02", 71)
+
+    manual = {"target_calories": 1800.0, "target_protein": 120.0, "target_carbs": 180.0, "target_fat": 60.0}
+    response = client.post("/goals/", json={"goal_type": "maintenance", **manual}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+    response = client.get("/goals/", headers=auth_headers)
+    # The recompute queued by the weigh-in ran before the goal was set, not after
+    assert _targets(response.json()) == manual
@@ -0,0 +1,87 @@
+import random
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from backend.app import goal_updates, models
+from backend.app.jobs import recompute_goals
+
+USERS = 300
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A database of users with varied profiles, goals and weigh-ins, some incomplete."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'goals.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(15)
+    today = date.today()
+    with Session(engine) as db:
+        for user_id in range(1, USERS + 1):
+            born = today - timedelta(days=rng.randint(16 * 365, 80 * 365))
+            if rng.random() < 0.1:
+                # Birthday today, where the age changes
+                born = born.replace(month=today.month, day=min(today.day, 28))
+            db.add(models.User(
+                id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", hashed_password="x",
+                date_of_birth=born if rng.random() > 0.05 else None,
+                gender=rng.choice(list(models.Gender)) if rng.random() > 0.05 else None,
+                height_cm=round(rng.uniform(140, 210), 1) if rng.random() > 0.05 else None,
+                activity_level=rng.choice(list(models.ActivityLevel)),
+            ))
+            db.add(models.Goal(user_id=user_id, goal_type=rng.choice(list(models.GoalType)), target_calories=2000))
+            for n in range(rng.choice((0, 1, 1, 2, 4))):
+                db.add(models.WeightLog(
+                    user_id=user_id, date=today - timedelta(days=rng.randint(0, 30)),
+                    timestamp=rng.randint(0, 10), weight=round(rng.uniform(40, 160), 1),
+                ))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def _per_user(db: Session, user_id: int):
+    """Targets through goal_updates, as the API computes them; None for an incomplete profile."""
+    user = db.get(models.User, user_id)
+    goal = db.get(models.Goal, user_id)
+    try:
+        return goal_updates.targets_for_user(db, user, goal.goal_type)
+    except goal_updates.IncompleteProfile:
+        return None
+
+
+def test_vectorized_targets_match_per_user_calculation(engine):
+    with engine.connect() as conn:
+        result = conn.execute(text(recompute_goals._CHUNK), {"after": 0, "limit": USERS})
+        columns = recompute_goals._columns(result.all(), list(result.keys()))
+    targets = recompute_goals.compute_targets(columns, date.today())
+
+    with Session(engine) as db:
+        incomplete = 0
+        for i, user_id in enumerate(columns["user_id"]):
+            expected = _per_user(db, int(user_id))
+            if expected is None:
+                incomplete += 1
+                assert not targets["valid"][i], user_id
+                continue
+            assert targets["valid"][i], user_id
+            for key in recompute_goals.TARGETS:
+                assert targets[key][i] == expected[key], (user_id, key)
+    # The seed covers both complete and incomplete profiles
+    assert 0 < incomplete < USERS
+
+
+def test_recompute_writes_the_per_user_targets(engine):
+    with engine.connect() as conn:
+        stats = recompute_goals.recompute(conn, chunk_size=64)
+    assert stats["scanned"] == USERS
+
+    with Session(engine) as db:
+        for user_id in range(1, USERS + 1):
+            expected = _per_user(db, user_id)
+            goal = db.get(models.Goal, user_id)
+            if expected is None:
+                # Kept as they were
+                assert goal.target_calories == 2000
+                continue
+            assert {key: getattr(goal, key) for key in recompute_goals.TARGETS} == expected, user_id
@@ -97,6 +97,9 @@ function LogMealModal({ onMealLogged, selectedDate }) {
           protein: foodToLog.protein,
           carbs: foodToLog.carbs,
           fat: foodToLog.fat,
+          // Unedited foods keep their USDA id so the log below reuses this entry
+          external_id: editedFood ? null : selectedFood.external_id,
+          source: editedFood ? null : selectedFood.source,
         };
         await createFood(createPayload);
         toast.success(`${foodToLog.name} saved to library!`);
@@ -3,7 +3,7 @@ import { CircularProgressbar, buildStyles } from 'react-circular-progressbar';
 import 'react-circular-progressbar/dist/styles.css';
 import { Box, Card, CardContent, Typography, IconButton, LinearProgress, useTheme } from '@mui/material';
 import { Settings, Restaurant } from '@mui/icons-material';
-import { getUserGoal, getFoodLogs } from '../services/api';
+import { getUserGoal, getDailySummary } from '../services/api';
 import Modal from '../components/Modal';
 import GoalForm from '../components/GoalForm';
 import '../styles/Dashboard.css';
@@ -44,7 +44,7 @@ function DashboardPage() {
   const theme = useTheme();
   const mode = theme.palette.mode;
   const [goal, setGoal] = useState(null);
-  const [dailyLog, setDailyLog] = useState([]);
+  const [dailySummary, setDailySummary] = useState(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
 
   const getTodayString = () => {
@@ -58,12 +58,12 @@ function DashboardPage() {
   const fetchData = async () => {
     try {
       const today = getTodayString();
-      const [goalResponse, logResponse] = await Promise.all([
+      const [goalResponse, summaryResponse] = await Promise.all([
         getUserGoal(),
-        getFoodLogs(today)
+        getDailySummary(today)
       ]);
       setGoal(goalResponse.data);
-      setDailyLog(logResponse.data);
+      setDailySummary(summaryResponse.data[0] || null);
     } catch (err) {
       console.error("Failed to fetch dashboard data", err);
       if (err.response && err.response.status === 404 && err.config.url.includes('/goals')) {
@@ -81,15 +81,12 @@ function DashboardPage() {
     setIsModalOpen(false);
   };
 
-  const consumed = dailyLog.reduce((totals, item) => {
-    if (item.food) {
-      totals.calories += item.food.calories * item.servings;
-      totals.protein += item.food.protein * item.servings;
-      totals.carbs += item.food.carbs * item.servings;
-      totals.fat += item.food.fat * item.servings;
-    }
-    return totals;
-  }, { calories: 0, protein: 0, carbs: 0, fat: 0 });
+  const consumed = {
+    calories: dailySummary ? dailySummary.calories : 0,
+    protein: dailySummary ? dailySummary.protein : 0,
+    carbs: dailySummary ? dailySummary.carbs : 0,
+    fat: dailySummary ? dailySummary.fat : 0,
+  };
   
   const budget = {
     calories: goal ? goal.target_calories : 0,
@@ -4,7 +4,7 @@ import { Delete } from '@mui/icons-material';
 import { toast } from 'react-toastify';
 import { Line } from 'react-chartjs-2';
 import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement, Title, Tooltip, Legend, Filler } from 'chart.js';
-import { getWeightLogs, deleteWeightLog } from '../services/api';
+import { getWeightLogs, deleteWeightLog, getSeries } from '../services/api';
 import Modal from '../components/Modal';
 import WeightLog from '../components/WeightLog';
 import '../styles/WeightPage.css';
@@ -27,14 +27,19 @@ function WeightPage() {
   const theme = useTheme();
   const isDark = theme.palette.mode === 'dark';
   const [logs, setLogs] = useState([]);
+  const [series, setSeries] = useState({ resolution: 'day', points: [] });
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [showHistory, setShowHistory] = useState(false);
   const [unit, setUnit] = useState('lbs');
 
   const fetchLogs = async () => {
     try {
-      const response = await getWeightLogs();
-      setLogs(response.data);
+      const [logsResponse, seriesResponse] = await Promise.all([
+        getWeightLogs(),
+        getSeries('weight', { points: 200 }),
+      ]);
+      setLogs(logsResponse.data);
+      setSeries(seriesResponse.data);
     } catch (error) {
       console.error("Failed to fetch weight logs", error);
     }
@@ -65,11 +70,14 @@ function WeightPage() {
   const displayWeight = unit === 'lbs' ? (latestWeightKg * 2.20462).toFixed(1) : latestWeightKg.toFixed(1);
 
   const chartData = {
-    labels: [...logs].reverse().map(log => parseLocalDate(log.log_date).toLocaleDateString(undefined, { month: 'short', day: 'numeric' })),
+    labels: series.points.map(point => parseLocalDate(point.date).toLocaleDateString(
+      undefined,
+      series.resolution === 'month' ? { month: 'short', year: 'numeric' } : { month: 'short', day: 'numeric' }
+    )),
     datasets: [
       {
         label: `Weight (${unit})`,
-        data: [...logs].reverse().map(log => unit === 'lbs' ? log.weight * 2.20462 : log.weight),
+        data: series.points.map(point => unit === 'lbs' ? point.value * 2.20462 : point.value),
         borderColor: '#6366f1',
         backgroundColor: 'rgba(99, 102, 241, 0.1)',
         fill: true,
@@ -178,7 +186,7 @@ function WeightPage() {
         Weigh In
       </Button>
       
-      {logs.length > 1 ? (
+      {series.points.length > 1 ? (
         <Card sx={{ mb: 3, borderRadius: 3, boxShadow: '0 4px 20px rgba(0, 0, 0, 0.08)' }}>
           <CardContent sx={{ p: 2 }}>
             <Box sx={{ height: 250 }}>
@@ -137,6 +137,14 @@ export const deleteWeightLog = (logId) => {
   return api.delete(`/weightlogs/${logId}`);
 };
 
+export const getWeightTrend = (start, end) => {
+  return api.get('/weightlogs/trend', { params: { start, end } });
+};
+
+export const getSeries = (metric, params = {}) => {
+  return api.get(`/series/${metric}`, { params });
+};
+
 // --- Food Functions ---
 export const getFoods = () => {
     return api.get('/foods/');
@@ -163,4 +171,8 @@ export const deleteFoodLog = (logId) => {
   return api.delete(`/foodlogs/${logId}`);
 };
 
+export const getDailySummary = (start, end = start) => {
+  return api.get('/foodlogs/summary', { params: { start, end } });
+};
+
 export default api;
\ No newline at end of file